@@ -6,15 +6,26 @@ _HERE = os.path.dirname(os.path.abspath(__file__))
 if _HERE not in sys.path:
     sys.path.insert(0, _HERE)
 
+import uuid
 import numpy as np
 import pandas as pd
 import streamlit as st
 from io import BytesIO
 
-from config import GROUP_COLORS
-from models import model_A, model_B
-from ui_components import styled_df, kpi_card, render_waterfall, build_table
-from ui_sidebar import render_sidebar
+from config import GROUP_COLORS, RUN_LOG_PATH
+from models import (summarize_ab, attach_groups, group_rollup, ord_to_ym,
+                    account_group_pivot, identity_diagnostics, baseline_matrix,
+                    grouping_sets, slice_period, ACCT_CATS,
+                    MODELS, EFFECT_LABELS, effect_columns, kernel_code, kernel_codes,
+                    apply_post, post_rows)
+from pipeline import (run_variance, run_variance_ab, run_trend, run_multi_baseline,
+                      run_customer_variance)
+from ui_components import (styled_df, money_column_config, paginate,
+                           kpi_card, render_waterfall, render_trend_chart,
+                           build_table, build_multi_table, build_rollup_table)
+from ui_sidebar import render_sidebar, render_diagnostics
+from profiling import begin_run, stage, start_stage, end_stage, records, run_elapsed_ms
+from run_log import log_run
 from ui_group_editor import render_group_editor
 from ui_model_guide import render_model_guide
 # app.py  —  Streamlit 진입점 (오케스트레이션만 담당)
@@ -22,13 +33,32 @@ from ui_model_guide import render_model_guide
 # 실행: streamlit run app.py
 #
 # 의존 모듈:
-#   config.py            상수 (COL_IDX, MONTH_KR, GROUP_COLORS)
-#   data_loader.py       load_excel, groups_to_json_bytes, json_bytes_to_groups
-#   models.py            aggregate, model_A, model_B
-#   ui_components.py     styled_df, kpi_card, render_waterfall, build_table
-#   ui_sidebar.py        render_sidebar → 사이드바 전체
+#   config.py            상수 (COL_IDX, CACHE_DIR, MONTH_KR, GROUP_COLORS)
+#   erp_reader.py        parse_erp_excel, read_erp_cached, prune_cache (Parquet 디스크 캐시 — 개수·용량 상한)
+#   data_loader.py       load_excel, load_cube, load_month_index, load_customer_cube,
+#                        groups_to_json_bytes, json_bytes_to_groups
+#   models.py            build_monthly_cube, build_month_index, range_sums, aggregate,
+#                        model_A, model_B, model_AB, select_model, summarize_ab,
+#                        attach_groups, group_rollup, account_group_pivot, ACCT_CATS,
+#                        identity_diagnostics (항등식·환율 결측·잔차 흡수 진단),
+#                        model_trend, trend_months (월 쌍 배치 분해),
+#                        model_multi, baseline_matrix (실적 1회 집계 vs 다중 기준),
+#                        model_customer, grouping_sets (매출처 × 품목 × 환종 리프 + 롤업)
+#                        model_C, mix_split, MIX_KEYS (① 수량차이의 볼륨·믹스 분할),
+#                        MODELS, register_model, run_model, apply_post, post_rows, kernel_code(s),
+#                        EFFECT_LABELS, effect_columns (모델 레지스트리 — 커널 + 표시 메타데이터)
+#   pipeline.py          run_variance, run_variance_ab (모델 A·B 동시 계산 + LRU 캐시),
+#                        run_trend (월별 차이 추이 배치 계산),
+#                        run_multi_baseline (계획·전년·전월 다중 기준 비교),
+#                        run_customer_variance (매출처 리프 차이 분해)
+#   profiling.py         begin_run, stage, start_stage/end_stage (단계별 시간·메모리 계측)
+#   run_log.py           log_run → 실행 지표 JSONL 로그 (크기 기준 로테이션)
+#   ui_components.py     styled_df, sign_style_mask, money_column_config, paginate,
+#                        kpi_card, render_waterfall, render_trend_chart,
+#                        build_table, build_multi_table, build_rollup_table
+#   ui_sidebar.py        render_sidebar → 사이드바 전체, render_diagnostics → 진단 expander
 #   ui_group_selector.py render_group_selector → 그룹 카드 UI
-#   ui_model_guide.py    render_model_guide → 하단 모델 비교표
+#   ui_model_guide.py    render_model_guide → 하단 모델 비교표 (MODELS 레지스트리 기준)
 # ══════════════════════════════════════════════════════════════════════════════
 
 
@@ -85,17 +115,24 @@ div[data-testid="stDataFrame"] th {
 # ══════════════════════════════════════════════════════════════════════════════
 # 사이드바
 # ══════════════════════════════════════════════════════════════════════════════
-ctx = render_sidebar()   # → dict with df_all, df_base, df_curr, labels, model, show_detail
+# 단계 계측: 실행 지표 로그(RUN_LOG_PATH)가 켜져 있으면 항상 시간·행 수 기록,
+# 메모리 피크(tracemalloc)는 진단 expander에서 켰을 때만 — 위젯 값은 리런 시작 시점에 이미 session_state에 있음
+# tracemalloc은 프로세스 전역 — 세션 키로 추적 요청을 집계해 다른 세션의 추적을 끄지 않음
+_diag_on = st.session_state.get("diag_enabled", False)
+if "_diag_session" not in st.session_state:
+    st.session_state["_diag_session"] = uuid.uuid4().hex
+begin_run(enabled=bool(_diag_on or RUN_LOG_PATH), trace_memory=_diag_on,
+          session=st.session_state["_diag_session"])
+
+ctx = render_sidebar()   # → dict with df_all, cube_base, cube_curr, periods, labels, model, show_detail
 
 df_all         = ctx["df_all"]
-df_base        = ctx["df_base"]
-df_curr        = ctx["df_curr"]
+cube_base      = ctx["cube_base"]
+cube_curr      = ctx["cube_curr"]
 base_label     = ctx["base_label"]
 curr_label     = ctx["curr_label"]
-period_mode    = ctx["period_mode"]
 analysis_model = ctx["analysis_model"]
 show_detail    = ctx["show_detail"]
-is_ytd         = ctx.get("is_ytd", False)
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 타이틀
@@ -123,61 +160,57 @@ with st.expander("📂 품목 그룹 설정  (클릭하여 펼치기 / 접기)",
     render_group_editor(df_all)
 
 # ── 선택된 모델 배너 ──────────────────────────────────────────────────────────
-is_model_A   = "모델 A" in analysis_model
-accent_color = "#4472c4" if is_model_A else "#e6812a"
-badge_bg     = "#eef4ff" if is_model_A else "#fff8ee"
-
-if is_model_A:
-    st.markdown(f"""
-    <div style="background:{badge_bg};border-left:5px solid {accent_color};border-radius:8px;padding:10px 16px;margin-bottom:8px;">
-      <b style="color:{accent_color}">📐 모델 A — 원인별 임팩트 분석</b>&nbsp;&nbsp;
-      <span style="font-size:0.82rem;color:#555;">재무·감사용 표준 │ 변수 간 간섭 완전 제거</span><br/>
-      <span style="font-size:0.75rem;color:#888;margin-top:4px;display:block;">
-        ① (Q1−Q0)×<b>P0_fx</b>×<b>ER0</b> │ ② (P1−P0)×<b>Q1</b>×<b>ER0</b> │ ③ (ER1−ER0)×<b>Q1</b>×<b>P1_fx</b>
-      </span>
-    </div>""", unsafe_allow_html=True)
-else:
-    st.markdown(f"""
-    <div style="background:{badge_bg};border-left:5px solid {accent_color};border-radius:8px;padding:10px 16px;margin-bottom:8px;">
-      <b style="color:{accent_color}">📈 모델 B — 활동별 증분 분석</b>&nbsp;&nbsp;
-      <span style="font-size:0.82rem;color:#555;">영업·전략 보고용 │ 상황별 Case 분기</span><br/>
-      <span style="font-size:0.75rem;color:#888;margin-top:4px;display:block;">
-        ① Q↑:(Q1−Q0)×<b>P1_krw</b> / Q↓:(Q1−Q0)×<b>P0_krw</b> │ ② 총차이−①−③ │ ③ P/Q 4-Case
-      </span>
-    </div>""", unsafe_allow_html=True)
+# 배너·KPI·표·내보내기는 모두 models.MODELS 메타데이터에서 — 모델별 분기 없음.
+# 커널이 같은 모델(C → A)은 kernel 코드로 파이프라인 캐시를 공유하고 post만 따로 적용.
+model_code   = ctx["model"]
+model_spec   = MODELS[model_code]
+kernel       = kernel_code(model_code)
+accent_color = model_spec["palette"]["accent"]
+badge_bg     = model_spec["palette"]["badge"]
+opt_text     = "".join(f" │ {opt['title']}: {opt['choices'][ctx['model_opts'][arg]]}"
+                       for arg, opt in model_spec["options"].items() if arg in ctx["model_opts"])
+formula_text = " │ ".join(f"{sym} {eq}" for sym, eq in model_spec["formulas"])
+
+st.markdown(f"""
+<div style="background:{badge_bg};border-left:5px solid {accent_color};border-radius:8px;padding:10px 16px;margin-bottom:8px;">
+  <b style="color:{accent_color}">{model_spec['icon']} {model_spec['name']}</b>&nbsp;&nbsp;
+  <span style="font-size:0.82rem;color:#555;">{model_spec['tagline']}{opt_text}</span><br/>
+  <span style="font-size:0.75rem;color:#888;margin-top:4px;display:block;">{formula_text}</span>
+</div>""", unsafe_allow_html=True)
 
 # ── 기간 유효성 ───────────────────────────────────────────────────────────────
 st.markdown("<br/>", unsafe_allow_html=True)
-if df_base.empty and df_curr.empty:
+if cube_base.empty and cube_curr.empty:
     st.error("두 기간 모두 데이터가 없습니다.")
     st.stop()
 
 # ── 차이 분석 실행 ────────────────────────────────────────────────────────────
 with st.spinner("분석 중..."):
-    va, va_detail = model_A(df_base, df_curr) if is_model_A else model_B(df_base, df_curr)
+    # (파일 지문, 기간, 모델) 키 캐시 — 그룹·정렬·드릴다운 변경 시에는 재계산 없음
+    with stage("app.run_variance") as rec:
+        va, va_detail = run_variance(ctx["fingerprint"], ctx["base_period"], ctx["curr_period"],
+                                     kernel, ctx["month_index"], exact=ctx["exact"])
+        rec["rows"] = len(va_detail)
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 분석 대상 선택 — 커스텀 그룹 기준
 # ══════════════════════════════════════════════════════════════════════════════
-all_items    = sorted(va["품목명"].unique())
 item_mapping = st.session_state.get("item_mapping", {})
 
-# item_mapping → groups 구성 (커스텀 그룹 우선, 미분류 후순위)
-custom_groups: dict = {}
-for item in all_items:
-    grp = item_mapping.get(item, "").strip()
-    if grp:
-        custom_groups.setdefault(grp, []).append(item)
+# item → 그룹 매핑을 범주형 '그룹' 컬럼으로 1회 조인 — 이후 그룹 합계·필터는 이 컬럼 기준
+with stage("app.attach_groups", rows=len(va_detail)):
+    va        = attach_groups(va, item_mapping)
+    va_detail = attach_groups(va_detail, item_mapping)
+if model_spec["post"] is not None:   # 모델 후처리 (예: C 볼륨·믹스) — 선택 필터 전 전체 품목 기준
+    with stage("app.model_post", rows=len(va_detail)):
+        va, va_detail = apply_post(model_code, va, va_detail, ctx["exact"], **ctx["model_opts"])
+all_items = sorted(va["품목명"].unique())
 
-unassigned = [i for i in all_items if not item_mapping.get(i, "").strip()]
+# groups: {그룹명: [품목명]} (커스텀 그룹 우선, 미분류 후순위 — '그룹' 카테고리 순서)
+groups: dict = va.groupby("그룹", observed=True, sort=True)["품목명"].agg(list).to_dict()
 
-# 전체 groups (커스텀 + 미분류)
-groups: dict = dict(custom_groups)
-if unassigned:
-    groups["미분류"] = unassigned
-
-has_custom = len(custom_groups) > 0
-custom_group_names = list(custom_groups.keys())
+custom_group_names = [g for g in groups if g != "미분류"]
+has_custom = len(custom_group_names) > 0
 group_names = list(groups.keys())
 
 st.markdown('<div class="section-header">📦 분석 대상 선택</div>', unsafe_allow_html=True)
@@ -237,6 +270,20 @@ if not selected_items:
 va_filtered        = va[va["품목명"].isin(selected_items)].copy()
 va_detail_filtered = va_detail[va_detail["품목명"].isin(selected_items)].copy()
 
+# 매출처별 분석 — [매출처 × 품목 × 환종] 리프(캐시) 1회 → 집계 축별 롤업을 미리 계산해 뷰에 보관
+customer_sets = None
+if ctx["customer_cube"] is not None:
+    with stage("app.customer_rollup") as rec:
+        leaf = run_customer_variance(ctx["fingerprint"], ctx["base_period"], ctx["curr_period"],
+                                     kernel, ctx["customer_cube"],
+                                     ctx["month_index"], exact=ctx["exact"])
+        # 후처리(예: C 볼륨·믹스)는 품목 분석과 같이 선택 필터 전 전체 품목 기준
+        leaf = post_rows(model_code, attach_groups(leaf, item_mapping), ctx["exact"],
+                         **ctx["model_opts"])
+        leaf = leaf[leaf["품목명"].isin(selected_items)]
+        customer_sets = grouping_sets(leaf)
+        rec["rows"] = len(leaf)
+
 # ══════════════════════════════════════════════════════════════════════════════
 # KPI 요약
 # ══════════════════════════════════════════════════════════════════════════════
@@ -251,7 +298,6 @@ fx_v       = va_filtered["환율차이"].sum()
 all_krw    = va_filtered["is_krw"].all() if "is_krw" in va_filtered.columns else False
 
 k1, k2, k3 = st.columns(3)
-k4, k5, k6 = st.columns(3)
 
 kpi_card(k1, f"기준 매출 ({base_label})", "원화 실적 합계", total_base, neutral=True)
 kpi_card(k2, f"실적 매출 ({curr_label})", "원화 실적 합계", total_curr, neutral=True)
@@ -265,20 +311,41 @@ k3.markdown(f"""
     <div class="kpi-value {val_td}" style="font-size:1.5rem;">{sign_td}{total_diff:,.0f} 원</div>
 </div>""", unsafe_allow_html=True)
 
-if is_model_A:
-    kpi_card(k4, "① 수량 차이", "(Q1−Q0)×P0_fx×ER0", qty_v)
-    kpi_card(k5, "② 단가 차이", "(P1−P0)×Q1×ER0", price_v)
-    if all_krw:
-        k6.markdown('<div class="kpi-card kpi-card-zero"><div class="kpi-label">③ 환율 차이</div><div class="kpi-formula">(ER1−ER0)×Q1×P1_fx</div><div class="kpi-value kpi-val-zero">— KRW 해당없음</div></div>', unsafe_allow_html=True)
-    else:
-        kpi_card(k6, "③ 환율 차이", "(ER1−ER0)×Q1×P1_fx", fx_v)
-else:
-    kpi_card(k4, "① 수량 차이 (Volume Incremental)", "Q↑→×P1_krw / Q↓→×P0_krw", qty_v)
-    kpi_card(k5, "② 단가 차이 (Negotiation Residual)", "총차이 − ① − ③", price_v)
-    if all_krw:
-        k6.markdown('<div class="kpi-card kpi-card-zero"><div class="kpi-label">③ 환율 차이 (FX Exposure)</div><div class="kpi-formula">P/Q 방향 4-Case 분기</div><div class="kpi-value kpi-val-zero">— KRW 해당없음</div></div>', unsafe_allow_html=True)
-    else:
-        kpi_card(k6, "③ 환율 차이 (FX Exposure)", "P/Q 방향 4-Case 분기", fx_v)
+# 분해 KPI 카드 — 모델 메타데이터(kpis) 순서대로 3개씩 한 줄
+kpis = model_spec["kpis"]
+for row in range(0, len(kpis), 3):
+    for slot, (col, label, formula) in zip(st.columns(3), kpis[row:row + 3]):
+        if col == "환율차이" and all_krw:
+            slot.markdown(f'<div class="kpi-card kpi-card-zero"><div class="kpi-label">{label}</div><div class="kpi-formula">{formula}</div><div class="kpi-value kpi-val-zero">— KRW 해당없음</div></div>', unsafe_allow_html=True)
+        else:
+            kpi_card(slot, label, formula, va_filtered[col].sum())
+
+# ── 분석 결과 뷰 (session_state) ──────────────────────────────────────────────
+# 아래 그룹 표·품목계정 탭·시각화는 st.fragment — 드릴다운 등 블록 안의 조작은
+# 전체 스크립트(사이드바 파싱·모델 계산·KPI) 대신 해당 fragment만 다시 실행하며,
+# 이때 입력은 이 뷰에서만 읽음 (전체 리런마다 갱신).
+_VIEW_KEY = "_analysis_view"
+st.session_state[_VIEW_KEY] = dict(
+    va=va_filtered, vd=va_detail_filtered,
+    base_label=base_label, curr_label=curr_label, show_detail=show_detail,
+    model=model_code, accent_color=accent_color,
+    # 후처리 모델(예: C)의 추이·다중 기준 캐시 키 — 그 외 모델은 빈 튜플 (커널 결과 캐시 공유)
+    post_groups=tuple(sorted(item_mapping.items())) if model_spec["post"] else (),
+    post_opts=tuple(sorted(ctx["model_opts"].items())) if model_spec["post"] else (),
+    has_custom=has_custom, selected_groups=selected_groups, selected_items=selected_items,
+    grp_colors={
+        gn: GROUP_COLORS[i % len(GROUP_COLORS)][0]
+        for i, gn in enumerate(list(groups.keys()))
+        if gn != "미분류"
+    },
+    totals=dict(base=total_base, curr=total_curr, diff=total_diff,
+                qty=qty_v, price=price_v, fx=fx_v),
+    fingerprint=ctx["fingerprint"], month_index=ctx["month_index"],
+    curr_end=ctx["curr_period"][1], exact=ctx["exact"],
+    curr_period=ctx["curr_period"], baselines=ctx["baselines"],
+    plan_index=ctx["plan_index"], plan_fingerprint=ctx["plan_fingerprint"],
+    customer_sets=customer_sets,
+)
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 커스텀 그룹별 차이 분석  (기본 분석 화면)
@@ -287,64 +354,40 @@ st.markdown('<div class="section-header">📋 커스텀 그룹별 차이 분석<
 
 
 # ── 세부 품목 표 렌더 헬퍼 (합계 행 분리, 행 너비 통일) ─────────────────────────
-def _show_split_table(df_with_total: "pd.DataFrame", money_cols: list):
+def _show_split_table(df_with_total: "pd.DataFrame", money_cols: list, key: str,
+                      label_col: str = "품목명"):
     """
     build_table() 반환값을 데이터 표 + 합계 표로 분리 렌더링.
-    column_config로 동일한 컬럼 너비를 두 표에 모두 적용해 정렬 통일.
+    column_config로 동일한 컬럼 너비·숫자 포맷을 두 표에 모두 적용해 정렬 통일.
+    데이터 행이 TABLE_PAGE_SIZE를 넘으면 검색·정렬·페이지 모드 (현재 페이지만 스타일·전송).
+    key: 페이지 위젯 state 구분용 (화면 내 표마다 고유).
+    label_col: 합계 행 라벨·검색 대상 열 (롤업 표는 매출처명·그룹 등).
     """
     ROW_H = 36
     HDR_H = 40
 
-    total_mask = df_with_total.apply(
-        lambda r: any("합 계" in str(v) for v in r.values), axis=1
-    )
+    total_mask = df_with_total[label_col].astype(str).str.contains("합 계", regex=False)
     data_df  = df_with_total[~total_mask].reset_index(drop=True)
     total_df = df_with_total[total_mask].reset_index(drop=True)
 
-    # ── 공통 column_config 생성 ───────────────────────────────────────────────
-    # 품목명/그룹 등 텍스트 열은 너비 고정, 숫자 열은 동일 width
-    def _make_col_config(df):
-        cfg = {}
-        for col in df.columns:
-            if col in money_cols:
-                cfg[col] = st.column_config.NumberColumn(col, format="%,.0f", width="medium")
-            elif col in ("품목명", "그룹", "환종"):
-                cfg[col] = st.column_config.TextColumn(col, width="large")
-            else:
-                cfg[col] = st.column_config.TextColumn(col, width="small")
-        return cfg
-
-    col_cfg = _make_col_config(data_df)
+    # 품목명/그룹 등 텍스트 열은 너비 고정, 금액 열은 천단위 쉼표 NumberColumn
+    col_cfg = money_column_config(data_df.columns, money_cols)
 
     # 데이터 표
-    data_h = min(520, max(HDR_H + ROW_H, len(data_df) * ROW_H + HDR_H))
+    page_df = paginate(data_df, key, search_cols=(label_col,))
+    data_h  = min(520, max(HDR_H + ROW_H, len(page_df) * ROW_H + HDR_H))
     st.dataframe(
-        styled_df(data_df, money_cols),
+        styled_df(page_df, money_cols),
         use_container_width=True,
         hide_index=True,
         height=data_h,
         column_config=col_cfg,
     )
 
-    # 합계 표 — 동일한 column_config 적용으로 열 너비 통일
+    # 합계 표 — 동일한 column_config 적용으로 열 너비 통일 (전체 행 기준 합계)
     if not total_df.empty:
-        def _total_style(df):
-            def color(v):
-                try:
-                    fv = float(v)
-                    if fv < 0: return "color:#c0392b;font-weight:700"
-                    if fv > 0: return "color:#1a7a4a;font-weight:700"
-                except: pass
-                return "font-weight:700"
-            fmt = {c: "{:,.0f}" for c in money_cols if c in df.columns}
-            styler = df.style.format(fmt, na_rep="-")
-            for c in df.columns:
-                fn = color if c in money_cols else (lambda v: "font-weight:700")
-                styler = styler.applymap(fn, subset=[c])
-            return styler
-
         st.dataframe(
-            _total_style(total_df),
+            styled_df(total_df, money_cols, base="font-weight:700"),
             use_container_width=True,
             hide_index=True,
             height=HDR_H + ROW_H,
@@ -352,11 +395,13 @@ def _show_split_table(df_with_total: "pd.DataFrame", money_cols: list):
         )
 
 # ── 그룹별 표 + 드롭다운 헬퍼 ───────────────────────────────────────────────
-def _render_group_section(grp_list, grp_map, color_map, va_src, va_detail_src, sel_key):
+def _render_group_section(grp_list, color_map, va_src, va_detail_src, sel_key, roll=None):
     """
     ① 상단: 드롭다운 selectbox (어느 그룹 세부 품목을 볼지 선택)
     ② 중단: 그룹별 요약 표 (행=그룹, 열=기준매출/실적매출/총차이/①②③)
     ③ 하단: 선택된 그룹의 품목별 상세 테이블
+    요약 표·합계·드릴다운 품목 수는 모두 group_rollup() 한 번의 groupby 결과를 공유.
+    roll: 이미 계산된 그룹 롤업(예: account_group_pivot() 슬라이스) — 없으면 va_src로 계산.
     """
     if not grp_list:
         st.info("표시할 그룹이 없습니다.")
@@ -371,172 +416,130 @@ def _render_group_section(grp_list, grp_map, color_map, va_src, va_detail_src, s
         key=sel_key,
     )
 
-    # ② 그룹별 요약 표 데이터 구성 (합계는 마지막 행)
-    all_items_in = [i for gn in grp_list for i in grp_map.get(gn, [])]
-    tot = va_src[va_src["품목명"].isin(all_items_in)]
-    bl = base_label; cl = curr_label
-
-    data_rows = []
-    for gn in grp_list:
-        items = grp_map.get(gn, [])
-        if not items:
-            continue
-        g_va = va_src[va_src["품목명"].isin(items)]
-        data_rows.append({
-            "그룹": f"📦 {gn}  ({len(items)}개 품목)",
-            f"기준매출 [{bl}]": g_va["매출0"].sum(),
-            f"실적매출 [{cl}]": g_va["매출1"].sum(),
-            "총차이(원)":  g_va["총차이"].sum(),
-            "①수량차이":  g_va["수량차이"].sum(),
-            "②단가차이":  g_va["단가차이"].sum(),
-            "③환율차이":  g_va["환율차이"].sum(),
-            "_is_total": False,
-        })
-
-    total_row = {
-        "그룹": "【합 계】",
-        f"기준매출 [{bl}]": tot["매출0"].sum(),
-        f"실적매출 [{cl}]": tot["매출1"].sum(),
-        "총차이(원)":  tot["총차이"].sum(),
-        "①수량차이":  tot["수량차이"].sum(),
-        "②단가차이":  tot["단가차이"].sum(),
-        "③환율차이":  tot["환율차이"].sum(),
-        "_is_total": True,
-    }
-
-    # 정렬 state: 컬럼 클릭 시 데이터 행만 정렬, 합계 행은 항상 마지막
-    sort_key = f"{sel_key}_sort"
-    sort_col = st.session_state.get(sort_key, None)
-    sort_asc = st.session_state.get(f"{sort_key}_asc", True)
-
-    tbl_df_data = pd.DataFrame(data_rows)
-    money_c = [c for c in tbl_df_data.columns if c not in ("그룹", "_is_total")]
-
-    if sort_col and sort_col in tbl_df_data.columns:
-        tbl_df_data = tbl_df_data.sort_values(sort_col, ascending=sort_asc)
-
-    # 데이터 행만 포함한 표 (정렬 가능)
-    tbl_df = tbl_df_data.drop(columns=["_is_total"])
-
-    def _style_data(df):
-        def color(v):
-            try:
-                fv = float(v)
-                if fv < 0: return "color:#c0392b;font-weight:600"
-                if fv > 0: return "color:#1a7a4a;font-weight:600"
-            except: pass
-            return ""
-        diff_cols = ["총차이(원)", "①수량차이", "②단가차이", "③환율차이"]
-        fmt = {c: "{:,.0f}" for c in money_c}
-        styler = df.style.format(fmt, na_rep="-")
-        for c in diff_cols:
-            if c in df.columns:
-                styler = styler.applymap(color, subset=[c])
-        return styler
-
+    # ② 그룹별 요약 표 데이터 구성 (합계는 마지막 행) — 단일 groupby
+    in_list = va_src[va_src["그룹"].isin(grp_list)]
+    roll    = (group_rollup(in_list) if roll is None else roll).set_index("그룹")
+    roll    = roll.loc[[gn for gn in grp_list if gn in roll.index]]
+    view = st.session_state[_VIEW_KEY]
+    bl, cl, show_detail = view["base_label"], view["curr_label"], view["show_detail"]
+
+    tbl_df_data = pd.DataFrame({
+        "그룹": [f"📦 {gn}  ({n}개 품목)" for gn, n in zip(roll.index, roll["품목수"])],
+        f"기준매출 [{bl}]": roll["매출0"].to_numpy(),
+        f"실적매출 [{cl}]": roll["매출1"].to_numpy(),
+        "총차이(원)":  roll["총차이"].to_numpy(),
+        "①수량차이":  roll["수량차이"].to_numpy(),
+        "②단가차이":  roll["단가차이"].to_numpy(),
+        "③환율차이":  roll["환율차이"].to_numpy(),
+    })
+    for col in effect_columns(roll.columns):   # 모델 추가 분해 열 (예: C ①a·①b) — ① 뒤에
+        if EFFECT_LABELS[col] not in tbl_df_data.columns:
+            tbl_df_data.insert(tbl_df_data.columns.get_loc("②단가차이"), EFFECT_LABELS[col],
+                               roll[col].to_numpy())
+    money_c = [c for c in tbl_df_data.columns if c != "그룹"]
+
+    total_row = {"그룹": "【합 계】"}
+    total_row.update(tbl_df_data[money_c].sum().to_dict())
+
+    diff_cols = [c for c in money_c if c not in (f"기준매출 [{bl}]", f"실적매출 [{cl}]")]
+    col_cfg   = money_column_config(tbl_df_data.columns, money_c)
+
+    # 데이터 행 — 컬럼 헤더 클릭 정렬은 브라우저 측, 합계 행은 별도 표로 항상 마지막
     st.dataframe(
-        _style_data(tbl_df),
+        styled_df(tbl_df_data, diff_cols),
         use_container_width=True,
         hide_index=True,
-        height=min(460, max(80, len(tbl_df)*36+40)),
+        height=min(460, max(80, len(tbl_df_data)*36+40)),
+        column_config=col_cfg,
     )
 
     # 합계 행 — 별도 고정 테이블 (정렬 영향 없음)
-    total_df = pd.DataFrame([{
-        k: v for k, v in total_row.items() if k != "_is_total"
-    }])
-
-    def _style_total(df):
-        def color(v):
-            try:
-                fv = float(v)
-                if fv < 0: return "color:#c0392b;font-weight:700"
-                if fv > 0: return "color:#1a7a4a;font-weight:700"
-            except: pass
-            return "font-weight:700"
-        diff_cols = ["총차이(원)", "①수량차이", "②단가차이", "③환율차이"]
-        fmt = {c: "{:,.0f}" for c in money_c}
-        styler = df.style.format(fmt, na_rep="-")
-        for c in df.columns:
-            styler = styler.applymap(
-                (lambda v: color(v)) if c in diff_cols else (lambda v: "font-weight:700"),
-                subset=[c]
-            )
-        return styler
-
     st.dataframe(
-        _style_total(total_df),
+        styled_df(pd.DataFrame([total_row]), diff_cols, base="font-weight:700"),
         use_container_width=True,
         hide_index=True,
         height=70,
+        column_config=col_cfg,
     )
 
     # ③ 선택된 그룹의 품목별 상세
     if selected_drp == "전체 합산":
-        drp_items = all_items_in
+        drp_va = in_list
+        drp_vd = va_detail_src[va_detail_src["그룹"].isin(grp_list)]
+        n_items = int(roll["품목수"].sum())
         clr2 = "#1e293b"
-        title = f"전체 합산 — 품목별 상세 ({len(drp_items)}개)"
+        title = f"전체 합산 — 품목별 상세 ({n_items}개)"
     else:
-        drp_items = grp_map.get(selected_drp, [])
+        drp_va = in_list[in_list["그룹"] == selected_drp]
+        drp_vd = va_detail_src[va_detail_src["그룹"] == selected_drp]
+        n_items = int(roll["품목수"].get(selected_drp, 0))
         clr2 = color_map.get(selected_drp, "#1e40af")
-        title = f"📦 {selected_drp} — 세부 품목 ({len(drp_items)}개)"
+        title = f"📦 {selected_drp} — 세부 품목 ({n_items}개)"
 
-    if drp_items:
+    if n_items:
         st.markdown(
             f'<div style="background:{clr2};border-radius:7px;padding:6px 14px;'
             f'color:white;font-size:0.82rem;font-weight:700;margin:8px 0 6px 0;">'
             f'{title}</div>',
             unsafe_allow_html=True)
-        drp_va = va_src[va_src["품목명"].isin(drp_items)]
-        drp_vd = va_detail_src[va_detail_src["품목명"].isin(drp_items)]
         dtbl, dmc = build_table(
             drp_vd if show_detail else drp_va,
-            base_label, curr_label, show_detail)
-        _show_split_table(dtbl, dmc)
+            bl, cl, show_detail)
+        _show_split_table(dtbl, dmc, key=f"{sel_key}_tbl")
 
 
 # ── va_disp_total 항상 정의 (다운로드용) ─────────────────────────────────────
+_rec_tables = start_stage("app.tables", rows=len(va_filtered))   # 표 생성·스타일링 (품목계정 탭 포함)
 va_disp_total, money_cols = build_table(
     va_detail_filtered if show_detail else va_filtered,
     base_label, curr_label, show_detail)
 
+@st.fragment
+def _main_group_fragment():
+    """커스텀 그룹 표 + 드릴다운 — 드릴다운 변경 시 이 블록만 다시 실행."""
+    view = st.session_state[_VIEW_KEY]
+    _render_group_section(view["selected_groups"], view["grp_colors"],
+                          view["va"], view["vd"], "drp_main")
+
+
+@st.fragment
+def _main_table_fragment(tbl, mc):
+    """커스텀 그룹 없을 때 품목 표 — 검색·정렬·페이지 이동 시 이 블록만 다시 실행."""
+    _show_split_table(tbl, mc, key="tbl_main")
+
+
 if has_custom and selected_groups:
-    grp_colors = {
-        gn: GROUP_COLORS[i % len(GROUP_COLORS)][0]
-        for i, gn in enumerate(list(groups.keys()))
-        if gn != "미분류"
-    }
-    sel_grp_map = {gn: [i for i in groups.get(gn, []) if i in selected_items]
-                   for gn in selected_groups}
-    _render_group_section(selected_groups, sel_grp_map, grp_colors,
-                          va_filtered, va_detail_filtered, "drp_main")
+    _main_group_fragment()
 else:
-    _show_split_table(va_disp_total, money_cols)
+    _main_table_fragment(va_disp_total, money_cols)
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 품목계정 분류별 차이 분석 (제품 / 상품 / 기타)
 # — 각 탭 안에서 커스텀 그룹 단위로 표시, 세부 품목은 드롭다운
 # ══════════════════════════════════════════════════════════════════════════════
-if "품목계정_분류" in df_all.columns:
+@st.fragment
+def _account_fragment():
+    """품목계정 KPI 카드 + 분류 탭 — 탭 안의 드릴다운 변경 시 이 블록만 다시 실행."""
+    view = st.session_state[_VIEW_KEY]
+    va_filtered, va_detail_filtered = view["va"], view["vd"]
+    base_label, curr_label, show_detail = view["base_label"], view["curr_label"], view["show_detail"]
+    has_custom, selected_groups = view["has_custom"], view["selected_groups"]
+
     st.markdown('<div class="section-header">🗂️ 품목계정별 차이 분석</div>', unsafe_allow_html=True)
     st.caption("제품 / 상품 / 기타(원재료·부재료·제조-수선비) 기준 집계 — 각 탭은 커스텀 그룹 단위로 표시")
 
-    acct_map = (
-        df_all[["품목명", "품목계정_분류"]]
-        .drop_duplicates(subset=["품목명"])
-        .set_index("품목명")["품목계정_분류"].to_dict()
-    )
-    ACCT_CATS   = ["제품", "상품", "기타"]
-    ACCT_COLORS = {"제품": "#1e40af", "상품": "#065f46", "기타": "#7c3aed"}
+    ACCT_COLORS   = {"제품": "#1e40af", "상품": "#065f46", "기타": "#7c3aed"}
+    acct_sum_cols = ["매출0", "매출1", "총차이", "수량차이", "단가차이", "환율차이"]
+
+    # [품목계정_분류 × 그룹] 롤업 1회 — KPI 카드와 네 개 탭이 모두 이 결과를 읽음
+    acct_pivot = account_group_pivot(va_filtered)
+    acct_tot   = (acct_pivot.groupby("품목계정_분류", observed=False)[acct_sum_cols].sum()
+                            .reindex(ACCT_CATS, fill_value=0))
 
     # ── KPI 카드 (제품/상품/기타 합산) ────────────────────────────────────────
     acct_cols = st.columns(3)
     for ci, cat in enumerate(ACCT_CATS):
-        cat_items = [i for i in selected_items if acct_map.get(i,"기타") == cat]
-        sub  = va_filtered[va_filtered["품목명"].isin(cat_items)]
-        c_b  = sub["매출0"].sum(); c_c = sub["매출1"].sum()
-        c_d  = sub["총차이"].sum()
-        c_q  = sub["수량차이"].sum(); c_p = sub["단가차이"].sum(); c_f = sub["환율차이"].sum()
+        c_b, c_c, c_d, c_q, c_p, c_f = acct_tot.loc[cat, acct_sum_cols]
         clr  = ACCT_COLORS[cat]
         d_s  = "▲ +" if c_d >= 0 else "▼ "
         d_cl = "#16a34a" if c_d >= 0 else "#dc2626"
@@ -559,201 +562,414 @@ if "품목계정_분류" in df_all.columns:
 
     # ── 탭별 커스텀 그룹 테이블 ────────────────────────────────────────────────
     acct_tab_list = st.tabs(["전체"] + ACCT_CATS)
+    grp_colors_acct = view["grp_colors"]
 
     for ti, cat_label in enumerate(["전체"] + ACCT_CATS):
         with acct_tab_list[ti]:
             if cat_label == "전체":
-                tab_items = selected_items
+                tab_va, tab_vd = va_filtered, va_detail_filtered
+                tab_roll = None
             else:
-                tab_items = [i for i in selected_items if acct_map.get(i,"기타") == cat_label]
+                tab_va   = va_filtered[va_filtered["품목계정_분류"] == cat_label]
+                tab_vd   = va_detail_filtered[va_detail_filtered["품목계정_분류"] == cat_label]
+                tab_roll = acct_pivot[acct_pivot["품목계정_분류"] == cat_label]
 
-            if not tab_items:
+            if tab_va.empty:
                 st.info(f"{cat_label} 분류의 데이터가 없습니다.")
                 continue
 
             if has_custom and selected_groups:
-                # 커스텀 그룹 단위로 표시
-                # 해당 탭 품목이 속한 그룹만 추려서 표시
-                tab_grp_map = {}
-                for gn in selected_groups:
-                    grp_tab_items = [i for i in groups.get(gn,[]) if i in tab_items]
-                    if grp_tab_items:
-                        tab_grp_map[gn] = grp_tab_items
-                tab_grp_list = list(tab_grp_map.keys())
-
-                grp_colors_acct = {
-                    gn: GROUP_COLORS[i % len(GROUP_COLORS)][0]
-                    for i, gn in enumerate(list(groups.keys()))
-                    if gn != "미분류"
-                }
-                tab_va  = va_filtered[va_filtered["품목명"].isin(tab_items)]
-                tab_vd  = va_detail_filtered[va_detail_filtered["품목명"].isin(tab_items)]
-                _render_group_section(tab_grp_list, tab_grp_map, grp_colors_acct,
-                                     tab_va, tab_vd, f"drp_acct_{cat_label}")
+                # 커스텀 그룹 단위로 표시 — 해당 탭 품목이 속한 그룹만 (선택 순서 유지)
+                tab_present  = set(tab_va["그룹"].unique()) if tab_roll is None \
+                               else set(tab_roll["그룹"])
+                tab_grp_list = [gn for gn in selected_groups if gn in tab_present]
+                _render_group_section(tab_grp_list, grp_colors_acct,
+                                     tab_va, tab_vd, f"drp_acct_{cat_label}",
+                                     roll=tab_roll)
             else:
                 # 커스텀 그룹 없으면 품목명 단위 테이블
-                sub_va = va_filtered[va_filtered["품목명"].isin(tab_items)].copy()
-                sub_vd = va_detail_filtered[va_detail_filtered["품목명"].isin(tab_items)].copy()
-                tbl, mc = build_table(sub_vd if show_detail else sub_va,
+                tbl, mc = build_table(tab_vd if show_detail else tab_va,
                                       base_label, curr_label, show_detail)
-                _show_split_table(tbl, mc)
+                _show_split_table(tbl, mc, key=f"tbl_acct_{cat_label}")
 
 
+if "품목계정_분류" in df_all.columns:
+    _account_fragment()
+
+end_stage(_rec_tables)
+
 # ══════════════════════════════════════════════════════════════════════════════
 # 시각화
 # ══════════════════════════════════════════════════════════════════════════════
 st.markdown('<div class="section-header">📊 차이 구성 요소 시각화</div>', unsafe_allow_html=True)
 
-try:
-    import plotly.graph_objects as go
+@st.fragment
+def _charts_fragment():
+    """Waterfall·품목별 막대 탭 — 다른 블록의 상호작용 시 다시 그리지 않음."""
+    view = st.session_state[_VIEW_KEY]
+    va_filtered, va_detail_filtered = view["va"], view["vd"]
+    base_label, curr_label = view["base_label"], view["curr_label"]
+    notes, accent_color = MODELS[view["model"]]["notes"], view["accent_color"]
+    has_custom, selected_groups = view["has_custom"], view["selected_groups"]
+    selected_items = view["selected_items"]
+    t = view["totals"]
+    total_base, total_curr, total_diff = t["base"], t["curr"], t["diff"]
+    qty_v, price_v, fx_v = t["qty"], t["price"], t["fx"]
+
+    try:
+        import plotly.graph_objects as go
+
+        tab_wf, tab_bar = st.tabs(["🌊 Waterfall (전체 합산)", "📊 품목별 총차이"])
+
+        with tab_wf:
+            # ── 분석 대상 그룹 표시 배너 ─────────────────────────────────────────
+            if has_custom and selected_groups:
+                grp_tags = "  ".join(
+                    f'<span style="display:inline-block;background:{GROUP_COLORS[i % len(GROUP_COLORS)][0]};'
+                    f'color:white;border-radius:12px;padding:2px 10px;font-size:0.75rem;margin:2px;">'
+                    f'📦 {gn}</span>'
+                    for i, gn in enumerate(selected_groups)
+                )
+                st.markdown(
+                    f'<div style="background:var(--background-color,#f8fafc);border:0.5px solid #e2e8f0;'
+                    f'border-radius:8px;padding:8px 14px;margin-bottom:6px;font-size:0.8rem;color:#64748b;">'
+                    f'<b>분석 대상 그룹:</b>&nbsp;&nbsp;{grp_tags}</div>',
+                    unsafe_allow_html=True)
+            else:
+                st.caption(f"분석 대상: 전체 품목 {len(selected_items)}개")
+
+            fig_wf = render_waterfall(total_base, qty_v, price_v, fx_v,
+                                      total_curr, base_label, curr_label, accent_color)
+            st.plotly_chart(fig_wf, use_container_width=True)
+
+            with st.expander("🔢 Waterfall 계산 근거 데이터", expanded=False):
+                sign = lambda v: f"+{v:,.0f}" if v >= 0 else f"{v:,.0f}"
+                pct  = lambda v, base: f"({v/base*100:+.1f}%)" if base != 0 else ""
+
+                calc_rows = [
+                    {"구분": "기준 매출",   "금액 (원)": f"{total_base:,.0f}",
+                     "설명": f"{base_label} 원화매출 합계", "비고": ""},
+                    {"구분": "① 수량 차이", "금액 (원)": sign(qty_v),
+                     "설명": "수량 변동에 의한 매출 증감",
+                     "비고": notes["수량차이"]},
+                    {"구분": "② 단가 차이", "금액 (원)": sign(price_v),
+                     "설명": "단가 변동에 의한 매출 증감",
+                     "비고": notes["단가차이"]},
+                    {"구분": "③ 환율 차이", "금액 (원)": sign(fx_v),
+                     "설명": "환율 변동에 의한 매출 증감",
+                     "비고": notes["환율차이"]},
+                    {"구분": "실적 매출",   "금액 (원)": f"{total_curr:,.0f}",
+                     "설명": f"{curr_label} 원화매출 합계", "비고": ""},
+                    {"구분": "▶ 총 차이",   "금액 (원)": sign(total_diff),
+                     "설명": f"실적−기준 {pct(total_diff, total_base)}",
+                     "비고": "①+②+③ = 총차이 검증"},
+                ]
+                calc_df = pd.DataFrame(calc_rows)
+                check   = abs((qty_v + price_v + fx_v) - total_diff) < 1
+                st.markdown(
+                    f'<div style="background:{"#d4edda" if check else "#f8d7da"};border-radius:6px;'
+                    f'padding:7px 14px;font-size:0.8rem;font-weight:700;'
+                    f'color:{"#155724" if check else "#721c24"};margin-bottom:8px;">'
+                    f'{"✅ 항등식 검증 통과: ①+②+③ = 총차이 (" + sign(qty_v+price_v+fx_v) + "원)" if check else "⚠️ 항등식 오차 발생"}'
+                    f'</div>', unsafe_allow_html=True)
+                st.dataframe(calc_df, use_container_width=True, hide_index=True)
+
+                # 품목×환종 상세
+                st.markdown("**품목별 구성요소 상세 (환종 분리)**")
+                st.caption("KRW행: 원화단가만 표시 / USD행: 외화단가·환율 표시")
+                # 항등식 검증 — models.identity_diagnostics() 벡터 패스 1회 (행 단위 콜백 없음)
+                diag, dsum = identity_diagnostics(va_detail_filtered, view["model"])
+                st.caption(
+                    f"진단: {dsum['rows']:,}행 — 잔차 흡수 {dsum['absorbed_rows']:,}행 "
+                    f"(Σ {dsum['absorbed_total']:+,.0f}원, 최대 {dsum['max_abs_residual']:,.0f}원) · "
+                    f"환율 결측/이상 {dsum['bad_er_rows']:,}행 · "
+                    f"외화금액 대체(Q×P_fx) {dsum['fx_imputed_rows']:,}행 · "
+                    f"항등식 실패 {dsum['identity_failures']:,}행")
+                only_flagged = dsum["flagged_rows"] > 0 and st.toggle(
+                    f"진단 대상 행만 보기 ({dsum['flagged_rows']:,}행)", key="wf_diag_only")
+
+                dr = va_detail_filtered.copy()
+                dr["검증"] = "✅"
+                failed = diag["항등식실패"].to_numpy()
+                if failed.any():   # 오차 행만 문자열 포맷
+                    dr.loc[failed, "검증"] = [f"⚠️ {v:+,.0f}" for v in diag["항등식오차"].to_numpy()[failed]]
+                if only_flagged:
+                    flag_cols = ["잔차흡수", "환율이상0", "환율이상1",
+                                 "외화금액대체0", "외화금액대체1", "항등식실패"]
+                    dr = dr[diag[flag_cols].to_numpy().any(axis=1)]
+                krw_mask = dr["is_krw"] == True
+                for col_name in ["P0_fx","P1_fx","ER0","ER1"]:
+                    if col_name in dr.columns:
+                        dr.loc[krw_mask, col_name] = np.nan
+
+                col_map = [("품목명","품목명"),("환종","환종"),("매출1","실적매출(원)"),
+                           ("Q1","실적수량"),("P1_krw","실적단가(원화)"),("P1_fx","실적단가(외화)"),
+                           ("ER1","실적환율"),("매출0","기준매출(원)"),("Q0","기준수량"),
+                           ("P0_krw","기준단가(원화)"),("P0_fx","기준단가(외화)"),("ER0","기준환율"),
+                           ("총차이","총차이(원)"),
+                           *[(c, f"{EFFECT_LABELS[c]}(원)") for c in effect_columns(dr.columns)],
+                           ("검증","검증")]
+                seen, sel_src, sel_dst = set(), [], []
+                for src, dst in col_map:
+                    if src in dr.columns and src not in seen:
+                        seen.add(src); sel_src.append(src); sel_dst.append(dst)
+                detail_df = dr[sel_src].rename(columns=dict(zip(sel_src, sel_dst)))
+                for c in ("품목명", "환종"):   # 범주형 → 문자열 (검색·합계 행 라벨용)
+                    if c in detail_df.columns:
+                        detail_df[c] = detail_df[c].astype(str)
+
+                str_cols   = {"품목명","환종","검증"}
+                num_cols_d = [c for c in detail_df.columns
+                              if c not in str_cols and pd.api.types.is_numeric_dtype(detail_df[c])]
+                sum_target = [c for c in num_cols_d if not any(kw in c for kw in ["단가","환율"])]
+                total_row  = {c: "" for c in detail_df.columns}
+                total_row.update(detail_df[sum_target].sum().to_dict())
+                total_row["품목명"] = "【합 계】"
+                for c in num_cols_d:
+                    if c not in sum_target:
+                        total_row[c] = np.nan
+
+                # 단가·환율은 소수 2자리, 나머지 숫자 열은 정수 — column_config 포맷
+                dec_cfg = {c: (2 if any(kw in c for kw in ["단가","환율"]) else 0)
+                           for c in num_cols_d}
+                cfg_d   = money_column_config(detail_df.columns, [], decimals=dec_cfg)
+                page_d  = paginate(detail_df, "tbl_wf_detail", search_cols=("품목명", "환종"))
+                st.dataframe(
+                    page_d, use_container_width=True, hide_index=True, column_config=cfg_d,
+                )
+                st.dataframe(
+                    styled_df(pd.DataFrame([total_row])[detail_df.columns], [],
+                              base="font-weight:700"),
+                    use_container_width=True, hide_index=True, height=76, column_config=cfg_d,
+                )
+
+        with tab_bar:
+            va_bar     = va_filtered.set_index("품목명")["총차이"].sort_values()
+            bar_colors = ["#e74c3c" if v < 0 else "#27ae60" for v in va_bar.values]
+            bar_text   = [f"▼ {v:,.0f}" if v < 0 else (f"▲ +{v:,.0f}" if v > 0 else f"{v:,.0f}")
+                          for v in va_bar.values]
+            fig_bar = go.Figure(go.Bar(
+                x=va_bar.values, y=va_bar.index, orientation="h",
+                marker_color=bar_colors,
+                marker_line=dict(color=["#b03a2e" if v<0 else "#1e8449" for v in va_bar.values], width=1),
+                text=bar_text, textposition="outside",
+                textfont=dict(size=12, color="#0d1f3c", family="Malgun Gothic, AppleGothic, sans-serif"),
+            ))
+            fig_bar.update_layout(
+                title_text="품목별 총 매출 차이", title_font_size=14, title_x=0.01,
+                height=max(380, len(va_bar)*40),
+                margin=dict(l=10, r=140, t=50, b=30),
+                plot_bgcolor="#fafbfd", paper_bgcolor="#ffffff",
+                font=dict(family="Malgun Gothic, AppleGothic, sans-serif"),
+                xaxis=dict(title="원화 매출 차이 (₩)", gridcolor="#e8ecf3",
+                           zeroline=True, zerolinecolor="#5a6a85", zerolinewidth=2),
+                yaxis=dict(tickfont=dict(size=12, color="#0d1f3c"), automargin=True),
+            )
+            st.plotly_chart(fig_bar, use_container_width=True)
 
-    tab_wf, tab_bar = st.tabs(["🌊 Waterfall (전체 합산)", "📊 품목별 총차이"])
+    except ImportError:
+        st.info("plotly가 설치되지 않아 차트를 표시할 수 없습니다.")
 
-    with tab_wf:
-        # ── 분석 대상 그룹 표시 배너 ─────────────────────────────────────────
-        if has_custom and selected_groups:
-            grp_tags = "  ".join(
-                f'<span style="display:inline-block;background:{GROUP_COLORS[i % len(GROUP_COLORS)][0]};'
-                f'color:white;border-radius:12px;padding:2px 10px;font-size:0.75rem;margin:2px;">'
-                f'📦 {gn}</span>'
-                for i, gn in enumerate(selected_groups)
-            )
-            st.markdown(
-                f'<div style="background:var(--background-color,#f8fafc);border:0.5px solid #e2e8f0;'
-                f'border-radius:8px;padding:8px 14px;margin-bottom:6px;font-size:0.8rem;color:#64748b;">'
-                f'<b>분석 대상 그룹:</b>&nbsp;&nbsp;{grp_tags}</div>',
-                unsafe_allow_html=True)
-        else:
-            st.caption(f"분석 대상: 전체 품목 {len(selected_items)}개")
-
-        fig_wf = render_waterfall(total_base, qty_v, price_v, fx_v,
-                                  total_curr, base_label, curr_label, accent_color)
-        st.plotly_chart(fig_wf, use_container_width=True)
-
-        with st.expander("🔢 Waterfall 계산 근거 데이터", expanded=False):
-            sign = lambda v: f"+{v:,.0f}" if v >= 0 else f"{v:,.0f}"
-            pct  = lambda v, base: f"({v/base*100:+.1f}%)" if base != 0 else ""
-
-            calc_rows = [
-                {"구분": "기준 매출",   "금액 (원)": f"{total_base:,.0f}",
-                 "설명": f"{base_label} 원화매출 합계", "비고": ""},
-                {"구분": "① 수량 차이", "금액 (원)": sign(qty_v),
-                 "설명": "수량 변동에 의한 매출 증감",
-                 "비고": "기준단가×수량변화" if is_model_A else "실적/기준단가×수량변화"},
-                {"구분": "② 단가 차이", "금액 (원)": sign(price_v),
-                 "설명": "단가 변동에 의한 매출 증감",
-                 "비고": "(P실적−P기준)×Q실적×ER기준" if is_model_A else "총차이−①−③"},
-                {"구분": "③ 환율 차이", "금액 (원)": sign(fx_v),
-                 "설명": "환율 변동에 의한 매출 증감",
-                 "비고": "(ER실적−ER기준)×Q실적×P실적_fx" if is_model_A else "4-Case 분기"},
-                {"구분": "실적 매출",   "금액 (원)": f"{total_curr:,.0f}",
-                 "설명": f"{curr_label} 원화매출 합계", "비고": ""},
-                {"구분": "▶ 총 차이",   "금액 (원)": sign(total_diff),
-                 "설명": f"실적−기준 {pct(total_diff, total_base)}",
-                 "비고": "①+②+③ = 총차이 검증"},
-            ]
-            calc_df = pd.DataFrame(calc_rows)
-            check   = abs((qty_v + price_v + fx_v) - total_diff) < 1
-            st.markdown(
-                f'<div style="background:{"#d4edda" if check else "#f8d7da"};border-radius:6px;'
-                f'padding:7px 14px;font-size:0.8rem;font-weight:700;'
-                f'color:{"#155724" if check else "#721c24"};margin-bottom:8px;">'
-                f'{"✅ 항등식 검증 통과: ①+②+③ = 총차이 (" + sign(qty_v+price_v+fx_v) + "원)" if check else "⚠️ 항등식 오차 발생"}'
-                f'</div>', unsafe_allow_html=True)
-            st.dataframe(calc_df, use_container_width=True, hide_index=True)
-
-            # 품목×환종 상세
-            st.markdown("**품목별 구성요소 상세 (환종 분리)**")
-            st.caption("KRW행: 원화단가만 표시 / USD행: 외화단가·환율 표시")
-            dr = va_detail_filtered.copy()
-            dr["검증"] = dr.apply(
-                lambda r: "✅" if abs(
-                    round(r["수량차이"]+r["단가차이"]+r["환율차이"]) - round(r["총차이"])
-                ) < 1 else f"⚠️ {round(r['수량차이']+r['단가차이']+r['환율차이'])-round(r['총차이']):+,.0f}",
-                axis=1
-            )
-            krw_mask = dr["is_krw"] == True
-            for col_name in ["P0_fx","P1_fx","ER0","ER1"]:
-                if col_name in dr.columns:
-                    dr.loc[krw_mask, col_name] = np.nan
-
-            col_map = [("품목명","품목명"),("환종","환종"),("매출1","실적매출(원)"),
-                       ("Q1","실적수량"),("P1_krw","실적단가(원화)"),("P1_fx","실적단가(외화)"),
-                       ("ER1","실적환율"),("매출0","기준매출(원)"),("Q0","기준수량"),
-                       ("P0_krw","기준단가(원화)"),("P0_fx","기준단가(외화)"),("ER0","기준환율"),
-                       ("총차이","총차이(원)"),("수량차이","①수량차이(원)"),
-                       ("단가차이","②단가차이(원)"),("환율차이","③환율차이(원)"),("검증","검증")]
-            seen, sel_src, sel_dst = set(), [], []
-            for src, dst in col_map:
-                if src in dr.columns and src not in seen:
-                    seen.add(src); sel_src.append(src); sel_dst.append(dst)
-            detail_df = dr[sel_src].rename(columns=dict(zip(sel_src, sel_dst)))
-
-            str_cols   = {"품목명","환종","검증"}
-            num_cols_d = [c for c in detail_df.columns
-                          if c not in str_cols and pd.api.types.is_numeric_dtype(detail_df[c])]
-            sidx = len(detail_df)
-            detail_df.loc[sidx, "품목명"] = "【합 계】"
-            detail_df.loc[sidx, "환종"]   = ""
-            detail_df.loc[sidx, "검증"]   = ""
-            sum_target = [c for c in num_cols_d if not any(kw in c for kw in ["단가","환율"])]
-            for c in sum_target:
-                detail_df.loc[sidx, c] = detail_df[c].iloc[:sidx].sum()
-
-            fmt = {c: ("{:,.2f}" if any(kw in c for kw in ["단가","환율"]) else "{:,.0f}")
-                   for c in num_cols_d}
-
-            def row_style(row):
-                if row.get("품목명","") == "【합 계】":
-                    return ["font-weight:700"] * len(row)
-                return [""] * len(row)
-
-            st.dataframe(
-                detail_df.style.format(fmt, na_rep="-").apply(row_style, axis=1),
-                use_container_width=True, hide_index=True,
-            )
 
-    with tab_bar:
-        va_bar     = va_filtered.set_index("품목명")["총차이"].sort_values()
-        bar_colors = ["#e74c3c" if v < 0 else "#27ae60" for v in va_bar.values]
-        bar_text   = [f"▼ {v:,.0f}" if v < 0 else (f"▲ +{v:,.0f}" if v > 0 else f"{v:,.0f}")
-                      for v in va_bar.values]
-        fig_bar = go.Figure(go.Bar(
-            x=va_bar.values, y=va_bar.index, orientation="h",
-            marker_color=bar_colors,
-            marker_line=dict(color=["#b03a2e" if v<0 else "#1e8449" for v in va_bar.values], width=1),
-            text=bar_text, textposition="outside",
-            textfont=dict(size=12, color="#0d1f3c", family="Malgun Gothic, AppleGothic, sans-serif"),
-        ))
-        fig_bar.update_layout(
-            title_text="품목별 총 매출 차이", title_font_size=14, title_x=0.01,
-            height=max(380, len(va_bar)*40),
-            margin=dict(l=10, r=140, t=50, b=30),
-            plot_bgcolor="#fafbfd", paper_bgcolor="#ffffff",
-            font=dict(family="Malgun Gothic, AppleGothic, sans-serif"),
-            xaxis=dict(title="원화 매출 차이 (₩)", gridcolor="#e8ecf3",
-                       zeroline=True, zerolinecolor="#5a6a85", zerolinewidth=2),
-            yaxis=dict(tickfont=dict(size=12, color="#0d1f3c"), automargin=True),
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+with stage("app.charts"):
+    _charts_fragment()
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 월별 차이 추이 — 최근 12~36개월 각 실적월의 ①②③ (전월 / 전년 동월 대비)
+# ══════════════════════════════════════════════════════════════════════════════
+st.markdown('<div class="section-header">📉 월별 차이 추이</div>', unsafe_allow_html=True)
+
+_TREND_STEP_LABELS = {"MoM": "전월 대비", "YoY": "전년 동월 대비"}
+
+
+@st.fragment
+def _trend_fragment():
+    """월별 추이 차트 — 비교 방식·기간 변경 시 이 블록만 다시 실행 (run_trend 캐시)."""
+    view = st.session_state[_VIEW_KEY]
+    c_step, c_n, _ = st.columns([2, 1.3, 3])
+    step = c_step.radio("비교 방식", list(_TREND_STEP_LABELS), horizontal=True,
+                        format_func=_TREND_STEP_LABELS.get, key="trend_step")
+    n    = c_n.selectbox("기간", [12, 24, 36], format_func=lambda v: f"최근 {v}개월",
+                         key="trend_n")
+
+    # 선택 품목 기준 — 월별 집계는 누적합 인덱스에서 월당 1회, 모든 월 쌍을 한 번에 분해
+    trend = run_trend(view["fingerprint"], view["curr_end"], n, step,
+                      view["model"],
+                      tuple(sorted(map(str, view["selected_items"]))),
+                      view["month_index"], exact=view["exact"],
+                      groups=view["post_groups"], options=view["post_opts"])
+    if trend.empty:
+        st.info("비교할 기준월 데이터가 없습니다.")
+        return
+
+    ym = lambda o: "{}-{:02d}".format(*ord_to_ym(int(o)))
+    labels = [ym(o) for o in trend["실적월"]]
+    try:
+        title = (f"월별 차이 구성 ({_TREND_STEP_LABELS[step]})  |  "
+                 f"{labels[0]} ~ {labels[-1]}  |  {MODELS[view['model']]['short']}")
+        st.plotly_chart(render_trend_chart(trend, labels, title), use_container_width=True)
+    except ImportError:
+        st.info("plotly가 설치되지 않아 차트를 표시할 수 없습니다.")
+
+    with st.expander("🔢 월별 추이 데이터", expanded=False):
+        tbl = pd.DataFrame({
+            "실적월": labels, "기준월": [ym(o) for o in trend["기준월"]],
+            "기준매출(원)": trend["매출0"], "실적매출(원)": trend["매출1"],
+            "총차이(원)": trend["총차이"],
+            **{f"{EFFECT_LABELS[c]}(원)": trend[c] for c in effect_columns(trend.columns)},
+            "품목수": trend["품목수"],
+        })
+        money = [c for c in tbl.columns if c.endswith("(원)")]
+        st.dataframe(styled_df(tbl, money[2:]), use_container_width=True, hide_index=True,
+                     column_config=money_column_config(tbl.columns, money))
+
+
+with stage("app.trend"):
+    _trend_fragment()
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 매출처별 차이 분석 — 사이드바 '매출처별 분석'을 켰을 때만
+# ══════════════════════════════════════════════════════════════════════════════
+_CUSTOMER_VIEWS = {
+    "매출처별":      ("매출처명",),
+    "매출처 × 그룹": ("매출처명", "그룹"),
+    "그룹별":        ("그룹",),
+    "품목계정별":    ("품목계정_분류",),
+    "품목별":        ("품목명",),
+}
+
+
+@st.fragment
+def _customer_fragment():
+    """매출처 롤업 표 + 매출처 드릴다운 — 미리 계산된 grouping sets만 읽음 (클릭 시 재계산 없음)."""
+    view = st.session_state[_VIEW_KEY]
+    sets = view["customer_sets"]
+    bl, cl = view["base_label"], view["curr_label"]
+    st.caption("매출처 × 품목 × 환종 단위로 분해한 뒤 합산 — ①②③은 매출처별 단가·환율 기준이므로 "
+               "품목 단위 분석의 ①②③과 다를 수 있음 (매출·총차이는 동일)")
+
+    opts = [k for k, keys in _CUSTOMER_VIEWS.items() if keys in sets]
+    by   = st.radio("집계 기준", opts, horizontal=True, key="cust_by")
+    keys = _CUSTOMER_VIEWS[by]
+    tbl, mc = build_rollup_table(sets[keys], list(keys), bl, cl)
+    _show_split_table(tbl, mc, key=f"tbl_cust_{'_'.join(keys)}", label_col=keys[0])
 
-except ImportError:
-    st.info("plotly가 설치되지 않아 차트를 표시할 수 없습니다.")
+    # 매출처 드릴다운 — [매출처 × 품목] 롤업에서 행 선택만 (총차이 감소 큰 순)
+    cust  = sets[("매출처명",)].sort_values("총차이")["매출처명"].astype(str).tolist()
+    pick  = st.selectbox("매출처 드릴다운 — 품목별 상세", ["(선택 안 함)"] + cust, key="cust_drill")
+    if pick != "(선택 안 함)":
+        ci = sets[("매출처명", "품목명")]
+        d_tbl, d_mc = build_rollup_table(ci[ci["매출처명"] == pick], ["품목명"], bl, cl)
+        _show_split_table(d_tbl, d_mc, key="tbl_cust_drill")
+
+
+if customer_sets is not None:
+    st.markdown('<div class="section-header">👥 매출처별 차이 분석</div>', unsafe_allow_html=True)
+    with stage("app.customer"):
+        _customer_fragment()
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 다중 기준 비교 — 실적 기간 vs 현재 기준 + 계획 / 전년 동기 / 직전 기간
+# ══════════════════════════════════════════════════════════════════════════════
+st.markdown('<div class="section-header">🧭 다중 기준 비교</div>', unsafe_allow_html=True)
+
+
+def _multi_baseline(view: dict):
+    """선택 품목 기준 다중 기준 결과 — 실적 집계 1회 + 기준별 merge (run_multi_baseline 캐시)."""
+    multi = run_multi_baseline(view["fingerprint"], view["curr_period"], view["baselines"],
+                               view["model"], view["month_index"],
+                               view["plan_fingerprint"], view["plan_index"], exact=view["exact"],
+                               groups=view["post_groups"], options=view["post_opts"])
+    return multi[multi["품목명"].isin(view["selected_items"])]
+
+
+@st.fragment
+def _multi_fragment():
+    """기준별 요약 + 품목별 나란히 비교표 — 분해 표시·검색·페이지 조작 시 이 블록만 다시 실행."""
+    view = st.session_state[_VIEW_KEY]
+    if len(view["baselines"]) < 2:
+        st.info("👈 사이드바 **다중 기준 비교**에서 계획·전년 동기·직전 기간을 선택하면 "
+                "현재 기준과 나란히 비교합니다. (계획은 ERP와 같은 열 구성의 파일 업로드)")
+        return
+
+    multi  = _multi_baseline(view)
+    labels = [b[0] for b in view["baselines"]]
+    cl     = view["curr_label"]
+
+    # 기준별 요약 — 행 = 기준
+    effect_cols = effect_columns(multi.columns)   # ①②③ + 모델 추가 분해 열 (예: C ①a·①b)
+    tot = (multi.groupby("기준", observed=False)[["매출0", "매출1", "총차이", *effect_cols]]
+                .sum().reindex(labels, fill_value=0))
+    r0 = tot["매출0"].to_numpy(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(r0 != 0, tot["매출1"].to_numpy(float) / r0 * 100, np.nan)
+    summary = pd.DataFrame({
+        "기준": labels,
+        "기준매출(원)": tot["매출0"].to_numpy(), f"실적매출(원) [{cl}]": tot["매출1"].to_numpy(),
+        "총차이(원)": tot["총차이"].to_numpy(),
+        **{EFFECT_LABELS[c]: tot[c].to_numpy() for c in effect_cols},
+        "실적/기준(%)": rate,
+    })
+    money = [c for c in summary.columns if c not in ("기준", "실적/기준(%)")]
+    st.dataframe(styled_df(summary, money[2:]), use_container_width=True, hide_index=True,
+                 column_config=money_column_config(summary.columns, money,
+                                                   decimals={"실적/기준(%)": 1}))
+    plan_labels = [b[0] for b in view["baselines"] if b[1] == "plan"]
+    if plan_labels and tot.loc[plan_labels[0], "매출0"] == 0:
+        st.caption("⚠️ 계획 파일에 실적 기간(선택 품목)의 매출이 없습니다.")
+
+    effects = st.toggle("①②③ 분해 열 표시", value=False, key="multi_effects")
+    tbl, mc = build_multi_table(baseline_matrix(multi), labels, cl, effects)
+    _show_split_table(tbl, mc, key="tbl_multi")
+
+
+with stage("app.multi_baseline"):
+    _multi_fragment()
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 다운로드
 # ══════════════════════════════════════════════════════════════════════════════
 st.markdown('<div class="section-header">⬇️ 결과 다운로드</div>', unsafe_allow_html=True)
 
-def to_excel_bytes(df):
+def to_excel_bytes(sheets: dict):
+    """{시트명: DataFrame} → xlsx bytes."""
     buf = BytesIO()
     with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="차이분석")
+        for name, df in sheets.items():
+            df.to_excel(writer, index=False, sheet_name=name)
     return buf.getvalue()
 
-period_mode_label = "YoY" if "전년" in period_mode else "MoM"
-model_label       = "A_원인별임팩트" if is_model_A else "B_활동별증분"
-excel_bytes       = to_excel_bytes(va_disp_total.reset_index(drop=True))
+
+def _ab_compare_table(items):
+    """등록 커널(A·B …) 분해를 품목별로 나란히 — run_variance_ab 캐시 재사용 (재계산 없음)."""
+    m_ab = run_variance_ab(ctx["fingerprint"], ctx["base_period"], ctx["curr_period"],
+                           ctx["month_index"], exact=ctx["exact"])
+    ab = summarize_ab(m_ab[m_ab["품목명"].isin(items)])
+    effect = {f"{c}_{k}": f"{EFFECT_LABELS[c]} {k}"
+              for k in kernel_codes() for c in ("수량차이", "단가차이", "환율차이")}
+    ab = ab[["품목명", "매출0", "매출1", "총차이", *effect]].copy()
+    ab["품목명"] = ab["품목명"].astype(str)
+    return ab.rename(columns={
+        "매출0": f"기준매출(원) [{base_label}]", "매출1": f"실적매출(원) [{curr_label}]",
+        "총차이": "총차이(원)", **effect,
+    })
+
+period_mode_label = ctx["period_code"]
+model_label       = model_spec["export"]
+with stage("app.excel_export", rows=len(va_disp_total)):
+    sheets = {
+        "차이분석":      va_disp_total.reset_index(drop=True),
+        f"모델{'·'.join(kernel_codes())} 비교": _ab_compare_table(selected_items),
+    }
+    if len(ctx["baselines"]) > 1:   # 다중 기준 비교 — 화면과 같은 캐시 결과, ①②③ 포함
+        sheets["다중 기준 비교"] = build_multi_table(
+            baseline_matrix(_multi_baseline(st.session_state[_VIEW_KEY])),
+            [b[0] for b in ctx["baselines"]], curr_label)[0]
+    if customer_sets is not None:   # 매출처별 — 미리 계산된 롤업 그대로
+        for name, keys in (("매출처별", ("매출처명",)), ("매출처×품목", ("매출처명", "품목명"))):
+            sheets[name] = build_rollup_table(customer_sets[keys], list(keys),
+                                              base_label, curr_label)[0]
+    excel_bytes = to_excel_bytes(sheets)
 st.download_button(
     label="📥 분석 결과 엑셀 다운로드",
     data=excel_bytes,
@@ -762,22 +978,48 @@ st.download_button(
 )
 
 with st.expander("🗂️ 원본 데이터 확인 (선택 품목 기준)"):
-    raw_base = df_base[df_base["품목명"].isin(selected_items)].reset_index(drop=True)
-    raw_curr = df_curr[df_curr["품목명"].isin(selected_items)].reset_index(drop=True)
-    t1, t2 = st.tabs([f"기준 ({base_label}) · {len(raw_base):,}건",
-                       f"실적 ({curr_label}) · {len(raw_curr):,}건"])
-    with t1:
-        if not raw_base.empty:
-            st.dataframe(raw_base, use_container_width=True, height=280)
-        else:
-            st.info("선택된 품목의 기준 기간 데이터가 없습니다.")
-    with t2:
-        if not raw_curr.empty:
-            st.dataframe(raw_curr, use_container_width=True, height=280)
-        else:
-            st.info("선택된 품목의 실적 기간 데이터가 없습니다.")
+    # 원본 거래 행은 요청 시에만 추출 (분석 자체는 월별 큐브 기준)
+    if st.checkbox("원본 거래 행 불러오기", value=False, key="show_raw_rows"):
+        df_base  = slice_period(df_all, *ctx["base_period"])
+        df_curr  = slice_period(df_all, *ctx["curr_period"])
+        raw_base = df_base[df_base["품목명"].isin(selected_items)].reset_index(drop=True)
+        raw_curr = df_curr[df_curr["품목명"].isin(selected_items)].reset_index(drop=True)
+        t1, t2 = st.tabs([f"기준 ({base_label}) · {len(raw_base):,}건",
+                           f"실적 ({curr_label}) · {len(raw_curr):,}건"])
+        with t1:
+            if not raw_base.empty:
+                st.dataframe(raw_base, use_container_width=True, height=280)
+            else:
+                st.info("선택된 품목의 기준 기간 데이터가 없습니다.")
+        with t2:
+            if not raw_curr.empty:
+                st.dataframe(raw_curr, use_container_width=True, height=280)
+            else:
+                st.info("선택된 품목의 실적 기간 데이터가 없습니다.")
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 모델 상세 비교표
 # ══════════════════════════════════════════════════════════════════════════════
 render_model_guide()
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 진단 (사이드바) + 실행 지표 로그 — 이번 실행의 단계별 기록
+# ══════════════════════════════════════════════════════════════════════════════
+run_meta = {
+    "fingerprint": ctx["fingerprint"],
+    "base_period": base_label, "curr_period": curr_label,
+    "model": model_code, "exact": ctx["exact"],
+    "baselines": [b[0] for b in ctx["baselines"]],
+}
+render_diagnostics(ctx["diag_panel"], meta=run_meta)
+log_run({
+    **run_meta,
+    "period_mode":     ctx["period_code"],
+    "rows":            len(df_all),
+    "items":           len(va),
+    "items_selected":  len(selected_items),
+    "groups":          len(custom_group_names),
+    "groups_selected": len(selected_groups),
+    "total_ms":        run_elapsed_ms(),
+    "stages":          records(),
+})
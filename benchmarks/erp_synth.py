@@ -0,0 +1,228 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# benchmarks/erp_synth.py  —  합성 ERP 매출실적 생성기 (벤치마크용)
+#   config.COL_IDX 레이아웃 그대로의 엑셀 시트, 또는 erp_reader.parse_erp_excel()
+#   결과와 같은 스키마의 DataFrame을 생성한다.
+#   조절 가능: 행 수 / 품목 수 / 환종 구성(KRW·USD·EUR·JPY) / 신규·단종 품목 비율 / 거래처 수
+#
+#   사용 예:
+#     python benchmarks/erp_synth.py 100k /tmp/erp_100k.xlsx --items 800 \
+#         --ccy KRW=0.5,USD=0.3,EUR=0.15,JPY=0.05 --new-ratio 0.05 --disc-ratio 0.05
+#
+#   .xlsx 시트 한도(1,048,576행) 때문에 그 이상은 엑셀로 쓸 수 없음 —
+#   5M 같은 규모는 synth_frame()으로 파싱 결과 스키마를 직접 만들어 파싱 이후 단계만 측정.
+# ══════════════════════════════════════════════════════════════════════════════
+import os as _os, sys as _sys
+_ROOT = _os.path.dirname(_os.path.dirname(_os.path.abspath(__file__)))
+if _ROOT not in _sys.path:
+    _sys.path.insert(0, _ROOT)
+
+
+import argparse
+from dataclasses import dataclass, field, asdict
+
+import numpy as np
+import pandas as pd
+from config import COL_IDX
+
+XLSX_MAX_ROWS = 1_048_575   # 시트 1,048,576행 − 헤더 1행
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "5M": 5_000_000}
+
+# 환종별 월평균 환율 기준값 (원/외화 1단위)
+_FX_BASE = {"KRW": 1.0, "USD": 1320.0, "EUR": 1450.0, "JPY": 9.2}
+_ACCOUNTS     = np.array(["제품", "상품", "원재료", "부재료", "제조-수선비"])
+_ACCOUNT_MIX  = np.array([0.50, 0.30, 0.10, 0.07, 0.03])
+_UNITS        = np.array(["EA", "KG", "BOX", "SET"])
+
+
+@dataclass
+class SynthSpec:
+    """합성 데이터 파라미터. 기준연도(year-1) 1~12월 + 실적연도(year) 1~curr_month월."""
+    rows:        int   = 100_000
+    items:       int   = 500
+    customers:   int   = 200
+    ccy_mix:     dict  = field(default_factory=lambda: {"KRW": 0.55, "USD": 0.30,
+                                                        "EUR": 0.10, "JPY": 0.05})
+    new_ratio:   float = 0.05    # 실적연도에만 등장하는 품목 비율
+    disc_ratio:  float = 0.05    # 기준연도에만 등장하는 품목 비율
+    return_rate: float = 0.02    # 반품(음수 수량) 행 비율
+    year:        int   = 2025
+    curr_month:  int   = 12
+    seed:        int   = 0
+
+    def tag(self) -> str:
+        """생성 파일 캐시용 식별 문자열."""
+        ccy = "-".join(f"{k}{v:g}" for k, v in sorted(self.ccy_mix.items()))
+        return (f"r{self.rows}_i{self.items}_c{self.customers}_{ccy}_n{self.new_ratio:g}"
+                f"_d{self.disc_ratio:g}_ret{self.return_rate:g}_y{self.year}m{self.curr_month}"
+                f"_s{self.seed}")
+
+
+def parse_ccy_mix(text: str) -> dict:
+    """'KRW=0.5,USD=0.3,EUR=0.2' → {환종: 비중} (합계 1로 정규화)."""
+    mix = {}
+    for part in text.split(","):
+        code, _, w = part.partition("=")
+        code = code.strip().upper()
+        if code not in _FX_BASE:
+            raise ValueError(f"지원하지 않는 환종: {code!r} (KRW/USD/EUR/JPY)")
+        mix[code] = float(w)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("환종 비중 합계는 0보다 커야 합니다")
+    return {k: v / total for k, v in mix.items()}
+
+
+def parse_size(text: str) -> int:
+    """'100k' / '1M' / '250000' → 행 수."""
+    return SIZES.get(text) or int(float(text.lower().replace("k", "e3").replace("m", "e6")))
+
+
+def synth_columns(spec: SynthSpec) -> dict:
+    """
+    COL_IDX 항목별 numpy 배열 dict — 행 순서는 매출일 순.
+    품목별 속성(품목계정·단위·기준단가)은 고정, 판매 빈도는 Zipf형 분포.
+    """
+    rng = np.random.default_rng(spec.seed)
+    n, n_items = spec.rows, spec.items
+
+    # ── 날짜: 기준연도 12개월 + 실적연도 curr_month개월, 일자 균등 ─────────────
+    n_months = 12 + spec.curr_month
+    month_i  = np.sort(rng.integers(0, n_months, n))
+    year     = np.where(month_i < 12, spec.year - 1, spec.year)
+    month    = month_i % 12 + 1
+    day      = rng.integers(1, 29, n)
+    dates    = pd.to_datetime(pd.DataFrame({"year": year, "month": month, "day": day}))
+
+    # ── 품목: 앞쪽 disc_ratio는 기준연도 전용, 뒤쪽 new_ratio는 실적연도 전용 ──
+    n_disc = int(n_items * spec.disc_ratio)
+    n_new  = int(n_items * spec.new_ratio)
+    weight = 1.0 / np.arange(1, n_items + 1) ** 1.1
+    weight = weight[rng.permutation(n_items)]
+    in_base = np.arange(n_items) < n_items - n_new
+    in_curr = np.arange(n_items) >= n_disc
+
+    item = np.empty(n, dtype=np.int64)
+    for mask, allowed in ((year < spec.year, in_base), (year == spec.year, in_curr)):
+        p = np.where(allowed, weight, 0.0)
+        item[mask] = rng.choice(n_items, size=int(mask.sum()), p=p / p.sum())
+
+    item_price = np.exp(rng.normal(9.5, 1.0, n_items)).round(-1)    # 원화 기준단가
+    item_acct  = rng.choice(len(_ACCOUNTS), size=n_items, p=_ACCOUNT_MIX)
+    item_unit  = rng.integers(0, len(_UNITS), n_items)
+
+    # ── 환종·환율: 월별 추세 + 일별 잡음 ─────────────────────────────────────
+    codes = list(spec.ccy_mix)
+    ccy_i = rng.choice(len(codes), size=n, p=[spec.ccy_mix[c] for c in codes])
+    ccy   = np.array(codes)[ccy_i]
+    drift = 1.0 + 0.004 * month_i + rng.normal(0, 0.01, n)
+    rate  = np.array([_FX_BASE[c] for c in codes])[ccy_i] * drift
+    is_krw = ccy == "KRW"
+    rate   = np.where(is_krw, 1.0, rate.round(2))
+
+    # ── 수량·단가·금액 ─────────────────────────────────────────────────────────
+    qty = rng.integers(1, 200, n).astype(float)
+    qty = np.where(rng.random(n) < spec.return_rate, -np.ceil(qty / 10), qty)
+    price_krw = item_price[item] * (1.0 + 0.0015 * month_i) * rng.normal(1.0, 0.03, n)
+    fx_price  = np.where(is_krw, 0.0, (price_krw / rate).round(2))
+    fx_amt    = np.where(is_krw, 0.0, (qty * fx_price).round(2))
+    krw_price = np.where(is_krw, price_krw.round(0), (fx_price * rate).round(0))
+    krw_amt   = np.where(is_krw, qty * krw_price, (fx_amt * rate).round(0))
+
+    item_names = np.array([f"품목{i:05d}" for i in range(n_items)], dtype=object)
+    item_codes = np.array([f"P{i:05d}" for i in range(n_items)], dtype=object)
+    cust_names = np.array([f"거래처{i:04d}" for i in range(spec.customers)], dtype=object)
+
+    return {
+        "매출일":   dates.to_numpy(),
+        "매출처명": cust_names[rng.integers(0, spec.customers, n)],
+        "품목코드": item_codes[item],
+        "품목명":   item_names[item],
+        "단위":     _UNITS[item_unit[item]].astype(object),
+        "수량":     qty,
+        "환종":     ccy.astype(object),
+        "환율":     rate,
+        "외화단가": fx_price,
+        "외화금액": fx_amt,
+        "원화단가": krw_price,
+        "원화금액": krw_amt,
+        "품목계정": _ACCOUNTS[item_acct[item]].astype(object),
+    }
+
+
+def write_erp_xlsx(cols: dict, path: str):
+    """
+    synth_columns() 결과 → COL_IDX 위치에 값을 둔 ERP 형식 .xlsx (첫 시트, 1행 헤더).
+    openpyxl write-only 모드로 행 단위 스트리밍 — 나머지 열은 빈 셀.
+    """
+    from openpyxl import Workbook
+
+    n = len(cols["매출일"])
+    if n > XLSX_MAX_ROWS:
+        raise ValueError(f"{n:,}행은 .xlsx 시트 한도({XLSX_MAX_ROWS:,}행)를 넘습니다")
+
+    width  = max(COL_IDX.values()) + 1
+    header = [f"열{i}" for i in range(width)]
+    for name, i in COL_IDX.items():
+        header[i] = name
+
+    idxs   = list(COL_IDX.values())
+    series = [(cols[name].astype("datetime64[s]") if name == "매출일" else cols[name]).tolist()
+              for name in COL_IDX]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("매출실적")
+    ws.append(header)
+    row = [None] * width
+    for values in zip(*series):
+        for i, v in zip(idxs, values):
+            row[i] = v
+        ws.append(row)
+    tmp = f"{path}.{_os.getpid()}.tmp"
+    wb.save(tmp)
+    _os.replace(tmp, path)
+
+
+def synth_frame(cols: dict) -> pd.DataFrame:
+    """
+    synth_columns() 결과 → parse_erp_excel() 반환 스키마의 DataFrame (엑셀 왕복 없이).
+    엑셀 한도를 넘는 규모에서 파싱 이후 단계(집계·모델·표)만 측정할 때 사용.
+    """
+    df = pd.DataFrame(cols)
+    df["연도"] = df["매출일"].dt.year.astype(int)
+    df["월"]   = df["매출일"].dt.month.astype(int)
+    acc = df["품목계정"]
+    df["품목계정_분류"] = acc.where(acc.isin(["제품", "상품"]), "기타")
+    for c in ["품목명", "환종", "매출처명", "품목계정", "단위", "품목계정_분류"]:
+        df[c] = df[c].astype("category")
+    return df
+
+
+def main(argv: list | None = None) -> int:
+    p = argparse.ArgumentParser(description="합성 ERP 매출실적 .xlsx 생성 (config.COL_IDX 레이아웃)")
+    p.add_argument("rows", help="행 수 (10k / 100k / 1M 또는 정수)")
+    p.add_argument("out", help="출력 .xlsx 경로")
+    p.add_argument("--items", type=int, default=SynthSpec.items)
+    p.add_argument("--customers", type=int, default=SynthSpec.customers)
+    p.add_argument("--ccy", default="KRW=0.55,USD=0.30,EUR=0.10,JPY=0.05",
+                   help="환종 비중 (예: KRW=0.5,USD=0.3,EUR=0.15,JPY=0.05)")
+    p.add_argument("--new-ratio", type=float, default=SynthSpec.new_ratio)
+    p.add_argument("--disc-ratio", type=float, default=SynthSpec.disc_ratio)
+    p.add_argument("--year", type=int, default=SynthSpec.year)
+    p.add_argument("--seed", type=int, default=SynthSpec.seed)
+    args = p.parse_args(argv)
+
+    try:
+        spec = SynthSpec(rows=parse_size(args.rows), items=args.items,
+                         customers=args.customers, ccy_mix=parse_ccy_mix(args.ccy),
+                         new_ratio=args.new_ratio, disc_ratio=args.disc_ratio,
+                         year=args.year, seed=args.seed)
+        write_erp_xlsx(synth_columns(spec), args.out)
+    except ValueError as e:
+        p.error(str(e))
+    print(args.out, asdict(spec))
+    return 0
+
+
+if __name__ == "__main__":
+    _sys.exit(main())
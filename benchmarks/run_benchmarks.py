@@ -0,0 +1,257 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# benchmarks/run_benchmarks.py  —  단계별 소요 시간·피크 메모리 측정 + 기준선 비교
+#   합성 ERP 데이터(erp_synth)로 로딩 → 집계 → 모델 → 표 생성 단계를 규모별로 측정하고
+#   benchmarks/baseline.json과 비교해 회귀를 표시한다 (회귀 있으면 종료 코드 1).
+#
+#   사용 예:
+#     python benchmarks/run_benchmarks.py                       # 10k, 100k 측정 후 기준선 비교
+#     python benchmarks/run_benchmarks.py --sizes 1M 5M --repeat 1
+#     python benchmarks/run_benchmarks.py --update-baseline     # 측정 결과로 기준선 갱신
+#
+#   측정 단계:
+#     load_excel_parse   erp_reader.parse_erp_excel (디스크 캐시 없이, data_loader.load_excel 본체)
+#     load_excel_cached  erp_reader.read_erp_cached 캐시 적중 (Parquet 로드)
+#     aggregate          models.aggregate (원본 거래 행 전체)
+#     model_A / model_B  models.model_A / model_B (원본 행, 기준연도 vs 실적연도)
+#     build_monthly_cube models.build_monthly_cube
+#     build_month_index  models.build_month_index
+#     model_AB_ranged    range_sums ×2 + models.model_AB (앱의 실제 경로, YTD)
+#     model_AB_exact     같은 경로, 정확 모드 (int64 원 분해)
+#     model_trend_12m    models.model_trend (최근 12개월 전월 대비, 배치 1회)
+#     build_table        ui_components.build_table (환종별 상세 뷰)
+#   엑셀 한도(≈1M행)를 넘는 규모는 load_excel_* 단계를 건너뛰고 파싱 결과 스키마에서 시작.
+#
+#   시간 = 반복 실행 중 최소값, 메모리 = tracemalloc 피크(단계 시작 시점 대비, 별도 1회 실행).
+# ══════════════════════════════════════════════════════════════════════════════
+import os as _os, sys as _sys
+_ROOT = _os.path.dirname(_os.path.dirname(_os.path.abspath(__file__)))
+_BENCH = _os.path.dirname(_os.path.abspath(__file__))
+for _p in (_ROOT, _BENCH):
+    if _p not in _sys.path:
+        _sys.path.insert(0, _p)
+
+
+import argparse
+import gc
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from erp_synth import (SynthSpec, SIZES, XLSX_MAX_ROWS, parse_size, parse_ccy_mix,
+                       synth_columns, synth_frame, write_erp_xlsx)
+from erp_reader import parse_erp_excel, read_erp_cached
+from models import (aggregate, model_A, model_B, model_AB, build_monthly_cube,
+                    build_month_index, range_sums, period_ranges, ym_to_ord,
+                    model_trend, trend_months)
+from ui_components import build_table
+
+BASELINE_PATH = _os.path.join(_BENCH, "baseline.json")
+SCHEMA_VERSION = 1
+
+# 이보다 작은 절대 차이는 잡음으로 보고 회귀 판정에서 제외
+_TIME_FLOOR_S = 0.02
+_MEM_FLOOR_MB = 1.0
+
+
+# ── 측정 ──────────────────────────────────────────────────────────────────────
+
+def measure(fn, repeat: int = 3) -> tuple:
+    """
+    fn()의 (최소 소요 시간 s, tracemalloc 피크 MB, 결과).
+    첫 실행은 tracemalloc 하에서 메모리만 측정(워밍업 겸), 이후 repeat회 시간 측정.
+    첫 실행이 10초를 넘는 무거운 단계는 시간 측정을 1회로 줄임.
+    """
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    slow = time.perf_counter() - t0 > 10.0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float("inf")
+    for _ in range(1 if slow else repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, peak / 2**20, result
+
+
+def run_size(label: str, spec: SynthSpec, workdir: str, repeat: int,
+             with_xlsx: bool = True, log=print) -> dict:
+    """한 규모의 전 단계 측정 → {"spec": ..., "stages": {단계: {"wall_s", "peak_mb"}}}."""
+    stages = {}
+
+    def stage(name, fn):
+        wall, peak, result = measure(fn, repeat)
+        stages[name] = {"wall_s": round(wall, 4), "peak_mb": round(peak, 2)}
+        log(f"  {label:>5} {name:<20} {wall:9.3f}s {peak:10.1f}MB")
+        return result
+
+    cols = synth_columns(spec)
+    if with_xlsx and spec.rows <= XLSX_MAX_ROWS:
+        path = _os.path.join(workdir, f"erp_{spec.tag()}.xlsx")
+        if not _os.path.exists(path):
+            log(f"  {label:>5} (엑셀 생성: {path})")
+            write_erp_xlsx(cols, path)
+        del cols
+        with open(path, "rb") as f:
+            data = f.read()
+        df = stage("load_excel_parse", lambda: parse_erp_excel(data))
+        with tempfile.TemporaryDirectory(dir=workdir) as cache_dir:
+            read_erp_cached(data, cache_dir)   # 캐시 채우기
+            stage("load_excel_cached", lambda: read_erp_cached(data, cache_dir))
+        del data
+    else:
+        df = synth_frame(cols)
+        del cols
+
+    base = df[df["연도"] == spec.year - 1]
+    curr = df[df["연도"] == spec.year]
+    stage("aggregate", lambda: aggregate(df))
+    _, va_detail = stage("model_A", lambda: model_A(base, curr))
+    stage("model_B", lambda: model_B(base, curr))
+    cube = stage("build_monthly_cube", lambda: build_monthly_cube(df))
+    idx  = stage("build_month_index", lambda: build_month_index(cube))
+    bp, cp, _ = period_ranges("YTD", ym_to_ord(spec.year, spec.curr_month))
+    stage("model_AB_ranged", lambda: model_AB(range_sums(idx, *bp), range_sums(idx, *cp)))
+    stage("model_AB_exact", lambda: model_AB(range_sums(idx, *bp), range_sums(idx, *cp), exact=True))
+    months = trend_months(idx, ym_to_ord(spec.year, spec.curr_month), 12, "MoM")
+    stage("model_trend_12m", lambda: model_trend(idx, months, "MoM", "A"))
+    stage("build_table", lambda: build_table(va_detail, "기준", "실적", True))
+    return {"spec": asdict(spec), "stages": stages}
+
+
+# ── 기준선 ────────────────────────────────────────────────────────────────────
+
+def environment() -> dict:
+    return {
+        "created":   datetime.now().isoformat(timespec="seconds"),
+        "python":    platform.python_version(),
+        "pandas":    pd.__version__,
+        "numpy":     np.__version__,
+        "platform":  platform.platform(),
+        "cpu_count": _os.cpu_count(),
+    }
+
+
+def load_baseline(path: str) -> dict:
+    if not _os.path.exists(path):
+        return {"schema": SCHEMA_VERSION, "meta": {}, "results": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(path: str, doc: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def compare(current: dict, baseline: dict, time_tol: float, mem_tol: float,
+            log=print) -> list:
+    """
+    규모·단계별로 기준선 대비 비율 출력. 반환: 회귀 목록 [(규모, 단계, 항목, 기준, 현재)].
+    합성 파라미터(spec)가 다른 규모는 비교하지 않음.
+    """
+    regressions = []
+    for label, cur in current.items():
+        ref = baseline.get("results", {}).get(label)
+        if ref is None:
+            log(f"  {label:>5} 기준선 없음 — 비교 생략")
+            continue
+        if ref["spec"] != cur["spec"]:
+            log(f"  {label:>5} 합성 파라미터가 기준선과 달라 비교 생략")
+            continue
+        for name, m in cur["stages"].items():
+            r = ref["stages"].get(name)
+            if r is None:
+                continue
+            flags = []
+            if m["wall_s"] - r["wall_s"] > _TIME_FLOOR_S and m["wall_s"] > r["wall_s"] * (1 + time_tol):
+                flags.append("시간")
+                regressions.append((label, name, "wall_s", r["wall_s"], m["wall_s"]))
+            if m["peak_mb"] - r["peak_mb"] > _MEM_FLOOR_MB and m["peak_mb"] > r["peak_mb"] * (1 + mem_tol):
+                flags.append("메모리")
+                regressions.append((label, name, "peak_mb", r["peak_mb"], m["peak_mb"]))
+            t_ratio = m["wall_s"] / r["wall_s"] if r["wall_s"] else float("nan")
+            m_ratio = m["peak_mb"] / r["peak_mb"] if r["peak_mb"] else float("nan")
+            mark = f"  ◀ 회귀({'/'.join(flags)})" if flags else ""
+            log(f"  {label:>5} {name:<20} 시간 ×{t_ratio:5.2f}  메모리 ×{m_ratio:5.2f}{mark}")
+    return regressions
+
+
+# ── 진입점 ────────────────────────────────────────────────────────────────────
+
+def main(argv: list | None = None) -> int:
+    p = argparse.ArgumentParser(description="매출 차이 분석 단계별 벤치마크")
+    p.add_argument("--sizes", nargs="+", default=["10k", "100k"],
+                   help=f"측정 규모 ({' / '.join(SIZES)} 또는 행 수, 기본: 10k 100k)")
+    p.add_argument("--items", type=int, default=SynthSpec.items)
+    p.add_argument("--customers", type=int, default=SynthSpec.customers)
+    p.add_argument("--ccy", default="KRW=0.55,USD=0.30,EUR=0.10,JPY=0.05",
+                   help="환종 비중 (예: KRW=0.5,USD=0.3,EUR=0.15,JPY=0.05)")
+    p.add_argument("--new-ratio", type=float, default=SynthSpec.new_ratio)
+    p.add_argument("--disc-ratio", type=float, default=SynthSpec.disc_ratio)
+    p.add_argument("--seed", type=int, default=SynthSpec.seed)
+    p.add_argument("--repeat", type=int, default=3, help="시간 측정 반복 횟수 (최소값 사용)")
+    p.add_argument("--no-xlsx", action="store_true",
+                   help="엑셀 생성·파싱 단계 생략 (파싱 결과 스키마에서 시작)")
+    p.add_argument("--workdir", default=_os.path.join(tempfile.gettempdir(), "sales_analysis_bench"),
+                   help="생성한 엑셀 파일 보관 위치 (같은 파라미터면 재사용)")
+    p.add_argument("--baseline", default=BASELINE_PATH)
+    p.add_argument("--update-baseline", action="store_true",
+                   help="측정한 규모의 결과로 기준선 파일 갱신")
+    p.add_argument("--out", help="이번 측정 결과를 별도 JSON으로 저장")
+    p.add_argument("--time-tol", type=float, default=0.25, help="시간 회귀 허용 비율 (기본 0.25)")
+    p.add_argument("--mem-tol", type=float, default=0.15, help="메모리 회귀 허용 비율 (기본 0.15)")
+    args = p.parse_args(argv)
+
+    try:
+        ccy_mix = parse_ccy_mix(args.ccy)
+        sizes   = [(s, parse_size(s)) for s in args.sizes]
+    except ValueError as e:
+        p.error(str(e))
+    _os.makedirs(args.workdir, exist_ok=True)
+
+    print(f"{'규모':>5} {'단계':<20} {'시간':>10} {'피크 메모리':>12}")
+    current = {}
+    for label, rows in sizes:
+        spec = SynthSpec(rows=rows, items=args.items, customers=args.customers,
+                         ccy_mix=ccy_mix, new_ratio=args.new_ratio,
+                         disc_ratio=args.disc_ratio, seed=args.seed)
+        current[label] = run_size(label, spec, args.workdir, args.repeat,
+                                  with_xlsx=not args.no_xlsx)
+
+    doc = {"schema": SCHEMA_VERSION, "meta": environment(), "results": current}
+    if args.out:
+        save_results(args.out, doc)
+
+    baseline = load_baseline(args.baseline)
+    print("\n기준선 비교:", args.baseline)
+    regressions = compare(current, baseline, args.time_tol, args.mem_tol)
+
+    if args.update_baseline:
+        baseline["schema"] = SCHEMA_VERSION
+        baseline["meta"]   = doc["meta"]
+        baseline.setdefault("results", {}).update(current)
+        save_results(args.baseline, baseline)
+        print(f"기준선 갱신: {args.baseline}")
+        return 0
+    if regressions:
+        print(f"\n회귀 {len(regressions)}건:")
+        for label, name, key, ref, cur in regressions:
+            print(f"  {label} {name} {key}: {ref} → {cur}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    _sys.exit(main())
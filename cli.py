@@ -0,0 +1,278 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# cli.py  —  헤드리스 배치 실행 (Streamlit 없이 차이 분석 리포트 생성)
+#   야간 자동 실행용 진입점. ERP 파일 → 월 누적합 인덱스 1회 구성 후
+#   기간 스펙마다 models.run_model(등록 모델 A / B / C …)을 직접 호출하고 xlsx / parquet로 저장.
+#   여러 기간은 프로세스 풀에서 병렬 실행 (인덱스는 워커당 1회만 전달).
+#   기준·실적 어느 쪽이든 데이터 범위 밖인 기간 쌍은 경고(stderr) 후 건너뛰고 종료 코드 1.
+#
+#   사용 예:
+#     python cli.py 매출_2024.xlsx 매출_2025.xlsx -g 그룹설정.xlsx \
+#         -p YoY:2025-06 -p YTD:2025-06 -p R-PoP:2025-06:3 \
+#         -p 2024-01..2024-06/2025-01..2025-06 -m A -o out/ -f xlsx parquet
+#     python cli.py 매출_2025.xlsx -p YTD:2025-06 --exact     # int64 원 정확 모드
+#
+#   기간 스펙:
+#     <모드>:<YYYY-MM>[:N]      모드 = YoY, MoM, YTD, QTD, HTD, R-YoY, R-PoP (N = 롤링 개월 수)
+#     <기준범위>/<실적범위>      범위 = YYYY-MM 또는 YYYY-MM..YYYY-MM
+# ══════════════════════════════════════════════════════════════════════════════
+import os as _os, sys as _sys
+_HERE = _os.path.dirname(_os.path.abspath(__file__))
+if _HERE not in _sys.path:
+    _sys.path.insert(0, _HERE)
+
+
+import argparse
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from config import CACHE_DIR
+from erp_reader import read_erp_cached
+from models import (build_monthly_cube, build_month_index, item_accounts, range_sums,
+                    ym_to_ord, ord_to_ym, period_ranges, run_model, apply_post, MODELS,
+                    attach_groups, attach_accounts, group_rollup, account_group_pivot)
+
+PERIOD_CODES = ("YoY", "MoM", "YTD", "QTD", "HTD", "R-YoY", "R-PoP")
+_YM_RE = re.compile(r"^(\d{4})-(\d{1,2})$")
+
+
+# ── 입력 ──────────────────────────────────────────────────────────────────────
+
+def load_erp_files(paths: list, cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """ERP 파일 여러 개 → 하나의 거래 DataFrame (파일별 Parquet 디스크 캐시 사용)."""
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            frames.append(read_erp_cached(f.read(), cache_dir))
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_group_mapping(path: str | None) -> dict:
+    """
+    그룹 설정 파일 → {품목명: 그룹명}.
+      .json : 앱에서 내려받은 {그룹명: [품목명, ...]} 형식
+      .xlsx : 앱의 그룹 설정 엑셀 (품목명, 커스텀 그룹명 컬럼)
+    """
+    if not path:
+        return {}
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            groups = json.load(f)
+        return {str(item).strip(): str(gn).strip()
+                for gn, items in groups.items() if isinstance(items, list)
+                for item in items}
+
+    df = pd.read_excel(path, dtype=str).fillna("")
+    if "품목명" not in df.columns or "커스텀 그룹명" not in df.columns:
+        raise ValueError(f"그룹 설정 파일에 '품목명' / '커스텀 그룹명' 컬럼이 없습니다: {path}")
+    items  = df["품목명"].str.strip()
+    groups = df["커스텀 그룹명"].str.strip()
+    keep   = (items != "") & (groups != "")
+    return dict(zip(items[keep], groups[keep]))
+
+
+# ── 기간 스펙 ─────────────────────────────────────────────────────────────────
+
+def _parse_ym(text: str) -> int:
+    m = _YM_RE.match(text.strip())
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        raise ValueError(f"월 형식은 YYYY-MM 이어야 합니다: {text!r}")
+    return ym_to_ord(int(m.group(1)), int(m.group(2)))
+
+
+def _parse_range(text: str) -> tuple:
+    start, _, end = text.partition("..")
+    lo, hi = _parse_ym(start), _parse_ym(end or start)
+    if hi < lo:
+        raise ValueError(f"기간 시작이 종료보다 늦습니다: {text!r}")
+    return lo, hi
+
+
+def parse_period_spec(spec: str) -> tuple:
+    """기간 스펙 문자열 → (기준 범위, 실적 범위). 범위 = (시작, 종료) 월 서수."""
+    if "/" in spec:
+        base, curr = spec.split("/", 1)
+        return _parse_range(base), _parse_range(curr)
+
+    parts = spec.split(":")
+    if parts[0] not in PERIOD_CODES or len(parts) not in (2, 3):
+        raise ValueError(f"알 수 없는 기간 스펙: {spec!r}")
+    n = int(parts[2]) if len(parts) == 3 else 3
+    base, curr, _ = period_ranges(parts[0], _parse_ym(parts[1]), n)
+    return base, curr
+
+
+def range_tag(period: tuple) -> str:
+    """(시작, 종료) 월 서수 → '2024-01' / '2024-01..2024-06' (파일명·기간 컬럼용)."""
+    (y1, m1), (y2, m2) = ord_to_ym(period[0]), ord_to_ym(period[1])
+    head = f"{y1}-{m1:02d}"
+    return head if period[0] == period[1] else f"{head}..{y2}-{m2:02d}"
+
+
+def empty_sides(month_index: dict, base_period: tuple, curr_period: tuple) -> list:
+    """기간 쌍 중 데이터가 있는 월이 하나도 없는 쪽 ('기준' / '실적') — 데이터 범위 밖 스펙 검출."""
+    periods = month_index["periods"]
+    return [side for side, (start, end) in (("기준", base_period), ("실적", curr_period))
+            if not any(start <= p <= end for p in periods)]
+
+
+# ── 워커 ──────────────────────────────────────────────────────────────────────
+# 월 인덱스·그룹 매핑은 initializer로 워커 프로세스당 1회만 전달 — 기간 작업마다 재전송하지 않음.
+
+_WORKER: dict = {}
+
+
+def _init_worker(month_index: dict, item_mapping: dict, exact: bool = False):
+    _WORKER["index"], _WORKER["mapping"], _WORKER["exact"] = month_index, item_mapping, exact
+
+
+def run_period(base_period: tuple, curr_period: tuple, model: str,
+               month_index: dict, item_mapping: dict, exact: bool = False) -> dict:
+    """
+    한 기간 쌍의 차이 분석 → {시트명: DataFrame}.
+      차이분석 : 품목명 단위 요약        환종별 : [품목명 × 환종] raw
+      그룹별   : 커스텀 그룹 롤업        품목계정별 : [품목계정_분류 × 그룹] 롤업
+    exact=True면 금액·분해 컬럼이 int64 원 (models 정확 모드).
+    후처리가 있는 모델(C)은 기본 옵션으로 적용 — C면 ①을 커스텀 그룹 안 볼륨차이·믹스차이로 분할.
+    """
+    base = range_sums(month_index, *base_period)
+    curr = range_sums(month_index, *curr_period)
+    va, va_detail = run_model(base, curr, model, exact)
+
+    accounts  = month_index.get("accounts", {})
+    va        = attach_groups(attach_accounts(va, accounts), item_mapping)
+    va_detail = attach_groups(attach_accounts(va_detail, accounts), item_mapping)
+    va, va_detail = apply_post(model, va, va_detail, exact)
+    return {
+        "차이분석":   va.sort_values("총차이").reset_index(drop=True),
+        "환종별":     va_detail.sort_values(["품목명", "환종"]).reset_index(drop=True),
+        "그룹별":     group_rollup(va),
+        "품목계정별": account_group_pivot(va),
+    }
+
+
+def _run_task(task: tuple) -> tuple:
+    base_period, curr_period, model = task
+    return task, run_period(base_period, curr_period, model,
+                            _WORKER["index"], _WORKER["mapping"], _WORKER["exact"])
+
+
+# ── 출력 ──────────────────────────────────────────────────────────────────────
+
+def _stem(base_period: tuple, curr_period: tuple, model: str) -> str:
+    return f"variance_{model}_{range_tag(base_period)}_vs_{range_tag(curr_period)}"
+
+
+def write_xlsx(path: str, sheets: dict):
+    """{시트명: DataFrame} → xlsx 파일 (시트 순서 = dict 순서)."""
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, index=False, sheet_name=name)
+
+
+def write_parquet(out_dir: str, results: list, model: str):
+    """
+    모든 기간 결과를 시트별 parquet 1개로 합쳐 저장 — 기준기간/실적기간 컬럼으로 구분.
+    파일명: variance_<모델>_<시트명>.parquet
+    """
+    for name in results[0][1]:
+        frames = []
+        for (base_period, curr_period, _), sheets in results:
+            df = sheets[name].copy()
+            df.insert(0, "실적기간", range_tag(curr_period))
+            df.insert(0, "기준기간", range_tag(base_period))
+            frames.append(df)
+        out = pd.concat(frames, ignore_index=True)
+        # 기간마다 카테고리 구성이 다를 수 있어 concat 결과가 object로 섞임 → 문자열로 통일
+        for c in out.columns[out.dtypes == object]:
+            out[c] = out[c].astype(str)
+        out.to_parquet(_os.path.join(out_dir, f"variance_{model}_{name}.parquet"), index=False)
+
+
+# ── 진입점 ────────────────────────────────────────────────────────────────────
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="cli.py",
+        description="ERP 매출실적 차이 분석 배치 실행 (Streamlit 불필요)")
+    p.add_argument("files", nargs="+", help="ERP 매출실적 파일 (.xlsx / .xls), 여러 개면 합쳐서 분석")
+    p.add_argument("-g", "--groups", help="그룹 설정 파일 (.xlsx 또는 .json)")
+    p.add_argument("-p", "--period", action="append", required=True, dest="periods",
+                   help="기간 스펙 (여러 번 지정 가능) — 예: YoY:2025-06, R-PoP:2025-06:3, "
+                        "2024-01..2024-06/2025-01..2025-06")
+    p.add_argument("-m", "--model", choices=list(MODELS), default="A",
+                   help=", ".join(f"{k}={spec['title']}" for k, spec in MODELS.items())
+                        + " (기본: A)")
+    p.add_argument("--exact", action="store_true",
+                   help="정확 모드 — 원화금액 int64 원·외화금액 정수 합산, ①②③을 정수 원으로 배분")
+    p.add_argument("-o", "--out", default=".", help="출력 디렉터리 (기본: 현재 디렉터리)")
+    p.add_argument("-f", "--format", nargs="+", choices=["xlsx", "parquet"], default=["xlsx"],
+                   dest="formats", help="출력 형식 (기본: xlsx)")
+    p.add_argument("-j", "--jobs", type=int, default=_os.cpu_count() or 1,
+                   help="병렬 프로세스 수 (기본: CPU 수, 1이면 순차 실행)")
+    p.add_argument("--cache-dir", default=CACHE_DIR, help="Parquet 디스크 캐시 위치")
+    return p
+
+
+def main(argv: list | None = None) -> int:
+    parser = build_parser()
+    args   = parser.parse_args(argv)
+
+    try:
+        # 같은 기간 쌍이 여러 스펙으로 중복 지정되면 1회만 실행 (지정 순서 유지)
+        tasks = list(dict.fromkeys((*parse_period_spec(s), args.model) for s in args.periods))
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        item_mapping = load_group_mapping(args.groups)
+    except (OSError, ValueError) as e:
+        parser.error(f"그룹 설정 파일 오류: {e}")
+
+    try:
+        df = load_erp_files(args.files, args.cache_dir)
+    except Exception as e:
+        print(f"ERP 파일 읽기 실패: {e}", file=_sys.stderr)
+        return 1
+    month_index = build_month_index(build_monthly_cube(df), item_accounts(df))
+    del df
+
+    # 데이터 범위 밖 기간 쌍은 빈 결과 파일 대신 경고 후 제외 — 하나라도 있으면 종료 코드 1
+    data_range = (range_tag((month_index["first"], month_index["last"]))
+                  if month_index["periods"] else "없음")
+    skipped = []
+    for task in tasks:
+        sides = empty_sides(month_index, *task[:2])
+        if sides:
+            skipped.append(task)
+            print(f"경고: {range_tag(task[0])} vs {range_tag(task[1])} — {'·'.join(sides)} 기간에 "
+                  f"데이터가 없어 건너뜀 (데이터 범위: {data_range})", file=_sys.stderr)
+    tasks = [t for t in tasks if t not in skipped]
+    if not tasks:
+        return 1
+
+    _os.makedirs(args.out, exist_ok=True)
+    jobs = max(1, min(args.jobs, len(tasks)))
+    if jobs == 1:
+        _init_worker(month_index, item_mapping, args.exact)
+        results = [_run_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                                 initargs=(month_index, item_mapping, args.exact)) as pool:
+            results = list(pool.map(_run_task, tasks))
+
+    for (base_period, curr_period, model), sheets in results:
+        if "xlsx" in args.formats:
+            path = _os.path.join(args.out, _stem(base_period, curr_period, model) + ".xlsx")
+            write_xlsx(path, sheets)
+            print(path)
+    if "parquet" in args.formats:
+        write_parquet(args.out, results, args.model)
+        print(_os.path.join(args.out, f"variance_{args.model}_*.parquet"))
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    _sys.exit(main())
@@ -1,6 +1,7 @@
 # ══════════════════════════════════════════════════════════════════════════════
 # config.py  —  상수 및 공통 설정
 # ══════════════════════════════════════════════════════════════════════════════
+import os as _os
 
 # ERP 엑셀 컬럼 인덱스 매핑 (0-based)
 COL_IDX = {
@@ -19,6 +20,29 @@ COL_IDX = {
     "품목계정": 54,
 }
 
+# 파싱된 ERP 파일의 디스크 캐시 위치 (Parquet, 파일 내용 SHA-256 기준)
+CACHE_DIR = _os.environ.get(
+    "SALES_ANALYSIS_CACHE_DIR",
+    _os.path.join(_os.path.expanduser("~"), ".cache", "sales_analysis"),
+)
+# 캐시 상한 — 쓸 때마다 최근 사용 순으로 이 개수·용량 안만 남기고 삭제 (0이면 해당 상한 없음)
+CACHE_MAX_FILES = int(_os.environ.get("SALES_ANALYSIS_CACHE_MAX_FILES", 50))
+CACHE_MAX_BYTES = int(_os.environ.get("SALES_ANALYSIS_CACHE_MAX_BYTES", 1 * 2**30))
+
+# 실행 지표 로그 (JSONL, 실행 1회 = 1줄) — 빈 문자열이면 기록 안 함
+RUN_LOG_PATH = _os.environ.get(
+    "SALES_ANALYSIS_RUN_LOG",
+    _os.path.join(CACHE_DIR, "runs.jsonl"),
+)
+RUN_LOG_MAX_BYTES = int(_os.environ.get("SALES_ANALYSIS_RUN_LOG_MAX_BYTES", 5 * 2**20))
+RUN_LOG_BACKUPS   = 5   # runs.jsonl.1 ~ .5 까지 보관, 초과분은 삭제
+
+# 차이 분석 결과 메모이제이션 — (파일 지문, 기준/실적 기간, 모델) 키, LRU 최대 항목 수
+VARIANCE_CACHE_ENTRIES = 32
+
+# 상세 표 페이지 크기 — 이보다 행이 많으면 검색·정렬·페이지 모드 (한 페이지만 브라우저로 전송)
+TABLE_PAGE_SIZE = 100
+
 MONTH_KR = {i: f"{i}월" for i in range(1, 13)}
 
 # 그룹 카드 색상 팔레트  (활성색, 배경색, 어두운색)
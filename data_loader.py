@@ -10,8 +10,9 @@ if _HERE not in _sys.path:
 import json
 import pandas as pd
 import streamlit as st
-from io import BytesIO
-from config import COL_IDX
+from erp_reader import read_erp_cached
+from profiling import stage
+from models import build_monthly_cube, build_month_index, item_accounts, CUSTOMER_DIMS
 
 
 @st.cache_data
@@ -19,38 +20,54 @@ def load_excel(file_bytes: bytes, file_name: str) -> pd.DataFrame | None:
     """
     ERP 엑셀 파일을 읽어 정제된 DataFrame 반환.
     컬럼 인덱스는 config.COL_IDX 기준.
+    st.cache_data(메모리) 앞단 + 파일 SHA-256 기준 Parquet 디스크 캐시(erp_reader) 2단 구성.
     실패 시 st.error 표시 후 None 반환.
     """
     try:
-        df_raw = pd.read_excel(BytesIO(file_bytes), header=0, dtype=str)
-        result = {}
-        for name, idx in COL_IDX.items():
-            result[name] = (
-                df_raw.iloc[:, idx]
-                if idx < len(df_raw.columns)
-                else pd.Series([None] * len(df_raw))
-            )
-        df = pd.DataFrame(result)
-        df["매출일"] = pd.to_datetime(df["매출일"], errors="coerce")
-        for c in ["수량", "환율", "외화단가", "외화금액", "원화단가", "원화금액"]:
-            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0)
-        df = df.dropna(subset=["매출일"])
-        df["연도"]   = df["매출일"].dt.year.astype(int)
-        df["월"]     = df["매출일"].dt.month.astype(int)
-        df["품목명"] = df["품목명"].fillna("(미분류)").str.strip()
-        # 품목계정 분류: 제품→제품, 상품→상품, 원재료/부재료/제조-수선비→기타
-        def _classify(acc):
-            v = str(acc).strip()
-            if v == "제품":  return "제품"
-            if v == "상품":  return "상품"
-            return "기타"
-        df["품목계정_분류"] = df["품목계정"].apply(_classify)
+        # st.cache_data 미스일 때만 기록됨 — 디스크 캐시 적중이면 Parquet 로드 시간
+        with stage("data_loader.read_erp") as rec:
+            df = read_erp_cached(file_bytes)
+            rec["rows"] = len(df)
         return df
     except Exception as e:
         st.error(f"파일 읽기 오류: {e}")
         return None
 
 
+@st.cache_data
+def load_cube(file_bytes: bytes, file_name: str) -> pd.DataFrame | None:
+    """
+    업로드 파일의 [연도 × 월 × 품목명 × 환종] 월별 큐브 (models.build_monthly_cube).
+    업로드당 1회 계산 — 이후 기간 전환·리런은 원본 거래 행 대신 큐브만 자름.
+    """
+    df = load_excel(file_bytes, file_name)
+    return None if df is None else build_monthly_cube(df)
+
+
+@st.cache_data
+def load_month_index(file_bytes: bytes, file_name: str) -> dict | None:
+    """
+    월별 큐브 위 누적합 인덱스 (models.build_month_index) — 업로드당 1회.
+    YoY·분기·롤링·사용자 지정 등 모든 기간 비교가 두 누적 슬라이스 차이로 계산됨.
+    """
+    cube = load_cube(file_bytes, file_name)
+    if cube is None:
+        return None
+    return build_month_index(cube, item_accounts(load_excel(file_bytes, file_name)))
+
+
+@st.cache_data
+def load_customer_cube(file_bytes: bytes, file_name: str) -> pd.DataFrame | None:
+    """
+    [연도 × 월 × 매출처명 × 품목명 × 환종] 월별 큐브 — 매출처별 분석을 켤 때만 업로드당 1회.
+    기간별로 잘라 models.model_customer()에 그대로 넘김.
+    """
+    df = load_excel(file_bytes, file_name)
+    if df is None or "매출처명" not in df.columns:
+        return None
+    return build_monthly_cube(df, dims=CUSTOMER_DIMS)
+
+
 # ── 그룹 설정 직렬화 (Streamlit Cloud 대응: 다운로드/업로드 방식) ─────────────
 
 def groups_to_json_bytes(groups: dict) -> bytes:
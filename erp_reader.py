@@ -0,0 +1,185 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# erp_reader.py  —  ERP 엑셀 파싱 + 디스크 캐시 (순수 Python/pandas, Streamlit 의존 없음)
+# ══════════════════════════════════════════════════════════════════════════════
+import os as _os, sys as _sys
+_HERE = _os.path.dirname(_os.path.abspath(__file__))
+if _HERE not in _sys.path:
+    _sys.path.insert(0, _HERE)
+
+
+import hashlib
+import json
+import pandas as pd
+from io import BytesIO
+from config import COL_IDX, CACHE_DIR, CACHE_MAX_FILES, CACHE_MAX_BYTES
+
+# 파싱 결과 스키마가 바뀌면 올려서 기존 캐시를 무효화
+_CACHE_VERSION = 4
+
+
+def file_fingerprint(file_bytes: bytes) -> str:
+    """파일 내용 + COL_IDX 레이아웃 + 캐시 버전의 SHA-256 (캐시 키 겸 데이터셋 식별자)."""
+    h = hashlib.sha256(file_bytes)
+    h.update(json.dumps(COL_IDX, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    h.update(f"v{_CACHE_VERSION}".encode("ascii"))
+    return h.hexdigest()
+
+
+def parse_erp_excel(file_bytes: bytes) -> pd.DataFrame:
+    """
+    ERP 엑셀 파일을 읽어 정제된 DataFrame 반환.
+    컬럼 인덱스는 config.COL_IDX 기준. 실패 시 예외를 그대로 올림.
+    .xlsx는 openpyxl read-only 스트리밍으로 COL_IDX 열만 읽고, .xls는 pandas 전체 읽기.
+    """
+    if file_bytes[:2] == b"PK":   # .xlsx (zip 컨테이너)
+        cols = _read_columns_xlsx(file_bytes)
+    else:
+        cols = _read_columns_legacy(file_bytes)
+
+    df = pd.DataFrame({
+        name: (_to_number(vals) if name in _NUM_COLS else
+               _to_date(vals)   if name == "매출일" else
+               _to_text(vals))
+        for name, vals in cols.items()
+    })
+    df = df.dropna(subset=["매출일"]).reset_index(drop=True)
+    df["연도"]   = df["매출일"].dt.year.astype(int)
+    df["월"]     = df["매출일"].dt.month.astype(int)
+    df["품목명"] = df["품목명"].fillna("(미분류)").str.strip()
+    # 품목계정 분류: 제품→제품, 상품→상품, 원재료/부재료/제조-수선비→기타
+    acc = df["품목계정"].astype(str).str.strip()
+    df["품목계정_분류"] = acc.where(acc.isin(["제품", "상품"]), "기타")
+    df["환종"] = df["환종"].str.strip().str.upper()
+
+    # 차원 열은 범주형으로 — 이후 isin/groupby/merge가 문자열 해시 대신 정수 코드로 동작
+    for c in _DIM_COLS:
+        df[c] = df[c].astype("category")
+    return df
+
+
+_DIM_COLS = ["품목명", "환종", "매출처명", "품목계정", "단위", "품목계정_분류"]
+
+
+_NUM_COLS = ["수량", "환율", "외화단가", "외화금액", "원화단가", "원화금액"]
+
+
+def _read_columns_xlsx(file_bytes: bytes) -> dict:
+    """
+    첫 시트를 read-only 모드로 한 행씩 읽으며 COL_IDX 열만 리스트에 적재.
+    55개 이상 열 중 필요한 13개만 남기므로 파싱 시간·피크 메모리가 크게 줄어듦.
+    """
+    from openpyxl import load_workbook
+
+    names = list(COL_IDX)
+    idxs  = [COL_IDX[n] for n in names]
+    cols  = {n: [] for n in names}
+    appenders = [cols[n].append for n in names]
+
+    wb = load_workbook(BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        # read-only 모드는 시트의 <dimension> 태그를 믿고 범위를 정함 — ERP 내보내기가
+        # ref="A1"처럼 낡은 값을 쓰면 0행이 되므로 실제 행을 끝까지 읽도록 초기화 (pandas와 동일)
+        ws.reset_dimensions()
+        for row in ws.iter_rows(min_row=2, max_col=max(idxs) + 1, values_only=True):
+            n = len(row)
+            for add, i in zip(appenders, idxs):
+                add(row[i] if i < n else None)
+    finally:
+        wb.close()
+    return cols
+
+
+def _read_columns_legacy(file_bytes: bytes) -> dict:
+    """.xls 등 openpyxl 미지원 형식 — pandas로 전체 읽은 뒤 COL_IDX 열만 추출."""
+    df_raw = pd.read_excel(BytesIO(file_bytes), header=0, dtype=object)
+    return {
+        name: (df_raw.iloc[:, idx].tolist() if idx < len(df_raw.columns)
+               else [None] * len(df_raw))
+        for name, idx in COL_IDX.items()
+    }
+
+
+def _to_number(vals: list) -> pd.Series:
+    """숫자 셀은 그대로, 문자열 셀은 변환 시도. 변환 불가/빈칸은 0."""
+    return pd.to_numeric(pd.Series(vals, dtype=object), errors="coerce").fillna(0).astype(float)
+
+
+def _to_date(vals: list) -> pd.Series:
+    """날짜 셀(datetime)은 그대로, 문자열 셀은 파싱. 변환 불가는 NaT."""
+    return pd.to_datetime(pd.Series(vals, dtype=object), errors="coerce")
+
+
+def _to_text(vals: list) -> pd.Series:
+    """텍스트 열 — 숫자 셀도 문자열로 (정수형 실수는 '123'처럼 소수점 없이). 빈칸은 None."""
+    def _s(v):
+        if v is None:
+            return None
+        if isinstance(v, float) and v.is_integer():
+            return str(int(v))
+        return str(v)
+    return pd.Series([_s(v) for v in vals], dtype=object)
+
+
+def read_erp_cached(file_bytes: bytes, cache_dir: str | None = CACHE_DIR) -> pd.DataFrame:
+    """
+    parse_erp_excel + Parquet 디스크 캐시.
+    동일 파일(동일 SHA-256)은 재파싱 없이 캐시에서 로드 — 서버 재시작 후에도 유지.
+    캐시 읽기/쓰기 실패는 무시하고 원본 파싱 결과를 반환 (캐시는 최적화 용도일 뿐).
+    cache_dir=None 이면 캐시를 사용하지 않음.
+    """
+    if not cache_dir:
+        return parse_erp_excel(file_bytes)
+
+    path = _os.path.join(cache_dir, f"{file_fingerprint(file_bytes)}.parquet")
+    if _os.path.exists(path):
+        try:
+            df = pd.read_parquet(path)
+            _os.utime(path)   # 최근 사용 표시 — prune_cache()는 mtime 순으로 남김
+            return df
+        except Exception:
+            pass   # 손상/비호환 캐시 → 재파싱 후 덮어쓰기
+
+    df = parse_erp_excel(file_bytes)
+    try:
+        _os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{_os.getpid()}.tmp"
+        df.to_parquet(tmp, index=False)
+        _os.replace(tmp, path)   # 원자적 교체 — 동시 업로드 시 반쯤 쓴 파일 노출 방지
+        prune_cache(cache_dir, CACHE_MAX_FILES, CACHE_MAX_BYTES, keep=path)
+    except Exception:
+        pass
+    return df
+
+
+def prune_cache(cache_dir: str, max_files: int = CACHE_MAX_FILES,
+                max_bytes: int = CACHE_MAX_BYTES, keep: str | None = None) -> list:
+    """
+    Parquet 캐시 정리 — 최근 사용(mtime) 순으로 max_files개·max_bytes 안만 남기고 삭제.
+    keep(방금 쓴 파일)은 상한과 무관하게 유지. 다른 프로세스가 먼저 지운 파일은 무시.
+    버전이 바뀐 캐시(_CACHE_VERSION)는 다시 읽히지 않으므로 자연히 오래된 순으로 밀려 삭제됨.
+
+    반환: 삭제한 파일 경로 목록
+    """
+    entries = []
+    for entry in _os.scandir(cache_dir):
+        if entry.name.endswith(".parquet") and entry.is_file():
+            try:
+                info = entry.stat()
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, entry.path))
+    entries.sort(reverse=True)
+
+    removed, n, total = [], 0, 0
+    for _, size, path in entries:
+        n, total = n + 1, total + size
+        over = (max_files and n > max_files) or (max_bytes and total > max_bytes)
+        if over and path != keep:
+            try:
+                _os.remove(path)
+                removed.append(path)
+            except OSError:
+                pass
+            n, total = n - 1, total - size
+    return removed
@@ -9,11 +9,169 @@ if _HERE not in _sys.path:
 
 import numpy as np
 import pandas as pd
+from profiling import profiled
 
 
 # ── 집계 공통 함수 ─────────────────────────────────────────────────────────────
 
-def aggregate(df: pd.DataFrame) -> pd.DataFrame:
+_AGG_COLS  = ["품목명", "환종", "Q", "P_fx", "P_krw", "ER", "원화매출", "is_krw", "fx_imputed"]
+_CUBE_SUMS = ["수량", "원화금액", "외화금액", "원화단가_수량", "외화단가_수량"]
+# 정확 모드(exact=True)용 정수 합계 — 원화금액은 원, 외화금액은 1/FX_SCALE 단위 int64
+_INT_SUMS  = ["원화금액_int", "외화금액_int"]
+FX_SCALE   = 100
+
+
+def _won_int(v) -> np.ndarray:
+    """원화금액 → int64 원 (행 단위 반올림 — 원장 금액은 원 단위 정수)."""
+    return np.rint(np.asarray(v, dtype=float)).astype(np.int64)
+
+
+def _fx_int(v) -> np.ndarray:
+    """외화금액 → int64 (1/FX_SCALE 단위, 예: 센트)."""
+    return np.rint(np.asarray(v, dtype=float) * FX_SCALE).astype(np.int64)
+
+
+@profiled("models.build_monthly_cube", rows=len)
+def build_monthly_cube(df: pd.DataFrame, dims: tuple = ()) -> pd.DataFrame:
+    """
+    [연도 × 월 × 품목명 × 환종] 월별 합계 큐브 — 업로드당 1회 계산.
+    dims: 품목명 앞에 추가할 차원 열 (예: ("매출처명",) → 매출처 × 품목 × 환종 큐브, 결측은 '(미지정)')
+
+    합계 컬럼: 수량, 원화금액, 외화금액, 원화단가_수량(Σ원화단가·수량), 외화단가_수량(Σ외화단가·수량),
+              원화금액_int / 외화금액_int (정확 모드용 int64 합계 — 부동소수점 누적 오차 없음)
+    aggregate()에 필요한 정보를 모두 담고 있으므로, 원본 행 대신 큐브 행을
+    기간별로 잘라 그대로 aggregate()/model_A()/model_B()에 넘길 수 있음.
+    """
+    won_i = np.rint(df["원화금액"].to_numpy(float))
+    fx_i  = np.rint(df["외화금액"].to_numpy(float) * FX_SCALE)
+    # 정수값 float64 합산은 모든 부분합이 2**53 미만이면 정확 — 전체 절대값 합으로 보수적으로 확인하고
+    # 넘으면 int64로 합산 (float 열과 한 블록으로 묶여 groupby가 더 빠르고 피크 메모리가 작음)
+    if max(np.abs(won_i).sum(), np.abs(fx_i).sum()) >= 2**53:
+        won_i, fx_i = won_i.astype(np.int64), fx_i.astype(np.int64)
+    g = pd.DataFrame({
+        "연도":          df["연도"],
+        "월":            df["월"],
+        **{d: _fill_dim(df[d]) for d in dims},
+        "품목명":        df["품목명"],
+        "환종":          _normalize_ccy(df["환종"]),
+        "수량":          df["수량"],
+        "원화금액":      df["원화금액"],
+        "외화금액":      df["외화금액"],
+        "원화단가_수량": df["원화단가"] * df["수량"],
+        "외화단가_수량": df["외화단가"] * df["수량"],
+        "원화금액_int":  won_i,
+        "외화금액_int":  fx_i,
+    })
+    out = (g.groupby(["연도", "월", *dims, "품목명", "환종"], sort=False, observed=True)
+            [_CUBE_SUMS + _INT_SUMS].sum().reset_index())
+    out[_INT_SUMS] = out[_INT_SUMS].astype(np.int64)
+    return out
+
+
+# ── 월 누적합(prefix-sum) 인덱스 ──────────────────────────────────────────────
+# 월 서수(ord) = 연도×12 + (월−1).  기간 [start, end]는 두 누적 슬라이스 차이로 계산되므로
+# 1개월이든 36개월이든 비용이 같음.
+
+def ym_to_ord(year: int, month: int) -> int:
+    return int(year) * 12 + int(month) - 1
+
+
+def ord_to_ym(o: int) -> tuple[int, int]:
+    return o // 12, o % 12 + 1
+
+
+def period_ranges(code: str, c: int, n: int = 3):
+    """실적 월 서수 c 기준 (기준 범위, 실적 범위, 라벨 접미사). 범위 = (시작, 종료) 월 서수."""
+    _, m = ord_to_ym(c)
+    if code == "YoY":
+        return (c - 12, c - 12), (c, c), ""
+    if code == "MoM":
+        return (c - 1, c - 1), (c, c), ""
+    if code in ("YTD", "QTD", "HTD"):
+        span  = {"YTD": 12, "QTD": 3, "HTD": 6}[code]
+        start = c - (m - 1) % span
+        return (start - 12, c - 12), (start, c), " 누적"
+    if code == "R-YoY":
+        return (c - n + 1 - 12, c - 12), (c - n + 1, c), ""
+    if code == "R-PoP":
+        return (c - 2 * n + 1, c - n), (c - n + 1, c), ""
+    raise ValueError(f"알 수 없는 기간 모드: {code}")
+
+
+@profiled("models.build_month_index", rows=lambda ix: len(ix["keys"]))
+def build_month_index(cube: pd.DataFrame, accounts: pd.Series | None = None) -> dict:
+    """
+    월별 큐브 → [월 × (품목명, 환종)] 누적합 배열.
+
+    반환 dict:
+      first / last : 데이터가 있는 첫/마지막 월 서수
+      periods      : 데이터가 있는 월 서수 목록 (정렬)
+      keys         : (품목명, 환종) 키 DataFrame — cum 배열의 2번째 축 순서
+      cum          : ndarray (월수+1, 키수, len(_CUBE_SUMS)+1), 마지막 축 끝은 행 존재 카운트
+      cum_int      : int64 ndarray (월수+1, 키수, len(_INT_SUMS)) — 정수 합계 누적 (정확 모드)
+      accounts     : {품목명: 품목계정_분류} (item_accounts() 결과, 없으면 빈 Series)
+    """
+    accounts = pd.Series(dtype=object) if accounts is None else accounts
+    ords = (cube["연도"].to_numpy(np.int64) * 12 + cube["월"].to_numpy(np.int64) - 1)
+    if len(ords) == 0:
+        return dict(first=0, last=-1, periods=[], keys=cube[["품목명", "환종"]].iloc[:0],
+                    cum=np.zeros((1, 0, len(_CUBE_SUMS) + 1)),
+                    cum_int=np.zeros((1, 0, len(_INT_SUMS)), dtype=np.int64), accounts=accounts)
+
+    first, last = int(ords.min()), int(ords.max())
+    key_code = cube.groupby(["품목명", "환종"], sort=False, observed=True).ngroup().to_numpy()
+    n_keys   = int(key_code.max()) + 1
+    _, pos   = np.unique(key_code, return_index=True)
+    keys     = cube[["품목명", "환종"]].iloc[pos].reset_index(drop=True)
+
+    dense = np.zeros((last - first + 2, n_keys, len(_CUBE_SUMS) + 1))
+    dense[ords - first + 1, key_code, :-1] = cube[_CUBE_SUMS].to_numpy(float)
+    dense[ords - first + 1, key_code, -1]  = 1.0
+    dense_int = np.zeros((last - first + 2, n_keys, len(_INT_SUMS)), dtype=np.int64)
+    if set(_INT_SUMS).issubset(cube.columns):
+        dense_int[ords - first + 1, key_code] = cube[_INT_SUMS].to_numpy(np.int64)
+    else:   # 정수 합계 없는 큐브 — float 합계에서 변환
+        dense_int[ords - first + 1, key_code] = np.column_stack(
+            [_won_int(cube["원화금액"]), _fx_int(cube["외화금액"])])
+    return dict(first=first, last=last, periods=sorted(set(ords.tolist())),
+                keys=keys, cum=np.cumsum(dense, axis=0),
+                cum_int=np.cumsum(dense_int, axis=0), accounts=accounts)
+
+
+@profiled("models.range_sums", rows=len)
+def range_sums(index: dict, start: int, end: int) -> pd.DataFrame:
+    """
+    월 서수 [start, end] (양끝 포함) 기간의 (품목명, 환종) 합계 — 큐브와 같은 합계 컬럼.
+    반환값은 aggregate()/model_A()/model_B()에 큐브 행처럼 그대로 넘길 수 있음.
+    """
+    lo = max(start, index["first"]) - index["first"]
+    hi = min(end,   index["last"])  - index["first"] + 1
+    if hi <= lo:
+        return pd.DataFrame(columns=["품목명", "환종"] + _CUBE_SUMS + _INT_SUMS)
+
+    c_hi, c_lo = index["cum"][hi], index["cum"][lo]
+    diff = c_hi - c_lo
+    # 누적값이 사실상 같으면 차이는 0 (예: 반품 상계) — 부동소수점 잔차로 Q≠0이 되는 것 방지
+    diff[np.isclose(c_hi, c_lo, rtol=1e-12, atol=0)] = 0.0
+    present = diff[:, -1] > 0
+
+    out = index["keys"][present].reset_index(drop=True)
+    out[_CUBE_SUMS] = diff[present, :-1]
+    if "cum_int" in index:   # 정수 합계는 차이가 정확 — isclose 보정 불필요
+        d_int = index["cum_int"][hi] - index["cum_int"][lo]
+        for j, c in enumerate(_INT_SUMS):
+            out[c] = d_int[present, j]
+    return out
+
+
+def slice_period(frame: pd.DataFrame, start: int, end: int) -> pd.DataFrame:
+    """원본 행 또는 월별 큐브에서 월 서수 [start, end] 기간만 추출."""
+    o = frame["연도"] * 12 + frame["월"] - 1
+    return frame[(o >= start) & (o <= end)]
+
+
+@profiled("models.aggregate", rows=len)
+def aggregate(df: pd.DataFrame, exact: bool = False, dims: tuple = ()) -> pd.DataFrame:
     """
     [품목명 × 환종] 기준 분리 집계.
 
@@ -23,73 +181,169 @@ def aggregate(df: pd.DataFrame) -> pd.DataFrame:
       - USD행 : P_fx  = 외화단가 가중평균,  P_krw = 원화단가 가중평균,
                 ER    = 원화매출합 / 외화금액합  (항등식 Q·P_fx·ER = 원화매출 보장)
 
-    반환 컬럼: 품목명, 환종, Q, P_fx, P_krw, ER, 원화매출, is_krw
+    입력은 원본 거래 행 또는 build_monthly_cube() 큐브 행 모두 가능
+    (원화단가_수량/외화단가_수량 합계 컬럼이 있으면 그대로 사용).
+
+    exact=True: 원화매출을 int64 원 합계(원화금액_int)로, ER의 외화금액을 정수 합계
+    (외화금액_int / FX_SCALE)로 계산 — 수백만 행을 합산해도 원장 합계와 원 단위까지 일치.
+    dims: 품목명 앞에 추가할 집계 차원 (예: ("매출처명",) → [매출처명 × 품목명 × 환종]).
+
+    반환 컬럼: (dims), 품목명, 환종, Q, P_fx, P_krw, ER, 원화매출, is_krw,
+               fx_imputed (외화금액 합계 0 → Q·P_fx로 대체한 외화 행)
     """
     if df.empty:
-        return pd.DataFrame(
-            columns=["품목명", "환종", "Q", "P_fx", "P_krw", "ER", "원화매출", "is_krw"])
-
-    g = df.copy()
-    g["_ccy"] = g["환종"].str.strip().str.upper()
-
-    rows = []
-    for (item, ccy), grp in g.groupby(["품목명", "_ccy"]):
-        is_krw = (ccy == "KRW")
-        Q      = grp["수량"].sum()
-        rev    = grp["원화금액"].sum()
-        if Q == 0:
-            continue
+        return pd.DataFrame(columns=[*dims] + _AGG_COLS)
+
+    is_cube = "원화단가_수량" in df.columns
+    g = pd.DataFrame({
+        **{d: _fill_dim(df[d]) for d in dims},
+        "품목명":        df["품목명"],
+        "_ccy":          _normalize_ccy(df["환종"]),
+        "수량":          df["수량"],
+        "원화금액":      df["원화금액"],
+        "외화금액":      df["외화금액"],
+        "원화단가_수량": df["원화단가_수량"] if is_cube else df["원화단가"] * df["수량"],
+        "외화단가_수량": df["외화단가_수량"] if is_cube else df["외화단가"] * df["수량"],
+    })
+    sums = dict(
+        Q=("수량", "sum"),
+        원화매출=("원화금액", "sum"),
+        외화금액=("외화금액", "sum"),
+        원화단가_수량=("원화단가_수량", "sum"),
+        외화단가_수량=("외화단가_수량", "sum"),
+    )
+    if exact:
+        has_int = set(_INT_SUMS).issubset(df.columns)
+        g["원화금액"] = df["원화금액_int"].to_numpy(np.int64) if has_int else _won_int(df["원화금액"])
+        g["외화금액"] = df["외화금액_int"].to_numpy(np.int64) if has_int else _fx_int(df["외화금액"])
+    s = g.groupby([*dims, "품목명", "_ccy"], sort=False, observed=True).agg(**sums).reset_index()
+    s = s[s["Q"] != 0]
+    if s.empty:
+        return pd.DataFrame(columns=[*dims] + _AGG_COLS)
 
-        P_krw = (grp["원화단가"] * grp["수량"]).sum() / Q
+    Q      = s["Q"].to_numpy(float)
+    rev    = s["원화매출"].to_numpy(np.int64 if exact else float)
+    is_krw = (s["_ccy"] == "KRW").to_numpy()
+    P_fx, P_krw, ER, fx_imputed = _unit_values(
+        Q, rev, s["외화금액"].to_numpy(float) / (FX_SCALE if exact else 1),
+        s["원화단가_수량"].to_numpy(float), s["외화단가_수량"].to_numpy(float), is_krw)
 
-        if is_krw:
-            P_fx = np.nan
-            ER   = np.nan
-        else:
-            P_fx = (grp["외화단가"] * grp["수량"]).sum() / Q
-            fx_amt_sum = grp["외화금액"].sum()
-            if fx_amt_sum == 0:
-                fx_amt_sum = Q * P_fx
-            ER = rev / fx_amt_sum if fx_amt_sum != 0 else np.nan
+    return pd.DataFrame({
+        **{d: s[d].array for d in dims},
+        "품목명": s["품목명"].array, "환종": s["_ccy"].array,
+        "Q": Q, "P_fx": P_fx, "P_krw": P_krw,
+        "ER": ER, "원화매출": rev, "is_krw": is_krw, "fx_imputed": fx_imputed,
+    })
+
+
+def _unit_values(Q, rev, fx_amt, krw_qty, fx_qty, is_krw):
+    """
+    합계 배열 → 가중평균 단가·환율 (aggregate()와 model_trend() 공통, 배열 shape 무관).
+    반환: (P_fx, P_krw, ER, fx_imputed)
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        P_krw  = krw_qty / Q
+        P_fx   = np.where(is_krw, np.nan, fx_qty / Q)
+        fx_imputed = ~is_krw & (fx_amt == 0)
+        fx_amt = np.where(fx_amt == 0, Q * P_fx, fx_amt)   # 외화금액 누락 시 Q·P_fx로 대체
+        ER     = np.where(is_krw | (fx_amt == 0), np.nan, rev / fx_amt)
+    return P_fx, P_krw, ER, fx_imputed
 
-        rows.append({
-            "품목명": item, "환종": ccy,
-            "Q": Q, "P_fx": P_fx, "P_krw": P_krw,
-            "ER": ER, "원화매출": rev, "is_krw": is_krw,
-        })
 
-    return pd.DataFrame(rows)
+def _fill_dim(s: pd.Series, missing: str = "(미지정)") -> pd.Series:
+    """추가 차원 열(매출처명 등)의 결측을 라벨로 — groupby(observed=True)에서 행이 빠지지 않게."""
+    if not s.isna().any():
+        return s
+    if isinstance(s.dtype, pd.CategoricalDtype) and missing not in s.cat.categories:
+        s = s.cat.add_categories([missing])
+    return s.fillna(missing)
 
 
-def _merge_base_curr(base_df: pd.DataFrame, curr_df: pd.DataFrame) -> pd.DataFrame:
+def _normalize_ccy(s: pd.Series) -> pd.Series:
+    """
+    환종 정규화(공백 제거·대문자).
+    범주형이면 카테고리 목록만 변환하고 코드를 재매핑 — 행 단위 문자열 연산 없음.
+    """
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.str.strip().str.upper()
+    norm  = s.cat.categories.astype(str).str.strip().str.upper()
+    uniq  = pd.Index(norm.unique())
+    remap = uniq.get_indexer(norm)
+    codes = s.cat.codes.to_numpy()
+    codes = np.where(codes < 0, -1, remap[codes])
+    return pd.Series(pd.Categorical.from_codes(codes, uniq), index=s.index)
+
+
+def _merge_base_curr(base_df: pd.DataFrame, curr_df: pd.DataFrame,
+                     exact: bool = False) -> pd.DataFrame:
     """
     기준/실적 집계 후 [품목명 × 환종] outer merge.
     신규(Q0=0) / 단종(Q1=0) 케이스도 자동 포함.
+    exact=True면 매출0/매출1은 int64 원.
+    """
+    return _merge_aggregates(aggregate(base_df, exact), aggregate(curr_df, exact), exact)
+
+
+def _merge_aggregates(b_agg: pd.DataFrame, c_agg: pd.DataFrame,
+                      exact: bool = False, dims: tuple = ()) -> pd.DataFrame:
     """
-    b = aggregate(base_df).rename(columns={
+    aggregate() 결과 두 개 → 기준(…0)/실적(…1) 접미사 outer merge (_merge_base_curr 본체).
+    dims: aggregate(dims=...)로 추가한 차원 — merge 키 앞에 붙음.
+    """
+    b = b_agg.rename(columns={
         "Q": "Q0", "P_fx": "P0_fx", "P_krw": "P0_krw",
-        "ER": "ER0", "원화매출": "매출0", "is_krw": "is_krw0",
+        "ER": "ER0", "원화매출": "매출0", "is_krw": "is_krw0", "fx_imputed": "fx_imputed0",
     })
-    c = aggregate(curr_df).rename(columns={
+    c = c_agg.rename(columns={
         "Q": "Q1", "P_fx": "P1_fx", "P_krw": "P1_krw",
-        "ER": "ER1", "원화매출": "매출1", "is_krw": "is_krw1",
+        "ER": "ER1", "원화매출": "매출1", "is_krw": "is_krw1", "fx_imputed": "fx_imputed1",
     })
-    m = pd.merge(b, c, on=["품목명", "환종"], how="outer")
+    m = pd.merge(b, c, on=[*dims, "품목명", "환종"], how="outer")
 
     num_cols  = ["Q0","P0_fx","P0_krw","ER0","매출0","Q1","P1_fx","P1_krw","ER1","매출1"]
-    bool_cols = ["is_krw0", "is_krw1"]
+    bool_cols = ["is_krw0", "is_krw1", "fx_imputed0", "fx_imputed1"]
     m[num_cols]  = m[num_cols].fillna(0)
-    m[bool_cols] = m[bool_cols].fillna(False)
+    # outer merge로 object가 된 플래그 — nullable boolean 경유로 채워 다운캐스팅 경고 없이 bool로
+    m[bool_cols] = m[bool_cols].astype("boolean").fillna(False).astype(bool)
     m["is_krw"]  = m["is_krw0"] | m["is_krw1"]
+    if exact:   # outer merge 결측으로 float가 된 정수 매출 복원
+        m[["매출0", "매출1"]] = m[["매출0", "매출1"]].astype(np.int64)
     return m
 
 
-def _summarize_by_item(m: pd.DataFrame) -> pd.DataFrame:
+def _allocate_won(total: np.ndarray, qty, price, fx):
+    """
+    실수 분해값 3개 → 행마다 합이 total(int64 원)과 정확히 같은 int64 분해 (최대잔여 방식).
+    각 효과를 내림한 뒤 모자란 원을 소수부가 큰 효과부터 1원씩 배분 — 동률은 ①→②→③ 순.
+    배분 후에도 남는 차이(비유한 값 등)는 ②단가차이에 귀속.
+
+    반환: (수량차이, 단가차이, 환율차이) int64 ndarray 3개
+    """
+    e = np.column_stack([qty, price, fx])
+    e = np.where(np.isfinite(e), e, 0.0)
+    floor = np.floor(e)
+    frac  = e - floor
+    out   = floor.astype(np.int64)
+
+    short = total - out.sum(axis=1)
+    order = np.argsort(-frac, axis=1, kind="stable")
+    rank  = np.empty_like(order)
+    np.put_along_axis(rank, order, np.broadcast_to(np.arange(3), order.shape), axis=1)
+    out  += rank < np.clip(short, 0, 3)[:, None]
+    out[:, 1] += total - out.sum(axis=1)
+    return out[:, 0], out[:, 1], out[:, 2]
+
+
+_EFFECT_COLS = ["수량차이", "단가차이", "환율차이"]
+
+
+def _summarize_by_item(m: pd.DataFrame, effect_cols: list = _EFFECT_COLS) -> pd.DataFrame:
     """환종별 raw 계산 결과를 품목명 단위로 합산."""
-    agg_cols = ["매출0","매출1","총차이","수량차이","단가차이","환율차이"]
-    grp_sum  = m.groupby("품목명")[agg_cols].sum().reset_index()
-    grp_krw  = m.groupby("품목명")["is_krw"].all().reset_index()
-    grp_q    = m.groupby("품목명")[["Q0","Q1"]].sum().reset_index()
+    agg_cols = ["매출0","매출1","총차이"] + list(effect_cols)
+    by_item  = m.groupby("품목명", observed=True)
+    grp_sum  = by_item[agg_cols].sum().reset_index()
+    grp_krw  = by_item["is_krw"].all().reset_index()
+    grp_q    = by_item[["Q0","Q1"]].sum().reset_index()
     result   = pd.merge(grp_sum, grp_krw, on="품목명")
     result   = pd.merge(result,  grp_q,   on="품목명")
     for c in ["P0_fx","P0_krw","ER0","P1_fx","P1_krw","ER1"]:
@@ -99,7 +353,8 @@ def _summarize_by_item(m: pd.DataFrame) -> pd.DataFrame:
 
 # ── 모델 A: 원인별 임팩트 분석 ────────────────────────────────────────────────
 
-def model_A(base_df: pd.DataFrame, curr_df: pd.DataFrame):
+@profiled("models.model_A", rows=lambda r: len(r[1]))
+def model_A(base_df: pd.DataFrame, curr_df: pd.DataFrame, exact: bool = False):
     """
     원인별 임팩트 분석 — 재무/감사용 표준 모델
 
@@ -108,79 +363,811 @@ def model_A(base_df: pd.DataFrame, curr_df: pd.DataFrame):
           항등식: ①+②+③ = 매출1 − 매출0  (항상 성립)
 
     신규(Q0=0) → 매출1 전액 → ①,  단종(Q1=0) → 매출0 전액 → ①(-)
+    exact=True: int64 원 분해 (_allocate_won) — 행·그룹 합계가 원장과 원 단위까지 일치
 
     반환: (품목명 단위 요약 DataFrame, 환종별 raw DataFrame)
     """
-    m = _merge_base_curr(base_df, curr_df)
+    return run_model(base_df, curr_df, "A", exact)
+
+
+def _raw_effects_A(m: pd.DataFrame):
+    """
+    모델 A 공식값 — 잔차 흡수·신규/단종 처리 전.
+    반환: (수량차이, 단가차이, 환율차이, 총차이) ndarray 4개
+    """
+    Q0, Q1         = m["Q0"].to_numpy(float),     m["Q1"].to_numpy(float)
+    P0_fx, P1_fx   = m["P0_fx"].to_numpy(float),  m["P1_fx"].to_numpy(float)
+    P0_krw, P1_krw = m["P0_krw"].to_numpy(float), m["P1_krw"].to_numpy(float)
+    ER0, ER1       = m["ER0"].to_numpy(float),    m["ER1"].to_numpy(float)
+    R0, R1         = m["매출0"].to_numpy(float),   m["매출1"].to_numpy(float)
+    is_krw         = m["is_krw"].to_numpy(bool)
 
-    def calc_row(row):
-        if row["Q0"] == 0:
-            return pd.Series({"수량차이": row["매출1"], "단가차이": 0.0, "환율차이": 0.0})
-        if row["Q1"] == 0:
-            return pd.Series({"수량차이": -row["매출0"], "단가차이": 0.0, "환율차이": 0.0})
+    with np.errstate(invalid="ignore", over="ignore"):
+        qty   = np.where(is_krw, (Q1 - Q0) * P0_krw,     (Q1 - Q0) * P0_fx * ER0)
+        price = np.where(is_krw, (P1_krw - P0_krw) * Q1, (P1_fx - P0_fx) * Q1 * ER0)
+        fx    = np.where(is_krw, 0.0,                    (ER1 - ER0) * Q1 * P1_fx)
+    return qty, price, fx, R1 - R0
 
-        if row["is_krw"]:
-            qty   = (row["Q1"]     - row["Q0"])     * row["P0_krw"]
-            price = (row["P1_krw"] - row["P0_krw"]) * row["Q1"]
-            fx    = 0.0
-        else:
-            qty   = (row["Q1"]    - row["Q0"])    * row["P0_fx"] * row["ER0"]
-            price = (row["P1_fx"] - row["P0_fx"]) * row["Q1"]   * row["ER0"]
-            fx    = (row["ER1"]   - row["ER0"])   * row["Q1"]   * row["P1_fx"]
 
-        total = row["매출1"] - row["매출0"]
-        if abs(qty + price + fx - total) > 1:
-            price += total - (qty + price + fx)   # 부동소수점 잔차 흡수
+def _effects_A(m: pd.DataFrame):
+    """
+    모델 A 벡터 커널 — merge 결과 전체 행을 한 번에 계산.
+    행 단위 분기(신규/단종/KRW/외화, 잔차 흡수)는 모두 마스크로 처리.
 
-        return pd.Series({"수량차이": qty, "단가차이": price, "환율차이": fx})
+    반환: (수량차이, 단가차이, 환율차이) ndarray 3개
+    """
+    qty, price, fx, total = _raw_effects_A(m)
 
-    v = m.apply(calc_row, axis=1)
-    m["수량차이"], m["단가차이"], m["환율차이"] = v["수량차이"], v["단가차이"], v["환율차이"]
-    m["총차이"] = m["매출1"] - m["매출0"]
+    with np.errstate(invalid="ignore", over="ignore"):
+        # 부동소수점 잔차 흡수 (1원 초과분만 단가차이로)
+        resid = total - (qty + price + fx)
+        price = np.where(np.abs(resid) > 1, price + resid, price)
 
-    return _summarize_by_item(m), m.copy()
+    # 신규(Q0=0) → 매출1 전액 ①  /  단종(Q1=0) → 매출0 전액 ①(−)
+    Q0, Q1  = m["Q0"].to_numpy(float), m["Q1"].to_numpy(float)
+    R0, R1  = m["매출0"].to_numpy(float), m["매출1"].to_numpy(float)
+    is_new  = Q0 == 0
+    is_disc = ~is_new & (Q1 == 0)
+    qty   = np.select([is_new, is_disc], [R1, -R0], qty)
+    price = np.where(is_new | is_disc, 0.0, price)
+    fx    = np.where(is_new | is_disc, 0.0, fx)
+    return qty, price, fx
 
 
 # ── 모델 B: 활동별 증분 분석 ──────────────────────────────────────────────────
 
-def model_B(base_df: pd.DataFrame, curr_df: pd.DataFrame):
+@profiled("models.model_B", rows=lambda r: len(r[1]))
+def model_B(base_df: pd.DataFrame, curr_df: pd.DataFrame, exact: bool = False):
     """
     활동별 증분 분석 — 영업/전략 보고용 모델
 
     ① 수량차이: Q↑→(Q1−Q0)×P1_krw  /  Q↓→(Q1−Q0)×P0_krw
     ③ 환율차이: P/Q 방향 4-Case 분기  (KRW=0)
     ② 단가차이: 총차이 − ① − ③  (Residual)
+    exact=True: int64 원 분해 (_allocate_won)
 
     반환: (품목명 단위 요약 DataFrame, 환종별 raw DataFrame)
     """
-    m = _merge_base_curr(base_df, curr_df)
-
-    def calc_row(row):
-        if row["Q0"] == 0:
-            return pd.Series({"수량차이": row["매출1"], "단가차이": 0.0, "환율차이": 0.0})
-        if row["Q1"] == 0:
-            return pd.Series({"수량차이": -row["매출0"], "단가차이": 0.0, "환율차이": 0.0})
-
-        q_up  = row["Q1"] >= row["Q0"]
-        qty   = (row["Q1"] - row["Q0"]) * (row["P1_krw"] if q_up else row["P0_krw"])
-        total = row["매출1"] - row["매출0"]
-
-        if row["is_krw"]:
-            fx    = 0.0
-            price = total - qty
-        else:
-            dER  = row["ER1"] - row["ER0"]
-            p_up = row["P1_fx"] >= row["P0_fx"]
-            if   p_up and     q_up:  fx = dER * row["Q0"] * row["P1_fx"]
-            elif p_up and not q_up:  fx = dER * row["Q1"] * row["P1_fx"]
-            elif not p_up and q_up:  fx = dER * row["Q0"] * row["P0_fx"]
-            else:                    fx = dER * row["Q1"] * row["P0_fx"]
-            price = total - qty - fx
-
-        return pd.Series({"수량차이": qty, "단가차이": price, "환율차이": fx})
-
-    v = m.apply(calc_row, axis=1)
-    m["수량차이"], m["단가차이"], m["환율차이"] = v["수량차이"], v["단가차이"], v["환율차이"]
+    return run_model(base_df, curr_df, "B", exact)
+
+
+def _effects_B(m: pd.DataFrame):
+    """
+    모델 B 벡터 커널 — P/Q 방향 4-Case를 np.select로 한 번에 분기.
+    ②는 총차이 − ① − ③ 잔여값이므로 행마다 ①+②+③ = 총차이가 그대로 유지됨.
+
+    반환: (수량차이, 단가차이, 환율차이) ndarray 3개
+    """
+    Q0, Q1         = m["Q0"].to_numpy(float),     m["Q1"].to_numpy(float)
+    P0_fx, P1_fx   = m["P0_fx"].to_numpy(float),  m["P1_fx"].to_numpy(float)
+    P0_krw, P1_krw = m["P0_krw"].to_numpy(float), m["P1_krw"].to_numpy(float)
+    ER0, ER1       = m["ER0"].to_numpy(float),    m["ER1"].to_numpy(float)
+    R0, R1         = m["매출0"].to_numpy(float),   m["매출1"].to_numpy(float)
+    is_krw         = m["is_krw"].to_numpy(bool)
+
+    q_up = Q1 >= Q0
+    p_up = P1_fx >= P0_fx
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        qty = (Q1 - Q0) * np.where(q_up, P1_krw, P0_krw)
+        dER = ER1 - ER0
+        fx  = np.select(
+            [p_up & q_up, p_up & ~q_up, ~p_up & q_up],
+            [dER * Q0 * P1_fx, dER * Q1 * P1_fx, dER * Q0 * P0_fx],
+            dER * Q1 * P0_fx,
+        )
+        fx    = np.where(is_krw, 0.0, fx)
+        price = R1 - R0 - qty - fx
+
+    # 신규(Q0=0) → 매출1 전액 ①  /  단종(Q1=0) → 매출0 전액 ①(−)
+    is_new  = Q0 == 0
+    is_disc = ~is_new & (Q1 == 0)
+    qty   = np.select([is_new, is_disc], [R1, -R0], qty)
+    price = np.where(is_new | is_disc, 0.0, price)
+    fx    = np.where(is_new | is_disc, 0.0, fx)
+    return qty, price, fx
+
+
+def _effects(m: pd.DataFrame, kernel, exact: bool):
+    """모델 커널 실행 — exact면 결과를 int64 원으로 배분 (합 = 매출1 − 매출0 정확히)."""
+    qty, price, fx = kernel(m)
+    if exact:
+        total = m["매출1"].to_numpy(np.int64) - m["매출0"].to_numpy(np.int64)
+        return _allocate_won(total, qty, price, fx)
+    return qty, price, fx
+
+
+def _decompose(m: pd.DataFrame, model: str, exact: bool) -> pd.DataFrame:
+    """
+    merge 형태 행(m)에 등록 모델의 커널 적용 — ①②③ + 총차이 열을 m에 바로 추가하고 m 반환.
+    단일 기간 쌍·월별 추이·다중 기준·매출처 리프가 모두 이 한 경로로 분해됨.
+    """
+    m["수량차이"], m["단가차이"], m["환율차이"] = _effects(m, MODELS[model]["kernel"], exact)
     m["총차이"] = m["매출1"] - m["매출0"]
+    return m
+
+
+def run_model(base_df: pd.DataFrame, curr_df: pd.DataFrame, model: str = "A",
+              exact: bool = False):
+    """
+    등록 모델(MODELS) 실행 — 집계·merge 1회 → 커널 → 품목명 요약.
+    후처리(post)가 있는 모델(예: C 볼륨·믹스)은 그룹·품목계정을 붙인 뒤 apply_post()로 마무리.
 
+    반환: (품목명 단위 요약 DataFrame, 환종별 raw DataFrame)
+    """
+    m = _decompose(_merge_base_curr(base_df, curr_df, exact), model, exact)
     return _summarize_by_item(m), m.copy()
+
+
+# ── 모델 C: 볼륨·믹스 분석 ────────────────────────────────────────────────────
+
+MIX_KEYS   = {"그룹": "커스텀 그룹", "품목계정_분류": "품목계정"}   # 믹스 기준 열 → 표시명
+
+
+@profiled("models.mix_split", rows=len)
+def mix_split(m: pd.DataFrame, by: str = "그룹", exact: bool = False,
+              within: str | None = None) -> pd.DataFrame:
+    """
+    모델 C — 모델 A의 ①수량차이를 믹스 기준(by: 그룹 / 품목계정_분류) 안에서
+    볼륨차이 + 믹스차이로 분할. ②단가차이·③환율차이는 모델 A 그대로.
+
+      r_g      = ΣQ1_g / ΣQ0_g − 1        그룹 g의 수량 증감률 (구성비는 기준 그대로 가정)
+      볼륨차이 = r_g × 매출0               구성비 불변일 때의 물량 효과
+      믹스차이 = ①수량차이 − 볼륨차이      그룹 안 품목 구성 변화 (신규·단종 품목 포함)
+
+    볼륨 + 믹스 = ① 이므로 ①+②+③ = 총차이 항등식 유지. 그룹 단위 값은 행 단위 값의 합 —
+    그룹 합계는 bincount 1회, 행 환산은 코드 인덱싱 1회 (품목 수와 무관하게 배열 연산만).
+    ΣQ0_g ≤ 0인 그룹(기준 수량 없음)은 ① 전액을 볼륨차이로. 수량 단위가 다른 품목이 섞인
+    그룹은 ΣQ의 의미가 약하므로 단위가 같은 품목끼리 묶는 것이 좋음.
+    exact=True면 볼륨차이를 원 단위 반올림하고 믹스차이 = ① − 볼륨 (int64, 합 정확).
+    within: 여러 기간 쌍을 쌓은 행(월별 추이·다중 기준)의 쌍 구분 열 — 쌍마다 따로 r_g 계산.
+
+    m: model_A() / select_model(…, "A") 결과 (요약 또는 환종별 raw) + by 열
+    반환: m 복사본 + 볼륨차이, 믹스차이
+    """
+    codes, uniq = pd.factorize(m[by])
+    codes = np.where(codes < 0, len(uniq), codes)   # 결측 기준은 별도 그룹 하나로
+    n     = len(uniq) + 1
+    if within is not None:
+        pair, pairs = pd.factorize(m[within])
+        codes, n    = pair * n + codes, n * len(pairs)
+    q0 = np.bincount(codes, weights=m["Q0"].to_numpy(float), minlength=n)
+    q1 = np.bincount(codes, weights=m["Q1"].to_numpy(float), minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(q0 > 0, q1 / q0 - 1.0, np.nan)[codes]
+
+    qty = m["수량차이"].to_numpy(np.int64 if exact else float)
+    vol = np.where(np.isnan(growth), qty, growth * m["매출0"].to_numpy(float))
+    if exact:
+        vol = np.rint(vol).astype(np.int64)
+    out = m.copy()
+    out["볼륨차이"] = vol
+    out["믹스차이"] = qty - vol
+    return out
+
+
+@profiled("models.model_C", rows=lambda r: len(r[1]))
+def model_C(base_df: pd.DataFrame, curr_df: pd.DataFrame, item_mapping: dict | None = None,
+            exact: bool = False):
+    """
+    볼륨·믹스 분석 — 모델 A 분해 후 커스텀 그룹(item_mapping) 안에서 ①을 볼륨·믹스로 분할.
+    item_mapping 없으면 전체 품목이 한 그룹('미분류'). 품목계정 기준은 mix_split(…, "품목계정_분류").
+
+    반환: (품목명 단위 요약 DataFrame, 환종별 raw DataFrame) — 둘 다 '그룹'·볼륨차이·믹스차이 포함
+    """
+    va, m = run_model(base_df, curr_df, "C", exact)
+    return apply_post("C", attach_groups(va, item_mapping or {}),
+                      attach_groups(m, item_mapping or {}), exact, by="그룹")
+
+
+# ── 모델 레지스트리 ───────────────────────────────────────────────────────────
+# 모델 = merge 결과 전체 행을 받아 (①, ②, ③) ndarray 3개를 돌려주는 벡터 커널 + 표시 메타데이터.
+# 사이드바 카드·배너·KPI 카드·Waterfall 비고·모델 가이드·엑셀 라벨·CLI 선택지가 모두 이 표에서
+# 만들어지므로, 새 분해 방식은 커널 함수와 register_model() 호출만으로 UI 수정 없이 추가됨.
+
+MODELS: dict = {}
+# 분해 열 → 표시명 (①②③ + 등록 모델의 추가 열). 표·엑셀 헤더는 여기에 "(원)"을 붙여 씀
+EFFECT_LABELS = {"수량차이": "①수량차이", "단가차이": "②단가차이", "환율차이": "③환율차이"}
+_REQUIRED_META = ("palette", "kpis", "notes", "compare", "guide")
+_PALETTE_KEYS  = ("accent", "badge", "dark", "mid", "light", "ink", "pale")
+
+
+def register_model(code: str, kernel, *, title: str, raw=None, post=None,
+                   options: dict | None = None, columns: tuple = (), **meta) -> dict:
+    """
+    분해 모델 등록 — MODELS[code]에 커널과 메타데이터를 보관 (등록 순서 = 화면 순서).
+
+      kernel   (m) → (수량차이, 단가차이, 환율차이) — _merge_aggregates() 형태 행 전체를 한 번에
+      raw      (m) → 흡수 전 공식값 4개 (identity_diagnostics 잔차 진단용, 없으면 잔차 0)
+      post     (m, exact=…, within=…, **options) → m + columns 열 — 그룹·품목계정을 붙인 행 단위
+               추가 분해 (apply_post·post_rows). within: 여러 기간 쌍을 쌓은 행의 쌍 구분 열
+      options  {인자명: dict(label, title, choices={값: 표시명}, key=위젯 키)} — post에 넘길 선택지
+      columns  ((열, 표시명), …) — post가 ①을 나눈 분해 열, 합 = ① (EFFECT_LABELS에 합류,
+               표·가이드·추이 차트가 effect_columns() 순서로 표시 — 차트는 ① 대신 이 열을 쌓음)
+
+    표시 메타데이터(meta):
+      icon, export(엑셀 파일명 라벨), tagline(배너 부제), intro·use·tag(선택 카드 문구),
+      formulas [(기호, 식)] 배너·카드 공식, kpis [(열, 라벨, 식)] KPI 카드,
+      notes {열: 비고} Waterfall 근거 표, guide {열: (제목, [식], 질문, 설명, 주석)} 모델 가이드,
+      compare {비교 항목: ([칩], 설명)} 가이드 비교표,
+      palette dict(accent, badge, dark, mid, light, ink, pale) 색상
+    같은 커널 함수를 쓰는 모델은 계산 결과(model_AB 컬럼·파이프라인 캐시)를 공유함 — kernel_code().
+    palette·kpis·notes·compare·guide(①②③ 항목 필수)가 빠지면 ValueError — 화면에서 KeyError로
+    늦게 터지지 않도록 등록 시점에 검사. columns의 추가 열은 guide 항목이 있으면 가이드에 표시.
+    """
+    missing = [k for k in _REQUIRED_META if not meta.get(k)]
+    missing += [f"palette[{k}]" for k in _PALETTE_KEYS if k not in meta.get("palette", {})]
+    missing += [f"guide[{c}]" for c in _EFFECT_COLS if c not in meta.get("guide", {})]
+    if missing:
+        raise ValueError(f"모델 {code} 등록 메타데이터 누락: {', '.join(missing)}")
+    MODELS[code] = dict(code=code, kernel=kernel, raw=raw, post=post, options=options or {},
+                        columns=tuple(columns), title=title,
+                        short=f"모델 {code}", name=f"모델 {code} — {title}", **meta)
+    EFFECT_LABELS.update(dict(columns))
+    return MODELS[code]
+
+
+def kernel_code(model: str) -> str:
+    """모델 코드 → 같은 커널을 처음 등록한 모델 코드 (예: C → A)."""
+    kernel = MODELS[model]["kernel"]
+    return next(k for k, spec in MODELS.items() if spec["kernel"] is kernel)
+
+
+def kernel_codes() -> list:
+    """서로 다른 커널의 대표 모델 코드 목록 (등록 순서) — model_AB가 계산하는 접미사."""
+    return list(dict.fromkeys(kernel_code(k) for k in MODELS))
+
+
+def _with_extra(cols: list, m: pd.DataFrame) -> list:
+    """합계 열 목록 + m에 있는 모델 추가 분해 열 (예: C 볼륨·믹스) — 추이·다중 기준·롤업 합산용."""
+    return cols + [c for c in effect_columns(m.columns) if c not in cols]
+
+
+def effect_columns(cols) -> list:
+    """cols 중 분해 열을 표시 순서로 — ①, 추가 열(①a·①b …), ②, ③."""
+    extra = [c for c in EFFECT_LABELS if c not in _EFFECT_COLS]
+    order = [_EFFECT_COLS[0], *extra, *_EFFECT_COLS[1:]]
+    return [c for c in order if c in set(cols)]
+
+
+def post_rows(model: str, m: pd.DataFrame, exact: bool = False, within: str | None = None,
+              **options) -> pd.DataFrame:
+    """행 단위 후처리(post) — 없는 모델은 그대로. m에는 그룹·품목계정_분류가 붙어 있어야 함."""
+    post = MODELS[model]["post"]
+    return m if post is None else post(m, exact=exact, within=within, **options)
+
+
+def apply_post(model: str, va: pd.DataFrame, m: pd.DataFrame, exact: bool = False, **options):
+    """
+    (품목명 요약, 환종별 raw) 한 쌍에 모델 후처리 — raw 행에서 post_rows() 후 품목별 합을 요약에 붙임.
+    요약을 따로 분할하면 정확 모드 반올림이 어긋나므로, 두 표의 추가 열 합계가 원 단위까지 같도록.
+    options는 MODELS[model]["options"] 인자.
+    """
+    spec = MODELS[model]
+    if spec["post"] is None:
+        return va, m
+    m    = post_rows(model, m, exact, **options)
+    cols = [c for c, _ in spec["columns"]]
+    sums = m.groupby("품목명", observed=True)[cols].sum()
+    return va.drop(columns=cols, errors="ignore").join(sums, on="품목명"), m
+
+
+def _post_stacked(m: pd.DataFrame, model: str, exact: bool, within: str,
+                  item_mapping, accounts, options) -> pd.DataFrame:
+    """쌓인 기간 쌍 행(월별 추이·다중 기준)에 후처리 — 그룹·품목계정을 붙여 쌍(within)별로."""
+    if MODELS[model]["post"] is None:
+        return m
+    m = attach_groups(m, dict(item_mapping or ()))
+    m = attach_accounts(m, {} if accounts is None else accounts)
+    return post_rows(model, m, exact, within=within, **dict(options or {}))
+
+
+register_model(
+    "A", _effects_A, raw=_raw_effects_A, title="원인별 임팩트 분석",
+    icon="📐", export="A_원인별임팩트",
+    tagline="재무·감사용 표준 │ 변수 간 간섭 완전 제거",
+    intro="변수 간 간섭을 완전히 제거하여 각 요인의 절대적 영향력을 측정.",
+    use="재무·감사·외부보고 표준", tag="수량↑↓ 모두 전년 외화단가 적용",
+    formulas=[("①", "(Q1−Q0)×P0_fx×ER0"), ("②", "(P1−P0)×Q1×ER0"), ("③", "(ER1−ER0)×Q1×P1_fx")],
+    kpis=[("수량차이", "① 수량 차이", "(Q1−Q0)×P0_fx×ER0"),
+          ("단가차이", "② 단가 차이", "(P1−P0)×Q1×ER0"),
+          ("환율차이", "③ 환율 차이", "(ER1−ER0)×Q1×P1_fx")],
+    notes={"수량차이": "기준단가×수량변화", "단가차이": "(P실적−P기준)×Q실적×ER기준",
+           "환율차이": "(ER실적−ER기준)×Q실적×P실적_fx"},
+    guide={
+        "수량차이": ("① 수량 차이 (Quantity Variance)", ["(Q실적 − Q기준) × P기준_외화단가 × ER기준"],
+                     "수량만 변했다면?", "단가·환율을 기준 고정, 수량 변화만으로 생긴 순수 물량 효과.",
+                     "수량↑↓ 무관 — 항상 기준 외화단가 적용"),
+        "단가차이": ("② 단가 차이 (Price Variance)", ["(P실적_외화단가 − P기준_외화단가) × Q실적 × ER기준"],
+                     "단가만 바뀌었다면?", "수량은 실적 확정, 환율은 기준 고정. 외화 단가 변동의 순수 효과.",
+                     "환율 기준 고정 → 환율 효과 완전 배제"),
+        "환율차이": ("③ 환율 차이 (FX Variance)", ["(ER실적 − ER기준) × Q실적 × P실적_외화단가"],
+                     "환율만 바뀌었다면?", "수량·단가 실적 확정 후 환율 변동만으로 원화 환산액 변화 측정.",
+                     "KRW 거래는 환율차이 = 0"),
+    },
+    compare={"수량↑ 시 단가 기준": (["기준 외화단가"], "물량 성과를 보수적으로 평가"),
+             "단가차이 계산":      (["직접 계산"], "변수 독립"),
+             "환율차이 계산":      (["단일 공식"], "단순·명확"),
+             "①+②+③=총차이":     (["✅ 수학적 항등"], ""),
+             "적합한 보고":        (["재무제표", "외부감사", "원가분석"], "")},
+    palette=dict(accent="#4472c4", badge="#eef4ff", dark="#1e3a6e", mid="#2d5faa",
+                 light="#dde8ff", ink="#0d2050", pale="#c8dcff"),
+)
+
+register_model(
+    "B", _effects_B, title="활동별 증분 분석",
+    icon="📈", export="B_활동별증분",
+    tagline="영업·전략 보고용 │ 상황별 Case 분기",
+    intro="영업 활동의 실질적 비즈니스 가치를 평가. 상황(Case)에 따라 가중치를 다르게 적용.",
+    use="영업·전략·내부경영 보고", tag="수량↑=현재 원화단가 / 수량↓=전년 원화단가",
+    formulas=[("①", "Q↑:(Q1−Q0)×P1_krw / Q↓:(Q1−Q0)×P0_krw"), ("②", "총차이−①−③"),
+              ("③", "P/Q 4-Case")],
+    kpis=[("수량차이", "① 수량 차이 (Volume Incremental)", "Q↑→×P1_krw / Q↓→×P0_krw"),
+          ("단가차이", "② 단가 차이 (Negotiation Residual)", "총차이 − ① − ③"),
+          ("환율차이", "③ 환율 차이 (FX Exposure)", "P/Q 방향 4-Case 분기")],
+    notes={"수량차이": "실적/기준단가×수량변화", "단가차이": "총차이−①−③", "환율차이": "4-Case 분기"},
+    guide={
+        "수량차이": ("① 수량 차이 (Volume Incremental)",
+                     ["▲ 수량 증가 시  (Q실적 − Q기준) × P실적_원화단가",
+                      "▼ 수량 감소 시  (Q실적 − Q기준) × P기준_원화단가"],
+                     "새로 판 물건은 실적 가격으로, 잃은 물건은 기준 가격으로", "", ""),
+        "단가차이": ("② 단가 차이 (Negotiation Residual)", ["총차이 − ①수량차이 − ③환율차이"],
+                     "수량·환율 효과를 모두 제거하고 남은 것이 단가 협상 결과",
+                     "영업팀 가격 협상력의 순수 기여분.", "잔여(Residual) → 설계상 항등식 항상 성립"),
+        "환율차이": ("③ 환율 차이 (FX Exposure) — 4-Case 분기",
+                     ["단가↑ & 수량↑  (ER실적−ER기준) × Q기준 × P실적_fx",
+                      "단가↑ & 수량↓  (ER실적−ER기준) × Q실적 × P실적_fx",
+                      "단가↓ & 수량↑  (ER실적−ER기준) × Q기준 × P기준_fx",
+                      "단가↓ & 수량↓  (ER실적−ER기준) × Q실적 × P기준_fx"],
+                     "단가↑↓ × 수량↑↓ 조합에 따라 환율 노출 범위가 달라짐", "",
+                     "KRW 거래는 환율차이 = 0"),
+    },
+    compare={"수량↑ 시 단가 기준": (["실적 원화단가"], "새로 판 물건은 실적 가격으로 반영"),
+             "단가차이 계산":      (["잔여값 Residual"], "총차이−①−③"),
+             "환율차이 계산":      (["4-Case 분기"], "상황별 가중치"),
+             "①+②+③=총차이":     (["✅ 설계상 보장"], ""),
+             "적합한 보고":        (["영업성과", "전략보고", "단가협상"], "")},
+    palette=dict(accent="#e6812a", badge="#fff8ee", dark="#7a3300", mid="#c9641a",
+                 light="#ffe0c0", ink="#5a1800", pale="#ffd8b0"),
+)
+
+# 모델 C — 커널은 A 그대로(계산·캐시 공유), ①만 post에서 볼륨·믹스로 분할
+register_model(
+    "C", _effects_A, raw=_raw_effects_A, title="볼륨·믹스 분석",
+    post=mix_split, columns=(("볼륨차이", "①a볼륨차이"), ("믹스차이", "①b믹스차이")),
+    options={"by": dict(label="믹스 기준 (이 단위 안에서 품목 구성 변화를 믹스로)", title="믹스 기준",
+                        choices=MIX_KEYS, key="mix_by")},
+    icon="🧩", export="C_볼륨믹스",
+    tagline="포트폴리오·판매 구성 보고 │ ①을 볼륨·믹스로 분할",
+    intro="모델 A의 ①을 그룹·품목계정 안에서 물량 증감과 품목 구성 변화로 분리.",
+    use="제품 포트폴리오·판매 구성 보고", tag="그룹 구성비 고정 = 볼륨 / 구성 변화 = 믹스",
+    formulas=[("①a", "(ΣQ1/ΣQ0−1)×매출0"), ("①b", "①−①a"),
+              ("②", "(P1−P0)×Q1×ER0"), ("③", "(ER1−ER0)×Q1×P1_fx")],
+    kpis=MODELS["A"]["kpis"] + [("볼륨차이", "①a 볼륨 차이 (구성비 고정)", "(ΣQ1/ΣQ0−1)×매출0"),
+                                ("믹스차이", "①b 믹스 차이 (구성 변화)", "① − ①a")],
+    notes=MODELS["A"]["notes"],
+    guide={
+        **MODELS["A"]["guide"],
+        "수량차이": ("① 수량 차이 → ①a 볼륨 + ①b 믹스", ["(Q실적 − Q기준) × P기준_외화단가 × ER기준"],
+                     "수량만 변했다면?", "모델 A의 ①을 믹스 기준(그룹·품목계정) 안에서 둘로 나눔.",
+                     "①a+①b = ①"),
+        "볼륨차이": ("①a 볼륨 차이 (Volume Variance)", ["(ΣQ실적 / ΣQ기준 − 1) × 매출기준"],
+                     "구성비가 그대로였다면?", "그룹 전체 물량 증감률을 품목마다 같게 적용한 몫.",
+                     "그룹 기준수량 0 → ① 전액 볼륨"),
+        "믹스차이": ("①b 믹스 차이 (Mix Variance)", ["①수량차이 − ①a 볼륨차이"],
+                     "판매 구성만 바뀌었다면?", "그룹 안 품목 구성 변화로 생긴 나머지 — 신규·단종 품목 포함.",
+                     "믹스 기준은 사이드바에서 선택"),
+    },
+    compare={"수량↑ 시 단가 기준": (["기준 외화단가"], "①을 그룹 증감률(볼륨)과 구성 변화(믹스)로 분할"),
+             "단가차이 계산":      (["직접 계산"], "모델 A와 동일"),
+             "환율차이 계산":      (["단일 공식"], "모델 A와 동일"),
+             "①+②+③=총차이":     (["✅ ①a+①b = ①"], ""),
+             "적합한 보고":        (["제품 포트폴리오", "판매 구성", "믹스 전략"], "")},
+    palette=dict(accent="#138a6c", badge="#ebfaf4", dark="#0f5c4a", mid="#138a6c",
+                 light="#d4f3ea", ink="#063d30", pale="#c4f1e2"),
+)
+
+
+# ── 모델 A+B 동시 계산 ────────────────────────────────────────────────────────
+
+@profiled("models.model_AB", rows=len)
+def model_AB(base_df: pd.DataFrame, curr_df: pd.DataFrame, exact: bool = False) -> pd.DataFrame:
+    """
+    집계·merge를 1회만 수행하고 등록된 모든 커널(kernel_codes(): A·B …)의 분해를 함께 계산.
+    결과 컬럼: merge 컬럼 + 총차이 + 수량차이_A/단가차이_A/환율차이_A + ..._B
+    모델 전환은 select_model()로 컬럼만 골라 쓰면 되므로 재계산이 없음.
+    exact=True: 매출·분해 컬럼 모두 int64 원 (model_A/model_B의 exact와 동일).
+
+    반환: 환종별 raw DataFrame (두 모델 결과 포함)
+    """
+    m = _merge_base_curr(base_df, curr_df, exact)
+    for key in kernel_codes():
+        qty, price, fx = _effects(m, MODELS[key]["kernel"], exact)
+        m[f"수량차이_{key}"], m[f"단가차이_{key}"], m[f"환율차이_{key}"] = qty, price, fx
+    m["총차이"] = m["매출1"] - m["매출0"]
+    return m
+
+
+def select_model(m_ab: pd.DataFrame, model: str):
+    """
+    model_AB() 결과에서 한 모델의 분해 컬럼만 골라 run_model()과 같은 형태로 반환.
+    커널을 공유하는 모델(예: C → A)은 해당 커널 컬럼을 그대로 씀 — 후처리는 apply_post().
+
+    반환: (품목명 단위 요약 DataFrame, 환종별 raw DataFrame)
+    """
+    key = kernel_code(model)
+    suffixed = [f"{c}_{k}" for k in kernel_codes() for c in _EFFECT_COLS]
+    m = m_ab.drop(columns=suffixed)
+    for c in _EFFECT_COLS:
+        m[c] = m_ab[f"{c}_{key}"]
+    m["총차이"] = m.pop("총차이")   # model_A/B와 같은 컬럼 순서
+    return _summarize_by_item(m), m
+
+
+def summarize_ab(m_ab: pd.DataFrame) -> pd.DataFrame:
+    """model_AB() 결과를 품목명 단위로 합산 — 커널별 분해를 나란히 비교·내보내기용."""
+    return _summarize_by_item(
+        m_ab, [f"{c}_{k}" for k in kernel_codes() for c in _EFFECT_COLS])
+
+
+# ── 월별 차이 추이 ────────────────────────────────────────────────────────────
+
+TREND_STEPS  = {"MoM": 1, "YoY": 12}   # 전월 대비 / 전년 동월 대비 — 기준월 = 실적월 − lag
+_TREND_SUMS  = ["매출0", "매출1", "총차이"] + _EFFECT_COLS
+
+
+def _month_values(index: dict, months: np.ndarray, key_idx: np.ndarray, exact: bool) -> dict:
+    """
+    월 서수 배열의 월별 (품목명, 환종) 집계값 — 배열 shape (월수, 키수).
+    누적합 인접 차이 한 번으로 모든 월을 계산 (range_sums()와 같은 isclose 보정, 범위 밖 월은 0).
+    반환 키: Q, P_fx, P_krw, ER, 매출, present (aggregate()가 남기는 Q≠0 행 여부)
+    """
+    top = index["last"] - index["first"] + 1
+    hi  = np.clip(months - index["first"] + 1, 0, top)
+    lo  = np.clip(months - index["first"],     0, top)
+    c_hi = index["cum"][np.ix_(hi, key_idx)]
+    c_lo = index["cum"][np.ix_(lo, key_idx)]
+    sums = c_hi - c_lo
+    sums[np.isclose(c_hi, c_lo, rtol=1e-12, atol=0)] = 0.0
+    del c_hi, c_lo
+
+    Q = sums[..., 0]
+    if exact:
+        ints   = index["cum_int"][np.ix_(hi, key_idx)] - index["cum_int"][np.ix_(lo, key_idx)]
+        rev    = ints[..., 0]
+        fx_amt = ints[..., 1] / FX_SCALE
+    else:
+        rev, fx_amt = sums[..., 1], sums[..., 2]
+    is_krw = (index["keys"]["환종"].to_numpy()[key_idx] == "KRW")[None, :]
+    P_fx, P_krw, ER, _ = _unit_values(Q, rev, fx_amt, sums[..., 3], sums[..., 4], is_krw)
+    return dict(Q=Q, P_fx=P_fx, P_krw=P_krw, ER=ER, 매출=rev,
+                present=(sums[..., -1] > 0) & (Q != 0))
+
+
+def trend_months(index: dict, end: int, n: int, step: str = "MoM") -> np.ndarray:
+    """실적월 end에서 끝나는 n개 실적월 중 기준월이 데이터 범위 안에 있는 것 (오름차순)."""
+    curr = np.arange(end - n + 1, end + 1)
+    return curr[curr - TREND_STEPS[step] >= index["first"]]
+
+
+@profiled("models.model_trend", rows=len)
+def model_trend(index: dict, curr_months, step: str = "MoM", model: str = "A",
+                items=None, exact: bool = False, item_mapping=None, options=None) -> pd.DataFrame:
+    """
+    여러 월 쌍(실적월 vs 전월 / 전년 동월)의 차이 분해를 한 번에 계산 — 월별 추이용.
+
+    각 월의 집계(Q·단가·환율·매출)는 누적합 인덱스에서 월당 1회만 만들고 그 월이 들어가는
+    모든 쌍(다음 달의 기준월 등)이 공유 — 쌍마다 원본 행을 다시 자르거나 집계하지 않음.
+    모든 쌍 × (품목명, 환종) 행을 merge 결과와 같은 형태로 쌓아 모델 커널을 1회 실행.
+
+    후처리(post)가 있는 모델(예: C)은 item_mapping 그룹·index 품목계정을 붙여 월 쌍마다 분할.
+
+    curr_months: 실적월 서수 목록 (trend_months())   items: 대상 품목명 (None이면 전체)
+    item_mapping·options: 후처리용 {품목명: 그룹}·MODELS[model]["options"] 인자 (dict 또는 쌍 튜플)
+    반환: 실적월 순 DataFrame — 실적월, 기준월(월 서수), 매출0, 매출1, 총차이, ①②③
+          (+ 모델 추가 분해 열), 품목수
+    """
+    curr = np.asarray(curr_months, dtype=np.int64)
+    base = curr - TREND_STEPS[step]
+    keys = index["keys"]
+    key_idx = (np.arange(len(keys)) if items is None
+               else np.flatnonzero(keys["품목명"].isin(list(items)).to_numpy()))
+
+    months = np.unique(np.concatenate([base, curr]))
+    vals   = _month_values(index, months, key_idx, exact)
+    b_pos, c_pos = np.searchsorted(months, base), np.searchsorted(months, curr)
+
+    # 쌍 × 키 격자에서 어느 한쪽이라도 있는 행만 — outer merge와 같이 없는 쪽은 0
+    p0, p1 = vals["present"][b_pos], vals["present"][c_pos]
+    pair, key = np.nonzero(p0 | p1)
+    p0, p1 = p0[pair, key], p1[pair, key]
+
+    def side(name, pos, present):
+        v = vals[name][pos[pair], key]
+        return np.where(present, np.nan_to_num(v, nan=0.0), 0).astype(v.dtype)
+
+    m = pd.DataFrame({
+        "Q0": side("Q", b_pos, p0), "P0_fx": side("P_fx", b_pos, p0),
+        "P0_krw": side("P_krw", b_pos, p0), "ER0": side("ER", b_pos, p0),
+        "매출0": side("매출", b_pos, p0),
+        "Q1": side("Q", c_pos, p1), "P1_fx": side("P_fx", c_pos, p1),
+        "P1_krw": side("P_krw", c_pos, p1), "ER1": side("ER", c_pos, p1),
+        "매출1": side("매출", c_pos, p1),
+        "is_krw": keys["환종"].to_numpy()[key_idx][key] == "KRW",
+        "품목명": keys["품목명"].to_numpy()[key_idx][key],
+        "_pair": pair,
+    })
+    m = _post_stacked(_decompose(m, model, exact), model, exact, "_pair",
+                      item_mapping, index.get("accounts"), options)
+
+    by_pair = m.groupby("_pair", sort=True)
+    out = by_pair[_with_extra(_TREND_SUMS, m)].sum()
+    out["품목수"] = by_pair["품목명"].nunique()
+    out = out.reindex(range(len(curr)), fill_value=0)
+    out.insert(0, "기준월", base)
+    out.insert(0, "실적월", curr)
+    return out.reset_index(drop=True)
+
+
+# ── 다중 기준 비교 (계획 / 전년 / 전월 …) ─────────────────────────────────────
+
+_MULTI_SUMS = ["매출0", "매출1", "총차이"] + _EFFECT_COLS
+
+
+@profiled("models.model_multi", rows=len)
+def model_multi(bases: dict, curr_df: pd.DataFrame, model: str = "A",
+                exact: bool = False, item_mapping=None, accounts=None,
+                options=None) -> pd.DataFrame:
+    """
+    실적 한 기간을 여러 기준(계획·전년·전월 등)과 동시에 비교.
+
+    실적 집계(aggregate)는 1회만 — 기준마다 기준 집계와 merge만 수행하고,
+    모든 기준의 merge 행을 쌓아 모델 커널을 1회 실행한 뒤 [기준 × 품목명] 단일 groupby.
+
+    후처리(post)가 있는 모델(예: C)은 item_mapping 그룹·accounts 품목계정을 붙여 기준마다 분할.
+
+    bases: {기준 라벨: 기준 기간 행(range_sums() / 큐브 / 원본)} — 라벨 순서 = 결과 순서
+    반환: 기준(범주형, bases 순서), 품목명, 매출0, 매출1, 총차이, 수량차이, 단가차이, 환율차이
+          (+ 모델 추가 분해 열)
+    """
+    labels = list(bases)
+    c_agg  = aggregate(curr_df, exact)
+    merged = [_merge_aggregates(aggregate(b, exact), c_agg, exact) for b in bases.values()]
+    if not merged:
+        return pd.DataFrame(columns=["기준", "품목명"] + _MULTI_SUMS)
+
+    m = pd.concat(merged, ignore_index=True)
+    _decompose(m, model, exact)
+    m["_base"]  = np.repeat(np.arange(len(labels)), [len(x) for x in merged])
+    m = _post_stacked(m, model, exact, "_base", item_mapping, accounts, options)
+
+    out = (m.groupby(["_base", "품목명"], sort=True, observed=True)[_with_extra(_MULTI_SUMS, m)]
+            .sum().reset_index())
+    out.insert(0, "기준", pd.Categorical.from_codes(out.pop("_base").to_numpy(), labels))
+    return out
+
+
+def baseline_matrix(multi: pd.DataFrame) -> pd.DataFrame:
+    """
+    model_multi() 결과 → 품목명 단위 나란히 비교표.
+    컬럼: 품목명, 매출1, 그리고 기준마다 매출0_<라벨>, 총차이_<라벨>, ①②③(+ 추가 분해 열)_<라벨>
+    (model_AB()의 _A/_B 접미사와 같은 방식). 어느 기준에 없는 품목은 0.
+    """
+    labels = list(multi["기준"].cat.categories)
+    cols   = ["매출0", "총차이"] + effect_columns(multi.columns)
+    # 실적 쪽은 모든 기준 merge에 같은 값으로 들어가므로 품목별 첫 값이 곧 실적 매출
+    curr = multi.groupby("품목명", observed=True, sort=True)["매출1"].first()
+    wide = (multi.set_index(["품목명", "기준"])[cols]
+                 .unstack("기준", fill_value=0)
+                 .reindex(index=curr.index,
+                          columns=pd.MultiIndex.from_product([cols, labels]), fill_value=0))
+    out = pd.DataFrame({"품목명": curr.index, "매출1": curr.to_numpy()})
+    for label in labels:
+        for c in cols:
+            out[f"{c}_{label}"] = wide[(c, label)].to_numpy()
+    return out
+
+
+# ── 항등식 검증 ───────────────────────────────────────────────────────────────
+
+IDENTITY_TOL = 1.0   # 원 — 이 이상 어긋나면 잔차 흡수(모델 A) / 항등식 실패로 판정
+
+
+def _flag(m: pd.DataFrame, col: str) -> np.ndarray:
+    return m[col].to_numpy(bool) if col in m.columns else np.zeros(len(m), dtype=bool)
+
+
+@profiled("models.identity_diagnostics", rows=lambda r: len(r[0]))
+def identity_diagnostics(m: pd.DataFrame, model: str = "A", tol: float = IDENTITY_TOL):
+    """
+    환종별 raw 결과(model_A/model_B/select_model 두 번째 반환값) 전체 행 벡터 검증.
+
+    진단 컬럼 (m과 같은 index):
+      흡수전잔차      총차이 − (①+②+③) 공식값 — 커널이 tol 초과분을 ②에 흡수하기 전
+                      (raw 공식이 등록된 모델만 — 신규·단종 행과 모델 B는 공식상 잔차가 없으므로 0)
+      잔차흡수        흡수전잔차가 tol 초과라 ②단가차이에 흡수된 행
+      환율이상0/1     외화 행인데 해당 기간 환율이 NaN·inf·0 이하 (merge 시 0으로 채운 결측 포함)
+      외화금액대체0/1 외화금액 합계 0 → Q·P_fx로 대체해 환율을 산출한 행 (aggregate)
+      항등식오차      round(①+②+③) − round(총차이) — 최종 분해 기준
+      항등식실패      |항등식오차| ≥ tol
+
+    반환: (진단 DataFrame, 요약 dict) — 요약은 행 스캔 없이 그대로 표시 가능한 집계값
+    """
+    Q0, Q1 = m["Q0"].to_numpy(float), m["Q1"].to_numpy(float)
+    is_krw = m["is_krw"].to_numpy(bool)
+
+    raw = MODELS[model]["raw"]
+    if raw is not None:
+        qty, price, fx, total = raw(m)
+        with np.errstate(invalid="ignore"):
+            resid = total - (qty + price + fx)
+        resid = np.where((Q0 == 0) | (Q1 == 0), 0.0, resid)
+    else:
+        resid = np.zeros(len(m))
+    absorbed = np.abs(resid) > tol
+
+    def bad_er(er, q):
+        with np.errstate(invalid="ignore"):
+            return ~is_krw & (q != 0) & ~(np.isfinite(er) & (er > 0))
+
+    bad0 = bad_er(m["ER0"].to_numpy(float), Q0)
+    bad1 = bad_er(m["ER1"].to_numpy(float), Q1)
+    imp0 = _flag(m, "fx_imputed0") & (Q0 != 0)
+    imp1 = _flag(m, "fx_imputed1") & (Q1 != 0)
+
+    effects = m[_EFFECT_COLS].to_numpy(float).sum(axis=1)
+    err     = np.round(effects) - np.round(m["총차이"].to_numpy(float))
+    failed  = ~(np.abs(err) < tol)   # NaN도 실패
+
+    diag = pd.DataFrame({
+        "품목명": m["품목명"], "환종": m["환종"],
+        "흡수전잔차": resid, "잔차흡수": absorbed,
+        "환율이상0": bad0, "환율이상1": bad1,
+        "외화금액대체0": imp0, "외화금액대체1": imp1,
+        "항등식오차": err, "항등식실패": failed,
+    }, index=m.index)
+
+    summary = {
+        "model":             model,
+        "rows":              len(m),
+        "identity_failures": int(failed.sum()),
+        "max_abs_error":     float(np.nanmax(np.abs(err))) if len(m) else 0.0,
+        "absorbed_rows":     int(absorbed.sum()),
+        "absorbed_total":    float(resid[absorbed].sum()),
+        "max_abs_residual":  float(np.abs(resid).max()) if len(m) else 0.0,
+        "bad_er_rows":       int((bad0 | bad1).sum()),
+        "fx_imputed_rows":   int((imp0 | imp1).sum()),
+    }
+    summary["flagged_rows"] = int((absorbed | bad0 | bad1 | imp0 | imp1 | failed).sum())
+    return diag, summary
+
+
+# ── 그룹 롤업 ─────────────────────────────────────────────────────────────────
+
+_ROLLUP_COLS = ["매출0", "매출1", "총차이", "수량차이", "단가차이", "환율차이"]
+
+
+def attach_groups(va: pd.DataFrame, item_mapping: dict,
+                  unassigned: str = "미분류") -> pd.DataFrame:
+    """
+    item_mapping({품목명: 커스텀그룹명})을 범주형 '그룹' 컬럼으로 1회 조인.
+    매핑은 품목 카테고리 단위로만 조회하고 행에는 코드만 재매핑 — 행 수와 무관하게 O(품목 수).
+    그룹 순서: 품목명 정렬 순 첫 등장 순서, 매핑 없는 품목은 마지막 '미분류'.
+    """
+    items = va["품목명"].astype("category")
+    cats  = items.cat.categories
+    codes = items.cat.codes.to_numpy()
+
+    labels  = pd.Index([str(item_mapping.get(c, "")).strip() or unassigned for c in cats])
+    present = labels[np.unique(codes[codes >= 0])]
+    order   = [g for g in pd.unique(present) if g != unassigned]
+    if (present == unassigned).any():
+        order.append(unassigned)
+
+    g_codes = pd.Index(order).get_indexer(labels)
+    out = va.copy()
+    out["그룹"] = pd.Categorical.from_codes(np.where(codes < 0, -1, g_codes[codes]), order)
+    return out
+
+
+def group_rollup(va: pd.DataFrame, by: str | list = "그룹") -> pd.DataFrame:
+    """
+    단일 groupby로 그룹별 합계 — 매출0/매출1/총차이/①②③ (+ 등록 모델의 추가 분해 열) + 품목수.
+    by가 범주형이면 카테고리 순서 그대로, 빈 그룹은 제외.
+    """
+    g   = va.groupby(by, observed=True, sort=True)
+    out = g[_with_extra(_ROLLUP_COLS, va)].sum()
+    out["품목수"] = g["품목명"].nunique()
+    return out.reset_index()
+
+
+# ── 품목계정 분류 (제품 / 상품 / 기타) ──────────────────────────────────────────
+
+ACCT_CATS = ["제품", "상품", "기타"]
+
+
+def item_accounts(df: pd.DataFrame) -> pd.Series:
+    """원본 거래 행 → {품목명: 품목계정_분류} (품목별 첫 등장 행 기준). 없으면 빈 Series."""
+    if "품목계정_분류" not in df.columns:
+        return pd.Series(dtype=object)
+    first = df[["품목명", "품목계정_분류"]].drop_duplicates(subset=["품목명"])
+    return first.set_index("품목명")["품목계정_분류"].astype(str)
+
+
+def attach_accounts(va: pd.DataFrame, accounts) -> pd.DataFrame:
+    """
+    accounts({품목명: 분류})를 범주형 '품목계정_분류' 컬럼으로 1회 조인 (카테고리 = ACCT_CATS).
+    attach_groups()와 같이 품목 카테고리 단위로만 조회 — 매핑에 없는 품목은 '기타'.
+    """
+    items = va["품목명"].astype("category")
+    codes = items.cat.codes.to_numpy()
+    acct  = pd.Index(ACCT_CATS).get_indexer(
+        [accounts.get(c, "기타") for c in items.cat.categories])
+    acct  = np.where(acct < 0, ACCT_CATS.index("기타"), acct)
+
+    out = va.copy()
+    out["품목계정_분류"] = pd.Categorical.from_codes(
+        np.where(codes < 0, -1, acct[codes] if len(acct) else -1), ACCT_CATS)
+    return out
+
+
+def account_group_pivot(va: pd.DataFrame) -> pd.DataFrame:
+    """
+    [품목계정_분류 × 그룹] 롤업 — group_rollup() 단일 groupby.
+    KPI 카드(분류별 합)와 분류 탭(분류 내 그룹별 표)이 모두 이 결과를 읽음.
+    """
+    return group_rollup(va, by=["품목계정_분류", "그룹"])
+
+
+# ── 매출처 차원 (매출처 × 품목 × 환종) + grouping sets 롤업 ──────────────────────
+
+CUSTOMER_DIMS = ("매출처명",)
+# 리프 1회 계산 후 미리 만들어 두는 집계 축 — 드릴다운은 이 결과만 읽음
+CUSTOMER_SETS = (("매출처명",), ("품목명",), ("그룹",), ("품목계정_분류",),
+                 ("매출처명", "품목명"), ("매출처명", "그룹"))
+
+
+@profiled("models.model_customer", rows=len)
+def model_customer(base_df: pd.DataFrame, curr_df: pd.DataFrame, model: str = "A",
+                   exact: bool = False) -> pd.DataFrame:
+    """
+    [매출처명 × 품목명 × 환종] 리프 단위 차이 분해 — model_A/model_B와 같은 커널.
+    입력: 매출처명 열이 있는 원본 행 또는 build_monthly_cube(dims=CUSTOMER_DIMS) 큐브 행.
+    같은 품목이라도 매출처마다 단가·환율이 따로 계산되므로, 매출처 단위 ①②③의 합은
+    품목 단위 분석의 ①②③과 다를 수 있음. 매출0·매출1·총차이는 일치 — 단, 매출처끼리 수량이
+    상계되어 품목 단위 수량 합이 0인 (품목, 환종)은 aggregate()가 품목 단위에서만 제외함.
+
+    반환: 리프 raw DataFrame (매출처명 + merge 컬럼 + 수량차이/단가차이/환율차이 + 총차이)
+    """
+    b = aggregate(base_df, exact, CUSTOMER_DIMS)
+    c = aggregate(curr_df, exact, CUSTOMER_DIMS)
+    return _decompose(_merge_aggregates(b, c, exact, CUSTOMER_DIMS), model, exact)
+
+
+@profiled("models.grouping_sets")
+def grouping_sets(leaf: pd.DataFrame, sets: tuple = CUSTOMER_SETS) -> dict:
+    """
+    리프 결과 → {집계 키 튜플: 롤업 DataFrame} (SQL GROUPING SETS 방식).
+
+    계층 순서로 계산: 리프(매출처 × 품목 × 환종)를 먼저 [매출처명 × 품목명 (+ 그룹·품목계정_분류)]
+    한 단계로 줄이고, 나머지 축은 모두 이 중간 결과에서 groupby — 리프를 축마다 다시 읽지 않음.
+    그룹·품목계정_분류는 품목의 속성이므로 중간 키에 함께 실어도 행 수가 늘지 않음.
+    리프에 없는 열을 쓰는 축(예: attach_groups 전의 '그룹')은 건너뜀.
+
+    각 롤업 컬럼: 키, 매출0/매출1/총차이/①②③ (+ 모델 추가 분해 열), 품목수·매출처수(키에 없는 쪽만)
+    """
+    attrs = [c for c in ("그룹", "품목계정_분류") if c in leaf.columns]
+    sums  = _with_extra(_ROLLUP_COLS, leaf)
+    mid   = (leaf.groupby(["매출처명", "품목명", *attrs], observed=True, sort=False)
+                 [sums].sum().reset_index())
+    out = {}
+    for keys in sets:
+        if not set(keys) <= set(mid.columns):
+            continue
+        g    = mid.groupby(list(keys), observed=True, sort=True)
+        roll = g[sums].sum()
+        for col, label in (("품목명", "품목수"), ("매출처명", "매출처수")):
+            if col not in keys:
+                roll[label] = g[col].nunique()
+        out[tuple(keys)] = roll.reset_index()
+    return out
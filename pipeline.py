@@ -0,0 +1,99 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# pipeline.py  —  분석 파이프라인 (모델 실행 결과 캐시)
+#   위젯 조작마다 app.py가 처음부터 다시 실행되므로, 모델 계산은
+#   (데이터셋 지문, 기준 기간, 실적 기간) 키로 메모이즈하여 재사용한다.
+#   등록 모델의 커널(A·B …)은 한 번의 집계·merge에서 함께 계산(model_AB) — 모델 전환은 컬럼 선택만.
+#   월별 추이(run_trend)는 여러 월 쌍을 한 번의 배치 계산(model_trend)으로 처리.
+#   다중 기준 비교(run_multi_baseline)는 실적 집계 1회를 계획·전년·전월 등 모든 기준이 공유.
+#   매출처 분석(run_customer_variance)은 [매출처 × 품목 × 환종] 리프를 기간·모델별 1회 계산.
+# ══════════════════════════════════════════════════════════════════════════════
+import os as _os, sys as _sys
+_HERE = _os.path.dirname(_os.path.abspath(__file__))
+if _HERE not in _sys.path:
+    _sys.path.insert(0, _HERE)
+
+
+import streamlit as st
+from config import VARIANCE_CACHE_ENTRIES
+from models import (model_AB, select_model, range_sums, attach_accounts,
+                    model_trend, trend_months, model_multi, model_customer, slice_period)
+
+
+@st.cache_data(max_entries=VARIANCE_CACHE_ENTRIES, show_spinner=False)
+def run_variance_ab(fingerprint: str, base_period: tuple, curr_period: tuple,
+                    _month_index: dict, exact: bool = False):
+    """
+    등록된 모든 커널(A·B …) 동시 계산 (캐시). 캐시 키 = fingerprint + 기간(월 서수 범위) + exact.
+    _month_index는 해시 대상에서 제외 — 내용은 fingerprint가 대표함.
+    LRU 방식으로 최근 VARIANCE_CACHE_ENTRIES개 결과만 유지.
+
+    exact=True면 int64 원 분해 (models.model_AB 정확 모드).
+
+    반환: models.model_AB() 결과 (환종별 raw, _A/_B 접미사 컬럼)
+    """
+    base = range_sums(_month_index, *base_period)
+    curr = range_sums(_month_index, *curr_period)
+    return model_AB(base, curr, exact)
+
+
+@st.cache_data(max_entries=VARIANCE_CACHE_ENTRIES, show_spinner=False)
+def run_variance(fingerprint: str, base_period: tuple, curr_period: tuple,
+                 model: str, _month_index: dict, exact: bool = False):
+    """
+    선택 모델(models.MODELS 코드)의 차이 분석 결과 (캐시).
+    모델 전환 시에도 집계·merge·커널은 run_variance_ab 캐시를 재사용.
+    모델 후처리(apply_post — 예: C 볼륨·믹스)는 그룹을 붙인 뒤 호출 측에서 적용.
+
+    반환: (품목명 단위 요약 DataFrame, 환종별 raw DataFrame) — 둘 다 '품목계정_분류' 컬럼 포함
+    """
+    m_ab = run_variance_ab(fingerprint, base_period, curr_period, _month_index, exact)
+    va, va_detail = select_model(m_ab, model)
+    accounts = _month_index.get("accounts", {})
+    return attach_accounts(va, accounts), attach_accounts(va_detail, accounts)
+
+
+@st.cache_data(max_entries=VARIANCE_CACHE_ENTRIES, show_spinner=False)
+def run_trend(fingerprint: str, end: int, n: int, step: str, model: str,
+              items: tuple | None, _month_index: dict, exact: bool = False,
+              groups: tuple = (), options: tuple = ()):
+    """
+    월별 차이 추이 (캐시) — 실적월 end까지 n개월, 각 월 vs 전월(MoM)/전년 동월(YoY).
+    items: 대상 품목명 튜플 (None이면 전체) — 그룹 선택이 바뀔 때만 재계산.
+    groups·options: 후처리 모델(예: C)용 ((품목명, 그룹), …)·((인자, 값), …) — 그 외 모델은 빈 튜플.
+
+    반환: models.model_trend() 결과 (실적월 순)
+    """
+    months = trend_months(_month_index, end, n, step)
+    return model_trend(_month_index, months, step, model, items, exact, groups, options)
+
+
+@st.cache_data(max_entries=VARIANCE_CACHE_ENTRIES, show_spinner=False)
+def run_multi_baseline(fingerprint: str, curr_period: tuple, baselines: tuple, model: str,
+                       _month_index: dict, plan_fingerprint: str | None = None,
+                       _plan_index: dict | None = None, exact: bool = False,
+                       groups: tuple = (), options: tuple = ()):
+    """
+    실적 기간 1개 vs 여러 기준 (캐시).
+    baselines: ((라벨, 출처, 시작, 종료), ...) — 출처 "main"=ERP 파일 인덱스, "plan"=계획 파일 인덱스.
+    _plan_index 내용은 plan_fingerprint가 대표 (해시 제외). groups·options는 run_trend와 같음.
+
+    반환: models.model_multi() 결과 ([기준 × 품목명] 요약)
+    """
+    curr  = range_sums(_month_index, *curr_period)
+    bases = {label: range_sums(_plan_index if src == "plan" else _month_index, start, end)
+             for label, src, start, end in baselines}
+    return model_multi(bases, curr, model, exact, groups, _month_index.get("accounts", {}), options)
+
+
+@st.cache_data(max_entries=VARIANCE_CACHE_ENTRIES, show_spinner=False)
+def run_customer_variance(fingerprint: str, base_period: tuple, curr_period: tuple, model: str,
+                          _customer_cube, _month_index: dict, exact: bool = False):
+    """
+    [매출처명 × 품목명 × 환종] 리프 차이 분해 (캐시) — 매출처 큐브를 기간별로 잘라 model_customer().
+    _customer_cube·_month_index 내용은 fingerprint가 대표 (해시 제외).
+
+    반환: 리프 raw DataFrame ('품목계정_분류' 컬럼 포함) — 롤업은 models.grouping_sets()
+    """
+    leaf = model_customer(slice_period(_customer_cube, *base_period),
+                          slice_period(_customer_cube, *curr_period), model, exact)
+    return attach_accounts(leaf, _month_index.get("accounts", {}))
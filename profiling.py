@@ -0,0 +1,154 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# profiling.py  —  단계별 소요 시간·행 수·메모리 피크 기록 (경량 계측 훅)
+#   data_loader / ui_sidebar / models / app.py가 공통으로 사용. Streamlit 의존 없음.
+#
+#   with stage("models.model_AB") as rec:      # 컨텍스트 매니저
+#       m = ...
+#       rec["rows"] = len(m)
+#
+#   @profiled("models.aggregate", rows=len)   # 데코레이터 (rows: 결과 → 행 수)
+#
+#   rec = start_stage("app.plotly")            # 긴 최상위 블록 — 들여쓰기 없이
+#   ...
+#   end_stage(rec)
+#
+#   기록은 스레드 로컬 — Streamlit은 세션별 스크립트 실행을 별도 스레드에서 돌리므로
+#   세션끼리 섞이지 않음. begin_run(enabled=False)면 stage()는 즉시 통과(오버헤드 무시 가능).
+#   메모리 피크는 tracemalloc 기준이며 begin_run(trace_memory=True)일 때만 추적.
+#   tracemalloc은 프로세스 전역이므로 추적을 요청한 세션 집합을 두고, 이 모듈이 켠 추적은
+#   마지막 세션이 끌 때만 멈춤 — 진단을 끈 세션의 리런이 다른 세션의 peak_mb를 깨지 않도록.
+# ══════════════════════════════════════════════════════════════════════════════
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+_state = threading.local()
+_trace_lock      = threading.Lock()
+_trace_sessions  = set()   # 메모리 추적을 요청 중인 세션 키 (프로세스 전역)
+_started_tracing = False   # tracemalloc를 이 모듈이 켰는지 (프로세스 전역)
+
+
+def _get(name, default):
+    if not hasattr(_state, name):
+        setattr(_state, name, default())
+    return getattr(_state, name)
+
+
+def begin_run(enabled: bool, trace_memory: bool = True, session: str = ""):
+    """
+    스크립트 실행(리런) 시작 시 호출 — 이전 기록을 비우고 계측 on/off 설정.
+    trace_memory=False면 시간·행 수만 기록 (tracemalloc 오버헤드 없음).
+    session: 호출 세션 키 (Streamlit 세션별로 고정된 값) — 추적 요청을 세션 단위로 집계해
+    다른 세션이 아직 추적 중이면 tracemalloc을 멈추지 않음. 외부에서 켠 추적은 건드리지 않음.
+    """
+    global _started_tracing
+    _state.enabled = enabled
+    _state.records = []
+    _state.stack   = []
+    _state.run_t0  = time.perf_counter()
+    with _trace_lock:
+        if enabled and trace_memory:
+            _trace_sessions.add(session)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+        else:
+            _trace_sessions.discard(session)
+            if not _trace_sessions and _started_tracing and tracemalloc.is_tracing():
+                tracemalloc.stop()
+                _started_tracing = False
+
+
+def is_enabled() -> bool:
+    return getattr(_state, "enabled", False)
+
+
+def start_stage(name: str, rows: int | None = None) -> dict | None:
+    """
+    단계 시작 — 들여쓰기 없이 긴 블록을 감쌀 때 end_stage()와 짝으로 사용.
+    계측이 꺼져 있으면 None 반환 (end_stage(None)은 아무것도 하지 않음).
+    """
+    if not is_enabled():
+        return None
+    stack = _get("stack", list)
+    rec   = {"stage": name, "rows": rows, "depth": len(stack)}
+    frame = {"rec": rec, "max_peak": 0, "start": None}
+    if tracemalloc.is_tracing():
+        cur, outer_peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]["max_peak"] = max(stack[-1]["max_peak"], outer_peak)
+        tracemalloc.reset_peak()
+        frame["start"] = cur
+    stack.append(frame)
+    _get("records", list).append(rec)
+    frame["t0"] = time.perf_counter()
+    return rec
+
+
+def end_stage(rec: dict | None, rows: int | None = None):
+    """start_stage()로 연 단계 종료 — wall time·피크 기록. 안쪽 단계가 열려 있으면 함께 닫음."""
+    if rec is None or not is_enabled():
+        return
+    stack = _get("stack", list)
+    while stack:
+        frame = stack.pop()
+        r = frame["rec"]
+        r["wall_ms"] = round((time.perf_counter() - frame["t0"]) * 1000, 2)
+        if frame["start"] is not None and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], frame["max_peak"])
+            r["peak_mb"] = round(max(peak - frame["start"], 0) / 2**20, 2)
+            if stack:
+                stack[-1]["max_peak"] = max(stack[-1]["max_peak"], peak)
+        if r is rec:
+            break
+    if rows is not None:
+        rec["rows"] = rows
+
+
+@contextmanager
+def stage(name: str, rows: int | None = None):
+    """
+    한 단계의 wall time·행 수·tracemalloc 피크(시작 시점 대비 MB)를 기록.
+    중첩 가능 — 안쪽 단계의 피크도 바깥 단계 피크에 반영됨.
+    yield하는 dict에 rows 등 추가 정보를 채울 수 있음.
+    """
+    rec = start_stage(name, rows)
+    try:
+        yield rec if rec is not None else {}
+    finally:
+        end_stage(rec)
+
+
+def profiled(name: str, rows=None):
+    """함수 전체를 stage(name)으로 감싸는 데코레이터. rows: 반환값 → 행 수 함수."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return fn(*args, **kwargs)
+            with stage(name) as rec:
+                result = fn(*args, **kwargs)
+                if rows is not None:
+                    rec["rows"] = rows(result)
+                return result
+        return wrapper
+    return deco
+
+
+def records() -> list:
+    """이번 실행에서 기록된 단계 목록 (시작 순서, depth = 중첩 깊이)."""
+    return list(_get("records", list))
+
+
+def run_elapsed_ms() -> float:
+    """begin_run() 이후 경과 시간 (ms) — 리런 전체 소요 시간."""
+    return round((time.perf_counter() - getattr(_state, "run_t0", time.perf_counter())) * 1000, 2)
+
+
+def to_json_bytes(meta: dict | None = None) -> bytes:
+    """기록 → JSON bytes (다운로드용)."""
+    doc = {"meta": meta or {}, "stages": records()}
+    return json.dumps(doc, ensure_ascii=False, indent=2).encode("utf-8")
@@ -0,0 +1,71 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# run_log.py  —  실행 지표 JSONL 로그 (운영 모니터링용, Streamlit 의존 없음)
+#   분석 실행(리런) 1회 = JSON 1줄. 크기 기준 로테이션:
+#   runs.jsonl 이 RUN_LOG_MAX_BYTES를 넘으면 runs.jsonl.1 … .RUN_LOG_BACKUPS 로 밀려남.
+#   기록 실패는 무시 — 로그 때문에 분석 화면이 멈추면 안 됨.
+# ══════════════════════════════════════════════════════════════════════════════
+import os as _os, sys as _sys
+_HERE = _os.path.dirname(_os.path.abspath(__file__))
+if _HERE not in _sys.path:
+    _sys.path.insert(0, _HERE)
+
+
+import json
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from config import RUN_LOG_PATH, RUN_LOG_MAX_BYTES, RUN_LOG_BACKUPS
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+_lock    = threading.Lock()
+_loggers: dict = {}
+
+
+def peak_rss_mb() -> float | None:
+    """프로세스 최대 RSS (MB). 프로세스 시작 이후 누적 최대값 — 실행 단위 값이 아님."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    return round(rss / (2**20 if _sys.platform == "darwin" else 2**10), 1)
+
+
+def _logger(path: str, max_bytes: int, backups: int) -> logging.Logger:
+    """경로별 RotatingFileHandler 로거 (1회 생성 후 재사용, 스레드 안전)."""
+    with _lock:
+        log = _loggers.get(path)
+        if log is None:
+            _os.makedirs(_os.path.dirname(_os.path.abspath(path)), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                          encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            log = logging.getLogger(f"sales_analysis.runs.{len(_loggers)}")
+            log.setLevel(logging.INFO)
+            log.propagate = False
+            log.addHandler(handler)
+            _loggers[path] = log
+        return log
+
+
+def log_run(entry: dict, path: str | None = RUN_LOG_PATH,
+            max_bytes: int = RUN_LOG_MAX_BYTES, backups: int = RUN_LOG_BACKUPS) -> bool:
+    """
+    실행 지표 1건을 JSONL로 추가. ts(기록 시각)·peak_rss_mb가 없으면 채움.
+    path가 비어 있으면 아무것도 하지 않음. 반환: 기록 성공 여부.
+    """
+    if not path:
+        return False
+    entry = {"ts": datetime.now().isoformat(timespec="milliseconds"), **entry}
+    entry.setdefault("peak_rss_mb", peak_rss_mb())
+    try:
+        _logger(path, max_bytes, backups).info(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str))
+        return True
+    except Exception:
+        return False
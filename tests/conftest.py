@@ -0,0 +1,5 @@
+# 테스트에서 저장소 루트의 평면 모듈(models, erp_reader …)을 바로 import
+import os as _os, sys as _sys
+_ROOT = _os.path.dirname(_os.path.dirname(_os.path.abspath(__file__)))
+if _ROOT not in _sys.path:
+    _sys.path.insert(0, _ROOT)
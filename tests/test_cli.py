@@ -0,0 +1,39 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# tests/test_cli.py  —  헤드리스 배치 실행 (cli.main) 기간 범위 검사
+#   합성 데이터: 2024-01 ~ 2025-06 (benchmarks.erp_synth)
+# ══════════════════════════════════════════════════════════════════════════════
+import pytest
+
+from benchmarks.erp_synth import SynthSpec, synth_columns, write_erp_xlsx
+from cli import main
+
+
+@pytest.fixture(scope="module")
+def erp_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("erp") / "erp.xlsx"
+    write_erp_xlsx(synth_columns(SynthSpec(rows=2000, items=40, curr_month=6)), str(path))
+    return str(path)
+
+
+def _run(erp_file, out, *periods):
+    argv = [erp_file, "-o", str(out), "-j", "1", "--cache-dir", ""]
+    for p in periods:
+        argv += ["-p", p]
+    return main(argv)
+
+
+def test_period_in_range_succeeds(erp_file, tmp_path):
+    assert _run(erp_file, tmp_path, "YoY:2025-06") == 0
+    assert [p.name for p in tmp_path.glob("*.xlsx")] == ["variance_A_2024-06_vs_2025-06.xlsx"]
+
+
+def test_period_out_of_range_fails_without_output(erp_file, tmp_path, capsys):
+    assert _run(erp_file, tmp_path, "YoY:2027-06") == 1
+    assert "데이터가 없어 건너뜀" in capsys.readouterr().err
+    assert not list(tmp_path.glob("*.xlsx"))
+
+
+def test_mixed_periods_write_valid_ones_and_fail(erp_file, tmp_path, capsys):
+    assert _run(erp_file, tmp_path, "YoY:2025-06", "MoM:2023-03") == 1
+    assert "기준·실적" in capsys.readouterr().err
+    assert len(list(tmp_path.glob("*.xlsx"))) == 1
@@ -0,0 +1,93 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# tests/test_erp_reader.py  —  ERP 엑셀 파싱 회귀 테스트
+# ══════════════════════════════════════════════════════════════════════════════
+import os
+import re
+import zipfile
+from datetime import datetime
+from io import BytesIO
+
+from openpyxl import Workbook
+
+import erp_reader
+from config import COL_IDX
+from erp_reader import parse_erp_excel, prune_cache, read_erp_cached
+
+N_ROWS = 3000
+
+
+def _erp_workbook(n: int) -> bytes:
+    """COL_IDX 위치에 값을 채운 n행 ERP 형식 .xlsx (머리글 1행 + 데이터 n행)."""
+    width = max(COL_IDX.values()) + 1
+    wb = Workbook()
+    ws = wb.active
+    ws.append([f"col{i}" for i in range(width)])
+    for r in range(n):
+        row = [None] * width
+        row[COL_IDX["매출일"]]   = datetime(2025, r % 12 + 1, 1)
+        row[COL_IDX["매출처명"]] = f"거래처{r % 7}"
+        row[COL_IDX["품목명"]]   = f"품목{r % 50:03d}"
+        row[COL_IDX["수량"]]     = 10
+        row[COL_IDX["환종"]]     = "KRW"
+        row[COL_IDX["환율"]]     = 1
+        row[COL_IDX["원화단가"]] = 1000
+        row[COL_IDX["원화금액"]] = 10000
+        row[COL_IDX["품목계정"]] = "제품"
+        ws.append(row)
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _with_stale_dimension(xlsx: bytes) -> bytes:
+    """시트 XML의 <dimension ref>를 "A1"로 덮어쓴 사본 — 일부 ERP 내보내기 파일 재현."""
+    src, out = zipfile.ZipFile(BytesIO(xlsx)), BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename.startswith("xl/worksheets/sheet"):
+                data, n = re.subn(rb'<dimension ref="[^"]*"\s*/>', b'<dimension ref="A1"/>', data)
+                assert n == 1
+            dst.writestr(item, data)
+    return out.getvalue()
+
+
+def test_parse_reads_all_rows():
+    assert len(parse_erp_excel(_erp_workbook(N_ROWS))) == N_ROWS
+
+
+def test_parse_ignores_stale_dimension_tag():
+    df = parse_erp_excel(_with_stale_dimension(_erp_workbook(N_ROWS)))
+    assert len(df) == N_ROWS
+    assert df["원화금액"].sum() == 10000 * N_ROWS
+
+
+def _touch(path, size: int, mtime: int):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_prune_cache_keeps_newest_within_budget(tmp_path):
+    for i in range(6):
+        _touch(tmp_path / f"{i}.parquet", 100, 1_000 + i)   # 5.parquet가 가장 최근
+    (tmp_path / "runs.jsonl").write_text("{}")
+
+    prune_cache(str(tmp_path), max_files=4, max_bytes=0)
+    assert sorted(p.name for p in tmp_path.glob("*.parquet")) == ["2.parquet", "3.parquet",
+                                                                 "4.parquet", "5.parquet"]
+    prune_cache(str(tmp_path), max_files=0, max_bytes=250)
+    assert sorted(p.name for p in tmp_path.glob("*.parquet")) == ["4.parquet", "5.parquet"]
+    assert (tmp_path / "runs.jsonl").exists()
+
+
+def test_read_erp_cached_prunes_on_write(tmp_path, monkeypatch):
+    for i in range(3):
+        _touch(tmp_path / f"old{i}.parquet", 10, 1_000 + i)
+    monkeypatch.setattr(erp_reader, "CACHE_MAX_FILES", 2)
+    monkeypatch.setattr(erp_reader, "CACHE_MAX_BYTES", 0)
+
+    df = read_erp_cached(_erp_workbook(20), str(tmp_path))
+    assert len(df) == 20
+    names = sorted(p.name for p in tmp_path.glob("*.parquet"))
+    assert len(names) == 2 and "old2.parquet" in names
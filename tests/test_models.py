@@ -0,0 +1,230 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# tests/test_models.py  —  벡터 커널 vs 행 단위(apply) 원래 구현 일치 검증
+#   _ref_A / _ref_B는 벡터화 이전 model_A / model_B의 calc_row를 그대로 옮긴 기준 구현.
+# ══════════════════════════════════════════════════════════════════════════════
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.erp_synth import SynthSpec, synth_columns, synth_frame
+from models import (_effects_A, _effects_B, model_A, model_B, build_monthly_cube,
+                    build_month_index, range_sums, ym_to_ord, run_model, apply_post,
+                    attach_groups, attach_accounts, model_trend, model_multi,
+                    MODELS, register_model, model_AB, select_model, kernel_codes,
+                    group_rollup, slice_period, _allocate_won, _won_int)
+
+_EFFECTS = ["수량차이", "단가차이", "환율차이"]
+
+
+def _ref_A(row) -> tuple:
+    if row["Q0"] == 0:
+        return row["매출1"], 0.0, 0.0
+    if row["Q1"] == 0:
+        return -row["매출0"], 0.0, 0.0
+
+    if row["is_krw"]:
+        qty   = (row["Q1"]     - row["Q0"])     * row["P0_krw"]
+        price = (row["P1_krw"] - row["P0_krw"]) * row["Q1"]
+        fx    = 0.0
+    else:
+        qty   = (row["Q1"]    - row["Q0"])    * row["P0_fx"] * row["ER0"]
+        price = (row["P1_fx"] - row["P0_fx"]) * row["Q1"]   * row["ER0"]
+        fx    = (row["ER1"]   - row["ER0"])   * row["Q1"]   * row["P1_fx"]
+
+    total = row["매출1"] - row["매출0"]
+    if abs(qty + price + fx - total) > 1:
+        price += total - (qty + price + fx)   # 부동소수점 잔차 흡수
+    return qty, price, fx
+
+
+def _ref_B(row) -> tuple:
+    if row["Q0"] == 0:
+        return row["매출1"], 0.0, 0.0
+    if row["Q1"] == 0:
+        return -row["매출0"], 0.0, 0.0
+
+    q_up  = row["Q1"] >= row["Q0"]
+    qty   = (row["Q1"] - row["Q0"]) * (row["P1_krw"] if q_up else row["P0_krw"])
+    total = row["매출1"] - row["매출0"]
+
+    if row["is_krw"]:
+        fx    = 0.0
+        price = total - qty
+    else:
+        dER  = row["ER1"] - row["ER0"]
+        p_up = row["P1_fx"] >= row["P0_fx"]
+        if   p_up and     q_up:  fx = dER * row["Q0"] * row["P1_fx"]
+        elif p_up and not q_up:  fx = dER * row["Q1"] * row["P1_fx"]
+        elif not p_up and q_up:  fx = dER * row["Q0"] * row["P0_fx"]
+        else:                    fx = dER * row["Q1"] * row["P0_fx"]
+        price = total - qty - fx
+    return qty, price, fx
+
+
+def _reference(m: pd.DataFrame, ref) -> np.ndarray:
+    with np.errstate(invalid="ignore", over="ignore"):
+        return np.array([ref(row) for _, row in m.iterrows()], dtype=float).reshape(-1, 3)
+
+
+def _assert_same(got, want: np.ndarray):
+    np.testing.assert_array_equal(np.column_stack(got).astype(float), want)
+
+
+def _edge_rows() -> pd.DataFrame:
+    """merge 결과 형태의 경계 행 — 신규·단종·0/NaN/inf 수량·단가·환율, KRW·외화."""
+    nan, inf = np.nan, np.inf
+    rows = [
+        # Q0,  Q1,   P0_fx, P1_fx, P0_krw, P1_krw, ER0,  ER1,  매출0,  매출1,  is_krw
+        (10,   12,   0,     0,     1000,   1100,   0,    0,    10000,  13200,  True),    # KRW 정상
+        (10,   8,    7.5,   8.0,   9900,   10720,  1320, 1340, 99000,  85760,  False),   # 외화 정상
+        (0,    5,    0,     9.0,   0,      11880,  0,    1320, 0,      59400,  False),   # 신규
+        (0,    5,    0,     0,     0,      1000,   0,    0,    0,      5000,   True),    # 신규 KRW
+        (6,    0,    9.0,   0,     11880,  0,      1320, 0,    71280,  0,      False),   # 단종
+        (6,    0,    0,     0,     1000,   0,      0,    0,    6000,   0,      True),    # 단종 KRW
+        (0,    0,    0,     0,     0,      0,      0,    0,    0,      0,      False),   # 양쪽 0
+        (5,    5,    0,     0,     0,      0,      1320, 1320, 0,      0,      False),   # 단가 0
+        (5,    7,    0,     9.0,   0,      11880,  1320, 1320, 0,      83160,  False),   # 기준 단가 0
+        (5,    7,    nan,   9.0,   nan,    11880,  1320, 1320, 66000,  83160,  False),   # 단가 NaN
+        (5,    7,    10.0,  9.0,   13200,  11880,  nan,  1320, 66000,  83160,  False),   # 환율 NaN
+        (5,    7,    10.0,  9.0,   13200,  11880,  1320, inf,  66000,  83160,  False),   # 환율 inf
+        (5,    7,    inf,   9.0,   inf,    11880,  1320, 1320, 66000,  83160,  False),   # 단가 inf
+        (nan,  7,    10.0,  9.0,   13200,  11880,  1320, 1320, 66000,  83160,  False),   # 수량 NaN
+        (5,    nan,  10.0,  9.0,   13200,  11880,  1320, 1320, 66000,  83160,  True),    # 수량 NaN KRW
+        (-3,   4,    10.0,  9.5,   13200,  12350,  1320, 1300, -39600, 49400,  False),   # 반품(음수)
+        (4,    4,    10.0,  10.0,  13200,  13200,  1320, 1320, 52800,  52803.7, False),  # 잔차 > 1원
+    ]
+    cols = ["Q0", "Q1", "P0_fx", "P1_fx", "P0_krw", "P1_krw", "ER0", "ER1", "매출0", "매출1", "is_krw"]
+    m = pd.DataFrame(rows, columns=cols)
+    m["is_krw"] = m["is_krw"].astype(bool)
+    return m
+
+
+@pytest.mark.parametrize("kernel, ref", [(_effects_A, _ref_A), (_effects_B, _ref_B)])
+def test_kernel_matches_rowwise_on_edge_rows(kernel, ref):
+    m = _edge_rows()
+    with np.errstate(invalid="ignore", over="ignore"):
+        got = kernel(m)
+    _assert_same(got, _reference(m, ref))
+
+
+@pytest.mark.parametrize("kernel, ref", [(_effects_A, _ref_A), (_effects_B, _ref_B)])
+def test_kernel_matches_rowwise_on_random_rows(kernel, ref):
+    rng = np.random.default_rng(7)
+    n = 400
+    m = pd.DataFrame({
+        "Q0": rng.choice([0, 0, 1, 5, 20, -2], n).astype(float),
+        "Q1": rng.choice([0, 1, 5, 20, 30, -1], n).astype(float),
+        "P0_fx": rng.choice([0, 1.5, 9.25, np.nan], n), "P1_fx": rng.choice([0, 2.0, 9.5, np.inf], n),
+        "P0_krw": rng.uniform(0, 20000, n), "P1_krw": rng.uniform(0, 20000, n),
+        "ER0": rng.choice([0, 1300.0, 1350.5, np.nan], n), "ER1": rng.choice([0, 1290.0, 1400.25], n),
+        "매출0": rng.uniform(-1e5, 1e6, n).round(), "매출1": rng.uniform(-1e5, 1e6, n).round(),
+        "is_krw": rng.random(n) < 0.4,
+    })
+    with np.errstate(invalid="ignore", over="ignore"):
+        got = kernel(m)
+    _assert_same(got, _reference(m, ref))
+
+
+@pytest.mark.parametrize("model, ref", [(model_A, _ref_A), (model_B, _ref_B)])
+def test_model_matches_rowwise_with_new_and_discontinued_items(model, ref):
+    df  = synth_frame(synth_columns(SynthSpec(rows=5000, items=120, new_ratio=0.1,
+                                              disc_ratio=0.1, curr_month=6)))
+    idx = build_month_index(build_monthly_cube(df))
+    c   = ym_to_ord(2025, 6)
+    _, m = model(range_sums(idx, c - 12, c - 12), range_sums(idx, c, c))
+
+    assert (m["Q0"] == 0).any() and (m["Q1"] == 0).any()   # 신규·단종 행 포함
+    _assert_same([m[col].to_numpy() for col in _EFFECTS], _reference(m, ref))
+    np.testing.assert_array_equal(m["총차이"], m["매출1"] - m["매출0"])
+
+
+def test_model_C_split_matches_across_trend_and_multi():
+    """월별 추이·다중 기준의 볼륨·믹스 합계 = 같은 기간 쌍을 단독으로 분해한 결과 (쌍별 r_g)."""
+    df  = synth_frame(synth_columns(SynthSpec(rows=5000, items=120, new_ratio=0.1,
+                                              disc_ratio=0.1, curr_month=6)))
+    idx = build_month_index(build_monthly_cube(df))
+    mapping = {f"품목{i:05d}": f"G{i // 2 % 4}" for i in range(0, 120, 2)}   # 홀수 품목은 미분류
+    assert set(mapping) < set(df["품목명"])
+    c   = ym_to_ord(2025, 6)
+
+    def single(b):
+        va, m = run_model(range_sums(idx, b, b), range_sums(idx, c, c), "C")
+        va, m = (attach_accounts(attach_groups(x, mapping), idx.get("accounts", {}))
+                 for x in (va, m))
+        va, m = apply_post("C", va, m, by="그룹")
+        by_group = m.groupby("그룹", observed=True)[["수량차이", "볼륨차이", "믹스차이"]].sum()
+        assert len(by_group) == 5                              # G0~G3 + 미분류
+        np.testing.assert_allclose(by_group["볼륨차이"] + by_group["믹스차이"],
+                                   by_group["수량차이"], rtol=1e-9, atol=1e-3)
+        assert (by_group["믹스차이"].abs() > 1).any()          # 그룹별 분할이 실제로 일어남
+        return va[["볼륨차이", "믹스차이"]].sum()
+
+    trend = model_trend(idx, [c - 1, c], "MoM", "C", item_mapping=mapping,
+                        options={"by": "그룹"}).set_index("실적월")
+    multi = model_multi({"전월": range_sums(idx, c - 1, c - 1), "전년": range_sums(idx, c - 12, c - 12)},
+                        range_sums(idx, c, c), "C", item_mapping=mapping,
+                        options={"by": "그룹"}).groupby("기준", observed=True).sum(numeric_only=True)
+    for got, b in ((trend.loc[c], c - 1), (multi.loc["전월"], c - 1), (multi.loc["전년"], c - 12)):
+        np.testing.assert_allclose(got[["볼륨차이", "믹스차이"]].to_numpy(float),
+                                   single(b).to_numpy(float), rtol=1e-9, atol=1e-3)
+        np.testing.assert_allclose(got["볼륨차이"] + got["믹스차이"], got["수량차이"],
+                                   rtol=1e-9, atol=1e-3)
+
+
+@pytest.mark.parametrize("drop", ["palette", "kpis", "notes", "compare", "guide[환율차이]"])
+def test_register_model_requires_display_metadata(drop):
+    meta = {k: MODELS["A"][k] for k in ("palette", "kpis", "notes", "compare", "guide")}
+    if drop.startswith("guide"):
+        meta["guide"] = {k: v for k, v in meta["guide"].items() if k != "환율차이"}
+    else:
+        del meta[drop]
+    with pytest.raises(ValueError, match=drop.replace("[", r"\[").replace("]", r"\]")):
+        register_model("Z", _effects_A, title="테스트", **meta)
+    assert "Z" not in MODELS
+
+
+def test_allocate_won_sums_exactly_with_mixed_signs():
+    rng   = np.random.default_rng(7)
+    e     = rng.normal(0, 1e6, (3, 2000)) + rng.choice([0.0, 0.5, 0.25], (3, 2000))
+    e[:, :3] = [[0.5, -0.5, np.nan], [0.5, -0.5, np.inf], [0.5, -0.5, 1.0]]   # 동률·비유한 값
+    total = np.rint(np.nan_to_num(e.sum(axis=0)) + rng.integers(-2, 3, 2000)).astype(np.int64)
+    total[:3] = [2, -1, 7]
+
+    qty, price, fx = _allocate_won(total, *e)
+    assert all(x.dtype == np.int64 for x in (qty, price, fx))
+    np.testing.assert_array_equal(qty + price + fx, total)
+    finite = np.isfinite(e).all(axis=0) & (np.abs(e.sum(axis=0) - total) < 1)
+    assert (np.abs(np.column_stack([qty, price, fx]) - e.T)[finite] < 1).all()   # 각 효과는 1원 안
+
+
+def test_exact_mode_matches_ledger_won():
+    """정확 모드: 행마다 ①+②+③ = 매출1 − 매출0 (int64), 품목·그룹 롤업 합계 = 원장 원화 합계."""
+    df = synth_frame(synth_columns(SynthSpec(rows=20000, items=200, new_ratio=0.1, disc_ratio=0.1,
+                                             return_rate=0.1, curr_month=6)))
+    c  = ym_to_ord(2025, 6)
+    base, curr = slice_period(df, c - 12, c - 12), slice_period(df, c, c)
+    assert (base["환종"] != "KRW").any() and (base["수량"] < 0).any()   # 외화·반품 포함
+
+    def ledger(rows) -> int:   # (품목명, 환종) 수량 합 0인 키는 aggregate()와 같이 제외
+        w = rows.assign(_won=_won_int(rows["원화금액"]))
+        g = w.groupby(["품목명", "환종"], observed=True)[["수량", "_won"]].sum()
+        return int(g.loc[g["수량"] != 0, "_won"].sum())
+
+    m = model_AB(base, curr, exact=True)
+    total = m["매출1"] - m["매출0"]
+    assert m["매출0"].dtype == m["매출1"].dtype == np.int64
+    assert int(m["매출0"].sum()) == ledger(base) and int(m["매출1"].sum()) == ledger(curr)
+
+    mapping = {f"품목{i:05d}": f"G{i % 5}" for i in range(0, 200, 3)}
+    for k in kernel_codes():
+        cols = [f"{e}_{k}" for e in _EFFECTS]
+        assert (m[cols].dtypes == np.int64).all()
+        assert (m[cols].to_numpy() < 0).any() and (m[cols].to_numpy() > 0).any()
+        np.testing.assert_array_equal(m[cols].sum(axis=1), total)
+
+        va, _ = select_model(m, k)
+        for roll in (va, group_rollup(attach_groups(va, mapping))):
+            assert (roll[_EFFECTS + ["총차이"]].dtypes == np.int64).all()
+            np.testing.assert_array_equal(roll[_EFFECTS].sum(axis=1), roll["총차이"])
+            assert int(roll["총차이"].sum()) == ledger(curr) - ledger(base)
+            assert int(roll[_EFFECTS].to_numpy().sum()) == ledger(curr) - ledger(base)
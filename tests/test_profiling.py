@@ -0,0 +1,36 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# tests/test_profiling.py  —  세션 간 tracemalloc 공유 (begin_run)
+# ══════════════════════════════════════════════════════════════════════════════
+import tracemalloc
+
+import profiling
+from profiling import begin_run, stage, records
+
+
+def test_other_session_does_not_stop_tracing():
+    assert not tracemalloc.is_tracing()
+    begin_run(True, trace_memory=True, session="a")
+    assert tracemalloc.is_tracing()
+
+    begin_run(True, trace_memory=False, session="b")   # 진단 끈 다른 세션의 리런
+    assert tracemalloc.is_tracing()
+
+    begin_run(True, trace_memory=True, session="a")
+    with stage("alloc"):
+        buf = bytearray(8 * 2**20)
+    assert records()[0]["peak_mb"] >= 7.5
+    del buf
+
+    begin_run(False, session="a")                      # 마지막 추적 세션이 끄면 정지
+    assert not tracemalloc.is_tracing()
+    assert not profiling._trace_sessions
+
+
+def test_external_tracing_left_running():
+    tracemalloc.start()
+    try:
+        begin_run(True, trace_memory=True, session="a")
+        begin_run(False, session="a")
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -1,5 +1,5 @@
 # ══════════════════════════════════════════════════════════════════════════════
-# ui_components.py  —  재사용 UI 컴포넌트 (KPI카드·테이블·Waterfall·Bar 차트)
+# ui_components.py  —  재사용 UI 컴포넌트 (KPI카드·테이블·비교표·롤업표·Waterfall·추이·Bar 차트)
 # ══════════════════════════════════════════════════════════════════════════════
 import os as _os, sys as _sys
 _HERE = _os.path.dirname(_os.path.abspath(__file__))
@@ -10,25 +10,90 @@ if _HERE not in _sys.path:
 import numpy as np
 import pandas as pd
 import streamlit as st
+from config import TABLE_PAGE_SIZE
+from models import EFFECT_LABELS, effect_columns
 
 
-def styled_df(df: pd.DataFrame, money_cols: list):
-    """지정 컬럼에 색상(양수=녹, 음수=적) 및 천단위 쉼표 포맷 적용."""
-    def color_cell(v):
-        try:
-            fv = float(v)
-            if fv < 0:   return "color:#c0392b; font-weight:600"
-            elif fv > 0: return "color:#1a7a4a; font-weight:600"
-        except Exception:
-            pass
-        return ""
-
-    fmt_dict = {c: "{:,.0f}" for c in money_cols if c in df.columns}
-    styler   = df.style.format(fmt_dict, na_rep="-")
-    for c in money_cols:
+_POS_CSS = "color:#1a7a4a; font-weight:600"
+_NEG_CSS = "color:#c0392b; font-weight:600"
+
+
+def sign_style_mask(df: pd.DataFrame, cols: list, base: str = "") -> pd.DataFrame:
+    """
+    부호 색상 CSS 마스크 (양수=녹, 음수=적) — 열 단위 np.select 1회, 셀별 콜백 없음.
+    cols 외 열과 숫자가 아닌 값은 base 스타일.
+    """
+    mask = pd.DataFrame(base, index=df.index, columns=df.columns)
+    for c in cols:
         if c in df.columns:
-            styler = styler.applymap(color_cell, subset=[c])
-    return styler
+            v = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float)
+            mask[c] = np.select([v < 0, v > 0],
+                                [f"{_NEG_CSS};{base}", f"{_POS_CSS};{base}"], base)
+    return mask
+
+
+def styled_df(df: pd.DataFrame, money_cols: list, base: str = ""):
+    """
+    지정 컬럼에 색상(양수=녹, 음수=적) 적용 — sign_style_mask() 한 번으로 전체 표.
+    숫자 포맷(천단위 쉼표)은 money_column_config()의 column_config가 담당.
+    """
+    cols = [c for c in money_cols if c in df.columns]
+    return df.style.apply(lambda d: sign_style_mask(d, cols, base), axis=None)
+
+
+def money_column_config(columns, money_cols: list, decimals: dict | None = None) -> dict:
+    """
+    st.dataframe column_config — 금액 열은 천단위 쉼표 NumberColumn, 텍스트 열은 너비 고정.
+    decimals: {열: 소수 자리} (단가·환율 등 기본 0자리가 아닌 숫자 열).
+    """
+    decimals = decimals or {}
+    cfg = {}
+    for col in columns:
+        if col in money_cols or col in decimals:
+            fmt = f"%,.{decimals.get(col, 0)}f"
+            cfg[col] = st.column_config.NumberColumn(col, format=fmt, width="medium")
+        elif col in ("품목명", "그룹", "환종"):
+            cfg[col] = st.column_config.TextColumn(col, width="large")
+        else:
+            cfg[col] = st.column_config.TextColumn(col, width="small")
+    return cfg
+
+
+def paginate(df: pd.DataFrame, key: str, page_size: int = TABLE_PAGE_SIZE,
+             search_cols: tuple = ("품목명",)) -> pd.DataFrame:
+    """
+    행이 page_size를 넘으면 검색·정렬·페이지 컨트롤을 그리고 현재 페이지 행만 반환.
+    검색·정렬은 서버(pandas)에서 전체 행 기준으로 수행 — 브라우저에는 한 페이지만 전송.
+    page_size 이하면 컨트롤 없이 그대로 반환.
+    """
+    if len(df) <= page_size:
+        return df
+
+    c_q, c_sort, c_desc, c_page = st.columns([3, 3, 1.3, 1.6])
+    query = c_q.text_input("검색", key=f"{key}_q",
+                           placeholder=f"{'·'.join(search_cols)} 포함 검색")
+    sort_col = c_sort.selectbox("정렬 기준", ["(기본)"] + list(df.columns), key=f"{key}_sort")
+    desc = c_desc.toggle("내림차순", key=f"{key}_desc")
+
+    if query:
+        hit = np.zeros(len(df), dtype=bool)
+        for c in search_cols:
+            if c in df.columns:
+                hit |= df[c].astype(str).str.contains(query, case=False, regex=False).to_numpy()
+        df = df[hit]
+    if sort_col != "(기본)":
+        df = df.sort_values(sort_col, ascending=not desc, kind="stable", na_position="last")
+
+    n_pages = max(1, -(-len(df) // page_size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > n_pages:   # 검색으로 페이지 수가 줄면 첫 페이지로
+        st.session_state[page_key] = 1
+    page  = c_page.number_input(f"페이지 / {n_pages}", min_value=1, max_value=n_pages,
+                                step=1, key=page_key)
+    start = (int(page) - 1) * page_size
+    end   = min(start + page_size, len(df))
+    st.caption(f"{len(df):,}행 중 {start + 1 if len(df) else 0:,}–{end:,}행 표시")
+    return df.iloc[start:end]
 
 
 def kpi_card(col, label: str, formula: str, value: float, neutral: bool = False):
@@ -125,6 +190,51 @@ def render_waterfall(
     return fig
 
 
+_TREND_SERIES = {"수량차이": ("① 수량 차이", "#2d5faa"),
+                 "단가차이": ("② 단가 차이", "#e67e22"),
+                 "환율차이": ("③ 환율 차이", "#16a085")}
+_EXTRA_COLORS = ["#5b8fd9", "#8e44ad", "#c0392b", "#7f8c8d"]
+
+
+def render_trend_chart(trend: pd.DataFrame, x_labels: list, title: str):
+    """
+    월별 차이 추이 — 분해 열 누적 막대(양수 위·음수 아래) + 총차이 선. plotly Figure 반환.
+    막대 = effect_columns() 순서. 모델 추가 열(예: C ①a·①b)은 ①을 나눈 것이므로 있으면 ① 대신 쌓음.
+    trend: models.model_trend() 결과, x_labels: 실적월 표시 라벨 (행 순서)
+    """
+    import plotly.graph_objects as go
+
+    cols   = effect_columns(trend.columns)
+    extra  = [c for c in cols if c not in _TREND_SERIES]
+    series = [(*_TREND_SERIES[c], c) if c in _TREND_SERIES
+              else (EFFECT_LABELS[c], _EXTRA_COLORS[extra.index(c) % len(_EXTRA_COLORS)], c)
+              for c in cols if not (extra and c == "수량차이")]
+    fig = go.Figure()
+    for name, clr, col in series:
+        fig.add_trace(go.Bar(
+            name=name, x=x_labels, y=trend[col], marker_color=clr,
+            hovertemplate="%{x}<br>" + name + ": %{y:,.0f}원<extra></extra>",
+        ))
+    fig.add_trace(go.Scatter(
+        name="총 차이", x=x_labels, y=trend["총차이"], mode="lines+markers",
+        line=dict(color="#0d1f3c", width=2), marker=dict(size=7),
+        hovertemplate="%{x}<br>총 차이: %{y:,.0f}원<extra></extra>",
+    ))
+    fig.update_layout(
+        title_text=title, title_font_size=14, title_font_color="#0d1f3c", title_x=0.01,
+        barmode="relative", height=460,
+        margin=dict(t=70, b=40, l=60, r=30),
+        plot_bgcolor="#fafbfd", paper_bgcolor="#ffffff",
+        font=dict(family="Malgun Gothic, AppleGothic, sans-serif"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="right", x=1.0),
+        xaxis=dict(tickfont=dict(size=11, color="#0d1f3c"), type="category"),
+        yaxis=dict(title="원화 매출 차이 (₩)", title_font=dict(size=12, color="#3a4a65"),
+                   tickfont=dict(size=11, color="#3a4a65"), gridcolor="#e8ecf3",
+                   zeroline=True, zerolinecolor="#8a95a8", zerolinewidth=1.5),
+    )
+    return fig
+
+
 def build_table(
     df_in: pd.DataFrame, base_label: str, curr_label: str, show_detail: bool
 ):
@@ -135,7 +245,8 @@ def build_table(
 
     반환: (표시용 DataFrame, money_cols 리스트)
     """
-    display_cols = ["품목명","is_krw","Q0","매출0","매출1","총차이","수량차이","단가차이","환율차이"]
+    effect_cols  = effect_columns(df_in.columns)   # ①②③ + 모델 추가 분해 열 (예: C ①a·①b)
+    display_cols = ["품목명","is_krw","Q0","매출0","매출1","총차이"] + effect_cols
     if show_detail:
         if "환종" in df_in.columns:
             display_cols = ["품목명","환종","is_krw","Q0"] + display_cols[3:]
@@ -147,7 +258,8 @@ def build_table(
     va_d = va_d.sort_values("총차이").reset_index(drop=True)
 
     is_new = va_d["Q0"] == 0
-    va_d.loc[is_new, "품목명"] = "🆕 " + va_d.loc[is_new, "품목명"].astype(str)
+    va_d["품목명"] = va_d["품목명"].astype(str)   # 범주형 → 표시용 문자열
+    va_d.loc[is_new, "품목명"] = "🆕 " + va_d.loc[is_new, "품목명"]
 
     if not show_detail:
         va_d = va_d.drop(columns=["Q0"], errors="ignore")
@@ -155,17 +267,15 @@ def build_table(
     if "is_krw" in va_d.columns:
         krw_mask = va_d["is_krw"] == True
         for fx_col in ["P0_fx","P1_fx","ER0","ER1","환율차이"]:
-            if fx_col in va_d.columns:
-                va_d.loc[krw_mask, fx_col] = np.nan
+            if fx_col in va_d.columns:   # where: 정확 모드 int64 열도 float로 변환하며 결측 표시
+                va_d[fx_col] = va_d[fx_col].where(~krw_mask)
     va_d = va_d.drop(columns=["is_krw"], errors="ignore")
 
     rename_map = {
         "매출0": f"기준매출(원) [{base_label}]",
         "매출1": f"실적매출(원) [{curr_label}]",
         "총차이":   "총차이(원)",
-        "수량차이": "①수량차이(원)",
-        "단가차이": "②단가차이(원)",
-        "환율차이": "③환율차이(원)",
+        **{c: f"{EFFECT_LABELS[c]}(원)" for c in effect_cols},
         "Q0":"기준수량","Q1":"실적수량",
         "P0_fx":"기준외화단가","P1_fx":"실적외화단가",
         "P0_krw":"기준원화단가","P1_krw":"실적원화단가",
@@ -174,7 +284,7 @@ def build_table(
     va_d = va_d.rename(columns=rename_map)
 
     money_cols  = [f"기준매출(원) [{base_label}]", f"실적매출(원) [{curr_label}]",
-                   "총차이(원)","①수량차이(원)","②단가차이(원)","③환율차이(원)"]
+                   "총차이(원)"] + [rename_map[c] for c in effect_cols]
     sum_targets = money_cols + (["기준수량","실적수량"] if "기준수량" in va_d.columns else [])
 
     total_row = {}
@@ -184,3 +294,57 @@ def build_table(
         else:                    total_row[col] = ""
 
     return pd.concat([va_d, pd.DataFrame([total_row])], ignore_index=True), money_cols
+
+
+def build_multi_table(matrix: pd.DataFrame, labels: list, curr_label: str,
+                      effects: bool = True):
+    """
+    다중 기준 비교표 (models.baseline_matrix() 결과) → 표시용 DataFrame + 합계 행.
+    기준마다 [기준매출, 총차이, (①②③ + 모델 추가 분해 열)] 열을 나란히 — 열 이름 뒤 [기준 라벨].
+    effects=False면 분해 열 생략.
+
+    반환: (표시용 DataFrame, money_cols 리스트)
+    """
+    parts = [("매출0", "기준매출(원)"), ("총차이", "총차이(원)")]
+    if effects and labels:
+        cols   = [c for c in EFFECT_LABELS if f"{c}_{labels[0]}" in matrix.columns]
+        parts += [(c, EFFECT_LABELS[c]) for c in effect_columns(cols)]
+
+    out = pd.DataFrame({"품목명": matrix["품목명"].astype(str),
+                        f"실적매출(원) [{curr_label}]": matrix["매출1"].to_numpy()})
+    for label in labels:
+        for src, name in parts:
+            out[f"{name} [{label}]"] = matrix[f"{src}_{label}"].to_numpy()
+    money_cols = list(out.columns[1:])
+
+    total_row = out[money_cols].sum().to_dict()
+    total_row["품목명"] = "【 합 계 】"
+    return pd.concat([out, pd.DataFrame([total_row])], ignore_index=True), money_cols
+
+
+def build_rollup_table(roll: pd.DataFrame, keys: list, base_label: str, curr_label: str):
+    """
+    grouping_sets() 롤업 1개 → 표시용 DataFrame + 합계 행 (총차이 오름차순).
+    키 열은 문자열로, 합계 라벨은 첫 키 열에. 품목수·매출처수 열은 합계에서 비움.
+
+    반환: (표시용 DataFrame, money_cols 리스트)
+    """
+    effect_cols = effect_columns(roll.columns)   # ①②③ + 모델 추가 분해 열 (예: C ①a·①b)
+    out = roll.sort_values("총차이").reset_index(drop=True)
+    out = out[list(keys) + ["매출0", "매출1", "총차이", *effect_cols]
+              + [c for c in ("품목수", "매출처수") if c in out.columns]]
+    for k in keys:
+        out[k] = out[k].astype(str)
+    out = out.rename(columns={
+        "매출0": f"기준매출(원) [{base_label}]",
+        "매출1": f"실적매출(원) [{curr_label}]",
+        "총차이":   "총차이(원)",
+        **{c: f"{EFFECT_LABELS[c]}(원)" for c in effect_cols},
+    })
+    money_cols = [f"기준매출(원) [{base_label}]", f"실적매출(원) [{curr_label}]",
+                  "총차이(원)", *[f"{EFFECT_LABELS[c]}(원)" for c in effect_cols]]
+
+    total_row = {c: "" for c in out.columns}
+    total_row.update(out[money_cols].sum().to_dict())
+    total_row[keys[0]] = "【 합 계 】"
+    return pd.concat([out, pd.DataFrame([total_row])], ignore_index=True), money_cols
@@ -36,6 +36,7 @@ def render_group_editor(df_all):
         .drop_duplicates(subset=["품목명"])
         .sort_values(["품목계정", "품목명"])
         .reset_index(drop=True)
+        .astype(object)   # 범주형 차원 → 텍스트 (data_editor가 선택형 열로 바꾸지 않도록)
     )
 
     mapping = st.session_state.get("item_mapping", {})
@@ -1,6 +1,6 @@
 # ══════════════════════════════════════════════════════════════════════════════
 # ui_group_selector.py  —  품목 그룹 선택 카드 UI
-#   item_mapping({품목명: 커스텀그룹명}) → groups({그룹명: [품목명]}) 변환 후 카드 렌더
+#   item_mapping({품목명: 커스텀그룹명}) → '그룹' 범주형 컬럼 조인 → 그룹 롤업 후 카드 렌더
 # ══════════════════════════════════════════════════════════════════════════════
 import os as _os, sys as _sys
 _HERE = _os.path.dirname(_os.path.abspath(__file__))
@@ -10,27 +10,7 @@ if _HERE not in _sys.path:
 import streamlit as st
 import pandas as pd
 from config import GROUP_COLORS
-
-
-def _build_groups(item_mapping: dict, all_items: list) -> dict:
-    """
-    item_mapping({품목명: 커스텀그룹명}) + 분석 품목 목록
-    → groups({그룹명: [품목명, ...]})
-    커스텀그룹명이 없거나 빈 문자열이면 '미분류'로 편입.
-    """
-    groups: dict[str, list] = {}
-    for item in all_items:
-        grp = item_mapping.get(item, "").strip()
-        if not grp:
-            grp = "미분류"
-        groups.setdefault(grp, []).append(item)
-
-    # 미분류를 마지막으로
-    if "미분류" in groups:
-        unclassified = groups.pop("미분류")
-        groups["미분류"] = unclassified
-
-    return groups
+from models import attach_groups, group_rollup
 
 
 def render_group_selector(va: pd.DataFrame) -> tuple[list[str], dict[str, list[str]]]:
@@ -40,9 +20,11 @@ def render_group_selector(va: pd.DataFrame) -> tuple[list[str], dict[str, list[s
     st.markdown('<div class="section-header">📦 분석 대상 선택</div>',
                 unsafe_allow_html=True)
 
-    all_items    = sorted(va["품목명"].unique())
+    # item → 그룹 범주형 컬럼 1회 조인 + 단일 groupby 롤업 (카드 KPI는 여기서만 조회)
     item_mapping = st.session_state.get("item_mapping", {})
-    groups       = _build_groups(item_mapping, all_items)
+    va_g         = attach_groups(va, item_mapping)
+    groups       = va_g.groupby("그룹", observed=True, sort=True)["품목명"].agg(list).to_dict()
+    roll         = group_rollup(va_g).set_index("그룹")
 
     # ── selected_groups 초기화 ──────────────────────────────────────────────
     if "selected_groups" not in st.session_state:
@@ -77,9 +59,8 @@ def render_group_selector(va: pd.DataFrame) -> tuple[list[str], dict[str, list[s
         is_active = gn in st.session_state.selected_groups
         clr_active, _, clr_dark = GROUP_COLORS[gi % len(GROUP_COLORS)]
 
-        grp_va    = va[va["품목명"].isin(items)]
-        grp_diff  = grp_va["총차이"].sum()
-        grp_curr  = grp_va["매출1"].sum()
+        grp_diff  = roll.at[gn, "총차이"]
+        grp_curr  = roll.at[gn, "매출1"]
         diff_sign = "▲ +" if grp_diff >= 0 else "▼ "
 
         card_bg     = clr_active               if is_active else "#f8fafc"
@@ -133,7 +114,6 @@ def render_group_selector(va: pd.DataFrame) -> tuple[list[str], dict[str, list[s
     selected_items = [
         item for gn in st.session_state.selected_groups
         for item in groups.get(gn, [])
-        if item in all_items
     ]
     if not selected_items:
         st.warning("그룹을 1개 이상 선택하세요.")
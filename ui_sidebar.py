@@ -9,10 +9,41 @@ if _HERE not in _sys.path:
 import streamlit as st
 import pandas as pd
 from io import BytesIO
-from data_loader import load_excel
+from data_loader import load_excel, load_month_index, load_customer_cube
+from erp_reader import file_fingerprint
 from config import MONTH_KR
+from profiling import stage, records, to_json_bytes
+from models import range_sums, ym_to_ord, ord_to_ym, period_ranges, MODELS
 
 
+# 기간 모드 라벨 → 코드.  모든 모드는 누적합 인덱스의 (시작, 종료) 월 서수 범위로 환원됨
+PERIOD_MODES = {
+    "전년 동월 대비 (YoY)":              "YoY",
+    "전월 대비 (MoM)":                   "MoM",
+    "전년 동기 누적 대비 (YTD)":         "YTD",
+    "전년 동분기 누적 대비 (QTD)":       "QTD",
+    "전년 동반기 누적 대비 (HTD)":       "HTD",
+    "최근 N개월 롤링 — 전년 동기 대비":  "R-YoY",
+    "최근 N개월 롤링 — 직전 N개월 대비": "R-PoP",
+    "사용자 지정 기간":                  "CUSTOM",
+}
+
+# 분석 모델 코드 → 선택 라벨 (session_state.analysis_model 값) — models.MODELS 등록 순서
+MODEL_LABELS = {code: spec["name"] for code, spec in MODELS.items()}
+
+
+def model_code(label: str) -> str:
+    """analysis_model 라벨 → 모델 코드 (등록되지 않은 라벨이면 첫 모델)."""
+    return next((k for k, v in MODEL_LABELS.items() if label == v), next(iter(MODELS)))
+
+
+# 다중 기준 비교 — 실적 기간을 기준으로 추가 비교할 기준 (라벨 → 코드)
+MULTI_BASELINES = {
+    "계획 (업로드 파일)":       "PLAN",
+    "전년 동기":                "PY",
+    "직전 기간 (단월이면 전월)": "PP",
+}
+
 
 def _parse_group_excel(data: bytes) -> dict:
     """그룹 설정 엑셀(품목명, 커스텀 그룹명) → {품목명: 그룹명} dict."""
@@ -29,12 +60,69 @@ def _parse_group_excel(data: bytes) -> dict:
         return {}
 
 
+def _ord_label(o: int) -> str:
+    y, m = ord_to_ym(o)
+    return f"{y}년 {MONTH_KR[m]}"
+
+
+def _range_label(start: int, end: int, suffix: str = "") -> str:
+    """(시작, 종료) 월 서수 → '2024년 3월' / '2024년 1~6월' / '2023년 11월~2024년 2월'."""
+    (y1, m1), (y2, m2) = ord_to_ym(start), ord_to_ym(end)
+    if start == end:
+        return f"{y1}년 {MONTH_KR[m1]}{suffix}"
+    if y1 == y2:
+        return f"{y1}년 {m1}~{MONTH_KR[m2]}{suffix}"
+    return f"{y1}년 {MONTH_KR[m1]}~{y2}년 {MONTH_KR[m2]}{suffix}"
+
+
+def _fingerprint(uploaded, file_bytes: bytes, state_key: str = "_file_fingerprint") -> str:
+    """업로드 파일 지문 — 같은 업로드(file_id) 동안은 세션에 보관해 재해시 생략."""
+    fid = getattr(uploaded, "file_id", uploaded.name)
+    cached = st.session_state.get(state_key)
+    if cached and cached[0] == fid:
+        return cached[1]
+    fp = file_fingerprint(file_bytes)
+    st.session_state[state_key] = (fid, fp)
+    return fp
+
+
+def multi_baseline_specs(codes: list, base_period: tuple, curr_period: tuple,
+                         base_label: str, suffix: str = "") -> tuple:
+    """
+    선택된 다중 기준 코드 → run_multi_baseline()의 baselines 튜플.
+    첫 항목은 항상 현재 비교 기간의 기준. 같은 (출처, 기간)은 한 번만.
+    반환: ((라벨, 출처, 시작, 종료), ...) — 출처 "main"=ERP 파일, "plan"=계획 파일 (실적 기간과 같은 월)
+    """
+    start, end = curr_period
+    n = end - start + 1
+    specs = [(f"기준 {base_label}", "main", *base_period)]
+    for code in codes:
+        if code == "PLAN":
+            specs.append((f"계획 {_range_label(start, end, suffix)}", "plan", start, end))
+        elif code == "PY":
+            specs.append((f"전년 동기 {_range_label(start - 12, end - 12, suffix)}",
+                          "main", start - 12, end - 12))
+        elif code == "PP":
+            name = "전월" if n == 1 else f"직전 {n}개월"
+            specs.append((f"{name} {_range_label(start - n, end - n, suffix)}",
+                          "main", start - n, end - n))
+    seen, out = set(), []
+    for spec in specs:
+        if spec[1:] not in seen:
+            seen.add(spec[1:])
+            out.append(spec)
+    return tuple(out)
+
+
 def render_sidebar():
-    df_all = None
+    df_all = m_idx = fingerprint = None
+    plan_idx = plan_fp = cust_cube = None
 
     with st.sidebar:
         st.markdown("## 📂 파일 업로드")
         uploaded = st.file_uploader("ERP 매출실적 (.xlsx / .xls)", type=["xlsx", "xls"])
+        plan_uploaded = st.file_uploader("계획 매출 (선택 — ERP와 같은 열 구성)",
+                                         type=["xlsx", "xls"], key="plan_upload")
 
         st.markdown("---")
         st.markdown("### 📋 품목 그룹 설정 불러오기")
@@ -62,38 +150,53 @@ def render_sidebar():
         st.markdown("---")
 
         if uploaded:
-            df_all = load_excel(uploaded.read(), uploaded.name)
+            with stage("ui_sidebar.load") as rec:
+                file_bytes = uploaded.read()
+                df_all = load_excel(file_bytes, uploaded.name)
+                m_idx  = load_month_index(file_bytes, uploaded.name)
+                fingerprint = _fingerprint(uploaded, file_bytes)
+                rec["rows"] = 0 if df_all is None else len(df_all)
+        if uploaded and plan_uploaded:
+            # 계획 파일도 같은 로더·누적합 인덱스 — 계획 기간 = 실적 기간과 같은 월
+            with stage("ui_sidebar.load_plan"):
+                plan_bytes = plan_uploaded.read()
+                plan_idx   = load_month_index(plan_bytes, plan_uploaded.name)
+                plan_fp    = _fingerprint(plan_uploaded, plan_bytes, "_plan_fingerprint")
 
         if df_all is not None:
             st.markdown("### 📅 실적 연월")
-            avail_years = sorted(df_all["연도"].unique())
+            periods     = m_idx["periods"]
+            avail_years = sorted({ord_to_ym(o)[0] for o in periods})
             curr_year   = st.selectbox("실적 연도", avail_years, index=len(avail_years)-1)
-            avail_m     = sorted(df_all[df_all["연도"] == curr_year]["월"].unique())
+            avail_m     = sorted(ord_to_ym(o)[1] for o in periods if ord_to_ym(o)[0] == curr_year)
             curr_month  = st.selectbox("실적 월", avail_m,
                                        format_func=lambda x: MONTH_KR[x],
                                        index=len(avail_m)-1)
+            c_ord = ym_to_ord(curr_year, curr_month)
 
             st.markdown("### 🔀 비교 기간")
-            period_mode = st.radio("기준 기간 설정",
-                                   ["전년 동월 대비 (YoY)", "전월 대비 (MoM)", "전년 동기 누적 대비 (YTD)"],
+            period_mode = st.radio("기준 기간 설정", list(PERIOD_MODES),
                                    index=0, key="sel_period_mode")
-            is_ytd = (period_mode == "전년 동기 누적 대비 (YTD)")
-
-            if period_mode == "전년 동월 대비 (YoY)":
-                base_year, base_month = curr_year - 1, curr_month
-            elif period_mode == "전월 대비 (MoM)":
-                base_year  = curr_year - 1 if curr_month == 1 else curr_year
-                base_month = 12            if curr_month == 1 else curr_month - 1
-            else:  # YTD
-                base_year, base_month = curr_year - 1, curr_month
-
-            if is_ytd:
-                ytd_months = list(range(1, curr_month + 1))
-                base_label = f"{base_year}년 1~{MONTH_KR[curr_month]} 누적"
-                curr_label = f"{curr_year}년 1~{MONTH_KR[curr_month]} 누적"
+            period_code = PERIOD_MODES[period_mode]
+
+            if period_code == "CUSTOM":
+                upto     = [o for o in periods if o <= c_ord]
+                c_start  = st.selectbox("실적 시작 월", upto, index=len(upto)-1,
+                                        format_func=_ord_label, key="sel_curr_start")
+                b_start  = st.selectbox("기준 시작 월", periods, index=0,
+                                        format_func=_ord_label, key="sel_base_start")
+                b_ends   = [o for o in periods if o >= b_start]
+                b_end    = st.selectbox("기준 종료 월", b_ends, index=0,
+                                        format_func=_ord_label, key="sel_base_end")
+                base_period, curr_period, suffix = (b_start, b_end), (c_start, c_ord), ""
             else:
-                base_label = f"{base_year}년 {MONTH_KR[base_month]}"
-                curr_label = f"{curr_year}년 {MONTH_KR[curr_month]}"
+                n_roll = 3
+                if period_code.startswith("R-"):
+                    n_roll = st.selectbox("롤링 개월 수", [3, 6, 12], index=0, key="sel_roll_n")
+                base_period, curr_period, suffix = period_ranges(period_code, c_ord, n_roll)
+
+            base_label = _range_label(*base_period, suffix)
+            curr_label = _range_label(*curr_period, suffix)
 
             st.markdown(
                 f'<span class="period-badge badge-base">기준: {base_label}</span>'
@@ -101,105 +204,147 @@ def render_sidebar():
                 unsafe_allow_html=True,
             )
 
+            multi_opts  = [k for k, v in MULTI_BASELINES.items()
+                           if v != "PLAN" or plan_idx is not None]
+            if "sel_multi_baselines" in st.session_state:   # 계획 파일 제거 시 선택 정리
+                st.session_state["sel_multi_baselines"] = [
+                    k for k in st.session_state["sel_multi_baselines"] if k in multi_opts]
+            multi_sel   = st.multiselect("다중 기준 비교 (현재 기준과 나란히)", multi_opts,
+                                         key="sel_multi_baselines",
+                                         help="실적 기간을 계획·전년 동기·직전 기간과 한 번에 비교 — "
+                                              "실적 집계는 1회만 수행")
+            baselines   = multi_baseline_specs([MULTI_BASELINES[k] for k in multi_sel],
+                                               base_period, curr_period, base_label, suffix)
+
             st.markdown("---")
             st.markdown("### 🧮 분석 모델 선택")
             if "analysis_model" not in st.session_state:
-                st.session_state.analysis_model = "모델 A — 원인별 임팩트 분석"
-            is_A_active = "모델 A" in st.session_state.analysis_model
-            _render_model_cards(is_A_active)
+                st.session_state.analysis_model = MODEL_LABELS["A"]
+            _render_model_cards(model_code(st.session_state.analysis_model))
             analysis_model = st.session_state.analysis_model
+            # 모델 옵션 (예: 모델 C 믹스 기준) — 등록된 options마다 라디오 1개, 값은 apply_post 인자
+            model_opts = {
+                arg: st.radio(opt["label"], list(opt["choices"]), format_func=opt["choices"].get,
+                              horizontal=True, key=opt["key"])
+                for arg, opt in MODELS[model_code(analysis_model)]["options"].items()}
+            exact = st.checkbox("정확 모드 (원 단위 정수 분해)", key="exact_mode",
+                                help="원화금액을 int64 원, 외화금액을 1/100 단위 정수로 합산하고 "
+                                     "①②③을 정수 원으로 배분 — 행·그룹 합계가 원장과 원 단위까지 일치")
 
             st.markdown("---")
             st.markdown("### ⚙️ 표시 설정")
             show_detail = st.checkbox("수량·단가·환율 상세 컬럼 표시", value=False)
+            customer = st.checkbox("매출처별 분석 (매출처 × 품목 × 환종)", key="customer_mode",
+                                   help="매출처 차원 큐브를 만들고 매출처·품목·그룹·품목계정 롤업을 "
+                                        "한 번에 계산 — 켤 때만 업로드당 1회 구성")
+            if customer:
+                with stage("ui_sidebar.customer_cube"):
+                    cust_cube = load_customer_cube(file_bytes, uploaded.name)
             st.caption("ℹ️ ①수량차이 + ②단가차이 + ③환율차이 = 총차이")
             st.caption("🆕 신규 품목은 당해 매출 전액을 수량차이로 귀속 (단가·환율차이=0)")
 
-            if is_ytd:
-                df_base = df_all[(df_all["연도"] == base_year) & (df_all["월"].isin(ytd_months))].copy()
-                df_curr = df_all[(df_all["연도"] == curr_year) & (df_all["월"].isin(ytd_months))].copy()
-            else:
-                df_base = df_all[(df_all["연도"] == base_year) & (df_all["월"] == base_month)].copy()
-                df_curr = df_all[(df_all["연도"] == curr_year) & (df_all["월"] == curr_month)].copy()
+            # 누적합 인덱스: 기간 길이와 무관하게 두 누적 슬라이스 차이로 합계 산출
+            with stage("ui_sidebar.period_slice") as rec:
+                cube_base = range_sums(m_idx, *base_period)
+                cube_curr = range_sums(m_idx, *curr_period)
+                rec["rows"] = len(cube_base) + len(cube_curr)
 
         else:
-            base_label = curr_label = period_mode = ""
-            df_base = df_curr = None
-            show_detail = False
-            is_ytd = False
+            base_label = curr_label = period_mode = period_code = ""
+            cube_base = cube_curr = None
+            base_period = curr_period = None
+            baselines   = ()
+            show_detail = exact = False
             if "analysis_model" not in st.session_state:
-                st.session_state.analysis_model = "모델 A — 원인별 임팩트 분석"
+                st.session_state.analysis_model = MODEL_LABELS["A"]
             analysis_model = st.session_state.analysis_model
+            model_opts = {}
+
+        st.markdown("---")
+        diag_panel = st.expander("🩺 진단 — 단계별 시간·메모리", expanded=False)
+        diag_panel.checkbox("단계별 계측 켜기", key="diag_enabled",
+                            help="다음 리런부터 단계별 소요 시간·행 수·메모리 피크(tracemalloc)를 기록")
 
     return dict(
-        df_all=df_all, df_base=df_base, df_curr=df_curr,
-        base_label=base_label, curr_label=curr_label, period_mode=period_mode,
-        analysis_model=analysis_model, show_detail=show_detail, is_ytd=is_ytd,
+        df_all=df_all, month_index=m_idx, fingerprint=fingerprint,
+        cube_base=cube_base, cube_curr=cube_curr,
+        base_period=base_period, curr_period=curr_period,
+        baselines=baselines, plan_index=plan_idx, plan_fingerprint=plan_fp,
+        customer_cube=cust_cube,
+        base_label=base_label, curr_label=curr_label,
+        period_mode=period_mode, period_code=period_code,
+        analysis_model=analysis_model, model=model_code(analysis_model), model_opts=model_opts,
+        exact=exact, show_detail=show_detail,
+        diag_panel=diag_panel,
     )
 
 
-def _render_model_cards(is_A_active: bool):
-    if is_A_active:
-        card_s = "background:#1e3a6e;border:2px solid #1e3a6e;border-radius:10px;padding:13px 15px;margin-bottom:4px;"
-        title_s = "font-size:0.9rem;font-weight:800;color:#ffffff;"
-        desc_s = "font-size:0.76rem;color:#c8dcff;margin-top:5px;line-height:1.6;"
-        tag_s = "display:inline-block;font-size:0.69rem;font-weight:700;border-radius:4px;padding:2px 8px;margin-top:7px;background:#ffffff;color:#1e3a6e;"
-        btn_lbl = "✔ 선택됨 (모델 A)"
-    else:
-        card_s = "background:#dde8ff;border:2px solid #2d5faa;border-radius:10px;padding:13px 15px;margin-bottom:4px;"
-        title_s = "font-size:0.9rem;font-weight:800;color:#0d2050;"
-        desc_s = "font-size:0.76rem;color:#1a2d50;margin-top:5px;line-height:1.6;"
-        tag_s = "display:inline-block;font-size:0.69rem;font-weight:700;border-radius:4px;padding:2px 8px;margin-top:7px;background:#1e3a6e;color:#ffffff;"
-        btn_lbl = "이 모델 선택 →"
-
-    badge_a = '&nbsp;<span style="font-size:0.75rem;background:#27ae60;color:white;border-radius:3px;padding:1px 7px;">선택중</span>' if is_A_active else ''
-    st.markdown(f"""
-    <div style="{card_s}">
-      <div style="{title_s}">📐 모델 A — 원인별 임팩트 분석{badge_a}</div>
-      <div style="{desc_s}">
-        변수 간 간섭을 완전히 제거하여<br>각 요인의 <b>절대적 영향력</b>을 측정.<br><br>
-        ① 수량차이: (Q1−Q0)×<b>P0_fx</b>×<b>ER0</b><br>
-        ② 단가차이: (P1−P0)×<b>Q1</b>×<b>ER0</b><br>
-        ③ 환율차이: (ER1−ER0)×<b>Q1</b>×<b>P1_fx</b><br><br>
-        <b>✔ 재무·감사·외부보고 표준</b>
-      </div>
-      <span style="{tag_s}">수량↑↓ 모두 전년 외화단가 적용</span>
-    </div>""", unsafe_allow_html=True)
-    if st.button(btn_lbl, key="sel_model_A", use_container_width=True,
-                 type="primary" if is_A_active else "secondary"):
-        st.session_state.analysis_model = "모델 A — 원인별 임팩트 분석"
-        st.rerun()
-
-    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
-
-    if not is_A_active:
-        card_s = "background:#7a3300;border:2px solid #7a3300;border-radius:10px;padding:13px 15px;margin-bottom:4px;"
-        title_s = "font-size:0.9rem;font-weight:800;color:#ffffff;"
-        desc_s = "font-size:0.76rem;color:#ffd8b0;margin-top:5px;line-height:1.6;"
-        tag_s = "display:inline-block;font-size:0.69rem;font-weight:700;border-radius:4px;padding:2px 8px;margin-top:7px;background:#ffffff;color:#7a3300;"
-        btn_lbl = "✔ 선택됨 (모델 B)"
-    else:
-        card_s = "background:#ffe0c0;border:2px solid #c9641a;border-radius:10px;padding:13px 15px;margin-bottom:4px;"
-        title_s = "font-size:0.9rem;font-weight:800;color:#5a1800;"
-        desc_s = "font-size:0.76rem;color:#4a1800;margin-top:5px;line-height:1.6;"
-        tag_s = "display:inline-block;font-size:0.69rem;font-weight:700;border-radius:4px;padding:2px 8px;margin-top:7px;background:#7a3300;color:#ffffff;"
-        btn_lbl = "이 모델 선택 →"
-
-    badge_b = '&nbsp;<span style="font-size:0.75rem;background:#27ae60;color:white;border-radius:3px;padding:1px 7px;">선택중</span>' if not is_A_active else ''
-    st.markdown(f"""
-    <div style="{card_s}">
-      <div style="{title_s}">📈 모델 B — 활동별 증분 분석{badge_b}</div>
-      <div style="{desc_s}">
-        영업 활동의 <b>실질적 비즈니스 가치</b>를 평가.<br>
-        상황(Case)에 따라 가중치를 다르게 적용.<br><br>
-        ① 수량차이: Q↑→×<b>P1_krw</b> / Q↓→×<b>P0_krw</b><br>
-        ② 단가차이: <b>총차이 − ① − ③</b> (잔여값)<br>
-        ③ 환율차이: P/Q 방향 <b>4-Case 분기</b><br><br>
-        <b>✔ 영업·전략·내부경영 보고</b>
-      </div>
-      <span style="{tag_s}">수량↑=현재 원화단가 / 수량↓=전년 원화단가</span>
-    </div>""", unsafe_allow_html=True)
-    if st.button(btn_lbl, key="sel_model_B", use_container_width=True,
-                 type="primary" if not is_A_active else "secondary"):
-        st.session_state.analysis_model = "모델 B — 활동별 증분 분석"
-        st.rerun()
+def _render_model_cards(active: str):
+    """모델 선택 카드 — models.MODELS 등록 순서대로. active: 현재 모델 코드."""
+    for i, (code, spec) in enumerate(MODELS.items()):
+        if i:
+            st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+        p, on = spec["palette"], code == active
+        if on:
+            card_s = f"background:{p['dark']};border:2px solid {p['dark']};border-radius:10px;padding:13px 15px;margin-bottom:4px;"
+            title_s = "font-size:0.9rem;font-weight:800;color:#ffffff;"
+            desc_s = f"font-size:0.76rem;color:{p['pale']};margin-top:5px;line-height:1.6;"
+            tag_s = f"display:inline-block;font-size:0.69rem;font-weight:700;border-radius:4px;padding:2px 8px;margin-top:7px;background:#ffffff;color:{p['dark']};"
+            btn_lbl = f"✔ 선택됨 ({spec['short']})"
+        else:
+            card_s = f"background:{p['light']};border:2px solid {p['mid']};border-radius:10px;padding:13px 15px;margin-bottom:4px;"
+            title_s = f"font-size:0.9rem;font-weight:800;color:{p['ink']};"
+            desc_s = f"font-size:0.76rem;color:{p['ink']};margin-top:5px;line-height:1.6;"
+            tag_s = f"display:inline-block;font-size:0.69rem;font-weight:700;border-radius:4px;padding:2px 8px;margin-top:7px;background:{p['dark']};color:#ffffff;"
+            btn_lbl = "이 모델 선택 →"
+
+        badge = '&nbsp;<span style="font-size:0.75rem;background:#27ae60;color:white;border-radius:3px;padding:1px 7px;">선택중</span>' if on else ''
+        formulas = "<br>".join(f"{sym} {eq}" for sym, eq in spec["formulas"])
+        st.markdown(f"""
+        <div style="{card_s}">
+          <div style="{title_s}">{spec['icon']} {spec['name']}{badge}</div>
+          <div style="{desc_s}">
+            {spec['intro']}<br><br>
+            {formulas}<br><br>
+            <b>✔ {spec['use']}</b>
+          </div>
+          <span style="{tag_s}">{spec['tag']}</span>
+        </div>""", unsafe_allow_html=True)
+        if st.button(btn_lbl, key=f"sel_model_{code}", use_container_width=True,
+                     type="primary" if on else "secondary"):
+            st.session_state.analysis_model = spec["name"]
+            st.rerun()
+
+
+def render_diagnostics(panel, meta: dict | None = None):
+    """
+    사이드바 진단 expander에 이번 실행의 단계별 기록 표 + JSON 다운로드 표시.
+    app.py 마지막에서 호출 — 그 시점까지 기록된 단계가 모두 포함됨.
+    """
+    if not st.session_state.get("diag_enabled"):
+        return
+    recs = records()
+    if not recs:
+        panel.caption("기록된 단계가 없습니다. (계측은 켠 다음 리런부터 적용)")
+        return
+
+    tbl = pd.DataFrame(recs).reindex(columns=["stage", "depth", "rows", "wall_ms", "peak_mb"])
+    tbl["stage"] = ["　" * d + s for d, s in zip(tbl["depth"], tbl["stage"])]
+    total_ms = tbl.loc[tbl["depth"] == 0, "wall_ms"].sum()
+    panel.caption(f"최상위 단계 합계 {total_ms:,.0f} ms · 캐시 적중 단계는 기록되지 않음")
+    panel.dataframe(
+        tbl.drop(columns=["depth"]),
+        use_container_width=True, hide_index=True,
+        column_config={
+            "stage":   st.column_config.TextColumn("단계"),
+            "rows":    st.column_config.NumberColumn("행 수", format="%d"),
+            "wall_ms": st.column_config.NumberColumn("시간(ms)", format="%.1f"),
+            "peak_mb": st.column_config.NumberColumn("피크(MB)", format="%.2f"),
+        },
+    )
+    panel.download_button(
+        "⬇️ 진단 JSON 다운로드",
+        data=to_json_bytes(meta),
+        file_name="diagnostics.json",
+        mime="application/json",
+    )